@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Cheapest soil amendment that brings a target crop into the top 3
+
+"How much N, P and K must be added, or how far must the pH move, before
+cotton is recommended here?" minimum_amendment answers by scoring whole
+grids of amended inputs in one batched model call per round, never one
+predict_crops call per candidate:
+
+1. A coarse grid of additions (N, P and K from 0 to their limit) and pH
+   shifts (both directions, up to the pH limit) is scored at once.
+2. Around the cheapest feasible candidates a finer grid (half the step in
+   every dimension) is scored, keeping only candidates cheaper than the
+   best one found so far. This repeats until the steps reach the
+   resolution.
+
+A candidate is feasible when the target crop is among the top_k crops of
+predict_crops (same order, ties included) with a non-zero probability.
+Cost is linear in the amounts: costs gives the price of one unit of each
+nutrient and of one unit of pH shift. The forests are not monotonic, so the
+result is the cheapest feasible amendment on the searched grids.
+
+Scoring bypasses the result cache, drift monitor and prediction log, so
+what-if candidates are never mistaken for real requests.
+
+Usage:
+    python amendment_optimizer.py --target cotton [--model crop_recommendation_model]
+                                  [--inputs 80 40 40 5.5 650 29] [--costs N=1 P=1.5 K=1 pH=40]
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from crop_inference import INPUT_COLUMNS, CropPredictor, crop_order, engineer_features
+
+# Inputs a farmer can change; rainfall and temperature stay as given
+AMENDABLE_COLUMNS = ['N', 'P', 'K', 'pH']
+
+# Relative cost of adding one unit of N, P or K and of shifting the pH by one;
+# replace them with local fertilizer, lime and sulfur prices
+DEFAULT_COSTS = {'N': 1.0, 'P': 1.0, 'K': 1.0, 'pH': 40.0}
+
+# Largest addition of each nutrient, and the largest pH shift either way
+DEFAULT_LIMITS = {'N': 150.0, 'P': 150.0, 'K': 150.0, 'pH': 2.0}
+
+# Smallest step worth distinguishing
+DEFAULT_RESOLUTION = {'N': 1.0, 'P': 1.0, 'K': 1.0, 'pH': 0.05}
+
+# Levels per dimension of the coarse grid (pH gets twice as many, for both directions)
+DEFAULT_COARSE_LEVELS = 6
+
+# Feasible candidates refined per round
+DEFAULT_SEEDS = 4
+
+# Valid pH range of the amended soil
+PH_RANGE = (0.0, 14.0)
+
+def crop_probabilities(model, inputs):
+    """Crop probabilities of an (n, 6) input batch, bypassing cache, drift monitor and prediction log
+
+    Only the crop forest decides feasibility, so the yield and season
+    forests are skipped: sklearn's compiled predict_proba for a
+    CropRecommendationModel, the crop forest's flat arrays for a
+    CropPredictor. Both equal the probabilities predict_crops sees.
+    """
+    features = engineer_features(inputs)
+    if model.onnx is not None:
+        return model._predict_features(features)[0]
+    if isinstance(model, CropPredictor):
+        engine = model.engine
+        probs = engine.forests['crop_classifier'].predict_value((engine.validate(features) - engine.mean) / engine.scale)
+    else:
+        probs = model.crop_classifier.predict_proba(model.scaler.transform(features))
+    # A joint model's crop forest scores (crop, season) pairs
+    if model.joint_labels is not None:
+        probs = model.joint_labels.split(probs)[0]
+    return probs
+
+def crop_names(model):
+    if hasattr(model, 'crop_names'):
+        return model.crop_names
+    return model.label_encoders['crop'].classes_
+
+def target_ranks(crop_probs, target):
+    """0-based position of the target crop in every row's predict_crops order
+
+    The order of tied crops is whatever top_3_indices' argsort leaves, so
+    the rank is read off the same sort instead of the probabilities alone.
+    """
+    return np.argmax(crop_order(crop_probs) == target, axis=1)
+
+def _settings(costs, limits, resolution):
+    costs = dict(DEFAULT_COSTS, **(costs or {}))
+    limits = dict(DEFAULT_LIMITS, **(limits or {}))
+    resolution = dict(DEFAULT_RESOLUTION, **(resolution or {}))
+    return (np.array([costs[column] for column in AMENDABLE_COLUMNS], dtype=np.float64),
+            np.array([limits[column] for column in AMENDABLE_COLUMNS], dtype=np.float64),
+            np.array([resolution[column] for column in AMENDABLE_COLUMNS], dtype=np.float64))
+
+def minimum_amendment(model, inputs, target, top_k=3, costs=None, limits=None, resolution=None,
+                      coarse_levels=DEFAULT_COARSE_LEVELS, seeds=DEFAULT_SEEDS):
+    """Cheapest N/P/K addition and pH shift that puts target in the top_k crops of inputs
+
+    model is a CropRecommendationModel or CropPredictor and inputs the six
+    raw values in INPUT_COLUMNS order. costs, limits and resolution
+    override DEFAULT_COSTS, DEFAULT_LIMITS and DEFAULT_RESOLUTION per
+    column. Returns a dict with 'feasible', the 'amendment' and its 'cost',
+    the amended 'inputs', the target's 1-based 'rank' and 'probability'
+    there, and the number of 'candidates' scored in 'model_calls' calls.
+    """
+    names = [str(name).lower() for name in crop_names(model)]
+    if str(target).lower() not in names:
+        raise ValueError(f"Unknown crop {target!r}; choose from {', '.join(sorted(names))}")
+    target_index = names.index(str(target).lower())
+    unit_costs, limits, resolution = _settings(costs, limits, resolution)
+    base = np.asarray(inputs, dtype=np.float64).reshape(len(INPUT_COLUMNS))
+    n_amendable = len(AMENDABLE_COLUMNS)
+    ph = AMENDABLE_COLUMNS.index('pH')
+    # pH shifts that stay within PH_RANGE
+    low = np.zeros(n_amendable)
+    high = limits.copy()
+    low[ph] = max(-limits[ph], PH_RANGE[0] - base[INPUT_COLUMNS.index('pH')])
+    high[ph] = min(limits[ph], PH_RANGE[1] - base[INPUT_COLUMNS.index('pH')])
+
+    scored = set()
+    stats = {'candidates': 0, 'model_calls': 0}
+    best = None  # (cost, amendment, rank, probability)
+
+    def score(amendments):
+        """Score the unseen candidates cheaper than the best so far, returning the feasible ones by cost"""
+        nonlocal best
+        amendments = np.clip(np.round(amendments / resolution) * resolution, low, high)
+        amendments = np.unique(amendments, axis=0)
+        amendment_costs = np.abs(amendments) @ unit_costs
+        keep = np.array([tuple(row) not in scored for row in amendments.tolist()], dtype=bool)
+        if best is not None:
+            keep &= amendment_costs < best[0]
+        amendments, amendment_costs = amendments[keep], amendment_costs[keep]
+        if not len(amendments):
+            return amendments, amendment_costs
+        scored.update(map(tuple, amendments.tolist()))
+
+        candidates = np.tile(base, (len(amendments), 1))
+        candidates[:, :n_amendable] += amendments
+        crop_probs = crop_probabilities(model, candidates)
+        stats['candidates'] += len(amendments)
+        stats['model_calls'] += 1
+
+        ranks = target_ranks(crop_probs, target_index)
+        feasible = (ranks < top_k) & (crop_probs[:, target_index] > 0)
+        order = np.argsort(amendment_costs[feasible], kind='stable')
+        feasible_amendments = amendments[feasible][order]
+        feasible_costs = amendment_costs[feasible][order]
+        if len(feasible_amendments):
+            i = np.flatnonzero(feasible)[order[0]]
+            best = (float(feasible_costs[0]), feasible_amendments[0], int(ranks[i]), float(crop_probs[i, target_index]))
+        return feasible_amendments, feasible_costs
+
+    # No amendment needed?
+    score(np.zeros((1, n_amendable)))
+    if best is None:
+        # Coarse grid over the whole amendment space
+        axes = [np.linspace(low[d], high[d], coarse_levels) for d in range(n_amendable)]
+        axes[ph] = np.linspace(low[ph], high[ph], 2 * coarse_levels - 1)
+        grid = np.array(list(itertools.product(*axes)))
+        steps = np.array([axis[1] - axis[0] if len(axis) > 1 else 0.0 for axis in axes])
+        seed_amendments, _ = score(grid)
+
+        # Finer grids around the cheapest feasible candidates, steps halved every round
+        offsets = np.array(list(itertools.product((-1.0, -0.5, 0.0, 0.5, 1.0), repeat=n_amendable)))
+        while len(seed_amendments) and (steps > resolution).any():
+            seeds_this_round = seed_amendments[:seeds]
+            local = (seeds_this_round[:, np.newaxis, :] + offsets * steps).reshape(-1, n_amendable)
+            steps = np.maximum(steps / 2, resolution)
+            found, _ = score(local)
+            # Keep refining around the previous seeds when the round found nothing cheaper
+            seed_amendments = found if len(found) else seeds_this_round
+
+    result = {'target': crop_names(model)[target_index], 'feasible': best is not None, **stats}
+    if best is not None:
+        cost, amendment, rank, probability = best
+        # Drop the float noise of the resolution rounding, and negative zeros
+        amendment = np.round(amendment, 6) + 0.0
+        amended = base.copy()
+        amended[:n_amendable] += amendment
+        result.update({
+            'amendment': dict(zip(AMENDABLE_COLUMNS, amendment.tolist())),
+            'cost': round(cost, 6),
+            'inputs': dict(zip(INPUT_COLUMNS, amended.tolist())),
+            'rank': rank + 1,
+            'probability': probability,
+        })
+    return result
+
+def parse_overrides(specs):
+    """{column: value} from COLUMN=VALUE strings"""
+    overrides = {}
+    for spec in specs or []:
+        column, _, value = spec.partition('=')
+        if column not in AMENDABLE_COLUMNS:
+            raise ValueError(f"Unknown amendment {column!r}; choose from {', '.join(AMENDABLE_COLUMNS)}")
+        overrides[column] = float(value)
+    return overrides
+
+def main():
+    parser = argparse.ArgumentParser(description="Cheapest amendment that makes a target crop viable")
+    parser.add_argument('--target', required=True, help="Crop that should enter the top 3")
+    parser.add_argument('--model', default='crop_recommendation_model',
+                        help="Artifact directory (preferred), ONNX graph or pickle file")
+    parser.add_argument('--inputs', type=float, nargs=len(INPUT_COLUMNS), default=[80, 40, 40, 5.5, 650, 29],
+                        metavar='VALUE', help=f"Current {', '.join(INPUT_COLUMNS)}")
+    parser.add_argument('--costs', nargs='*', help="Unit costs, as COLUMN=VALUE")
+    parser.add_argument('--limits', nargs='*', help="Largest additions (and pH shift), as COLUMN=VALUE")
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args()
+
+    from lookup_table import load_model
+    model = load_model(args.model)
+    start = time.perf_counter()
+    result = minimum_amendment(model, args.inputs, args.target, top_k=args.top_k,
+                               costs=parse_overrides(args.costs), limits=parse_overrides(args.limits))
+    seconds = time.perf_counter() - start
+
+    print(f"Scored {result['candidates']} candidates in {result['model_calls']} model calls ({seconds:.2f}s)")
+    if not result['feasible']:
+        print(f"No amendment within the limits brings {result['target']} into the top {args.top_k}")
+        return
+    changes = ', '.join(f"{column} {value:+g}" for column, value in result['amendment'].items() if value)
+    print(f"{result['target']}: {changes or 'no amendment needed'} (cost {result['cost']:g}) "
+          f"-> rank {result['rank']}, probability {result['probability']:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Micro-batching front end for concurrent crop recommendation requests
+
+Concurrent callers (Streamlit sessions, API handlers) each submit one sample
+and get a concurrent.futures.Future back. A single worker thread collects the
+requests that arrive within max_wait seconds of the first one, up to
+max_batch_size, and answers them with one vectorized forest call
+(CropRecommendationModel.predict_crops_many) instead of one tiny call per
+request competing for the GIL.
+
+Usage:
+    with BatchingPredictor(model, max_batch_size=64, max_wait=0.002) as predictor:
+        future = predictor.submit(N=90, P=42, K=43, pH=6.5, rainfall=200, temperature=25)
+        recommendations = future.result()
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Queue marker telling the worker thread to finish
+_STOP = object()
+
+class BatchingPredictor:
+    """Coalesce single-sample predict_crops requests into batched forest calls"""
+
+    def __init__(self, model, max_batch_size=64, max_wait=0.002):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name='BatchingPredictor', daemon=True)
+        self._thread.start()
+
+    def submit(self, N, P, K, pH, rainfall, temperature):
+        """Queue one sample, returning a Future for its predict_crops result"""
+        future = Future()
+        inputs = (N, P, K, pH, rainfall, temperature)
+
+        # The model's result cache is consulted here, so hits never wait for a batch;
+        # misses are predicted, observed and logged on the raw inputs, the key only stores the result
+        cache = self.model.cache
+        key = None
+        if cache is not None:
+            key = cache.make_key(self.model.model_version, N=N, P=P, K=K, pH=pH,
+                                 rainfall=rainfall, temperature=temperature)
+            recommendations = cache.get(key)
+            if recommendations is not None:
+                # Batched requests are observed and logged by predict_crops_many; hits are handled here
+                if self.model.monitor is not None:
+                    self.model.monitor.observe(inputs)
+                if self.model.prediction_log is not None:
+                    self.model.prediction_log.log(self.model.model_version, inputs, recommendations)
+                future.set_result([dict(rec) for rec in recommendations])
+                return future
+
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("BatchingPredictor is closed")
+            self._queue.put((inputs, key, future))
+        return future
+
+    def predict(self, N, P, K, pH, rainfall, temperature, timeout=None):
+        """Blocking predict_crops through the batching queue"""
+        return self.submit(N, P, K, pH, rainfall, temperature).result(timeout)
+
+    def close(self):
+        """Answer the queued requests and stop the worker thread"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        """Request and batch counts, and the mean batch size"""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # Collect until the window of the first request closes or the batch is full
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._process(batch)
+
+    def _process(self, batch):
+        # Skip requests whose callers cancelled their futures while queued
+        batch = [(inputs, key, future) for inputs, key, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self.requests += len(batch)
+        self.batches += 1
+
+        try:
+            results = self.model.predict_crops_many([inputs for inputs, _, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        cache = self.model.cache
+        for (_, key, future), recommendations in zip(batch, results):
+            if cache is not None and key is not None:
+                cache.put(key, recommendations)
+                recommendations = [dict(rec) for rec in recommendations]
+            future.set_result(recommendations)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Crop Recommendation System
+
+Usage:
+    python benchmark.py <benchmark> [options]
+    python benchmark.py <benchmark> -h
+
+Every module in benchmarks/ is a subcommand; see its docstring for the options.
+"""
+
+import argparse
+import importlib
+import pkgutil
+import sys
+
+import benchmarks
+
+def main():
+    parser = argparse.ArgumentParser(description="Crop Recommendation System benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for info in pkgutil.iter_modules(benchmarks.__path__):
+        if info.name == 'common':
+            continue
+        module = importlib.import_module(f'benchmarks.{info.name}')
+        subparser = subparsers.add_parser(info.name, help=module.HELP)
+        module.add_arguments(subparser)
+        subparser.set_defaults(func=module.run)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks, one module per feature
+
+Each module defines HELP, add_arguments(parser) and run(args), and is exposed
+by benchmark.py as a subcommand named after the module.
+"""
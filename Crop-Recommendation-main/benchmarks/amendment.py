@@ -0,0 +1,55 @@
+"""
+Batched amendment search vs a predict_crops loop
+
+Usage:
+    python benchmark.py amendment [--artifact crop_recommendation_model] [--cases 20]
+"""
+
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.common import random_inputs, time_call
+
+HELP = "Batched amendment search vs a predict_crops loop"
+
+def add_arguments(parser):
+    parser.add_argument('--artifact', default='crop_recommendation_model')
+    parser.add_argument('--cases', type=int, default=20)
+
+def run(args):
+    """Amendment search time vs scoring the same candidates one predict_crops call at a time"""
+    from amendment_optimizer import crop_probabilities, minimum_amendment
+    from crop_inference import CropPredictor, top_3_indices
+    
+    predictor = CropPredictor(args.artifact)
+    rng = np.random.default_rng(0)
+    inputs = random_inputs(args.cases)
+    inputs[:, 3] = np.clip(inputs[:, 3], 4.0, 9.0)
+    
+    searches, feasible, candidates, calls = [], 0, 0, 0
+    for row in inputs:
+        target = predictor.crop_names[rng.integers(len(predictor.crop_names))]
+        start = time.perf_counter()
+        result = minimum_amendment(predictor, row, target)
+        searches.append(time.perf_counter() - start)
+        candidates += result['candidates']
+        calls += result['model_calls']
+        if result['feasible']:
+            feasible += 1
+            # The amended inputs must really put the target in the top 3
+            amended = np.array(list(result['inputs'].values()))
+            top = predictor.crop_names[top_3_indices(crop_probabilities(predictor, amended[np.newaxis])[0])]
+            assert target in top, (row, target, result)
+    
+    # The same number of candidates scored one request at a time
+    loop_requests = [tuple(row) for row in random_inputs(min(candidates, 2000), seed=1)]
+    per_call = statistics.median(time_call(lambda: [predictor.predict_crops(*row) for row in loop_requests], 3))
+    loop_seconds = per_call / len(loop_requests) * candidates / args.cases
+    
+    print(f"{args.cases} searches ({feasible} feasible): {candidates / args.cases:.0f} candidates "
+          f"in {calls / args.cases:.1f} model calls per search")
+    print(f"  batched search   median {statistics.median(searches) * 1e3:7.1f} ms")
+    print(f"  predict_crops loop over the same candidates  ~{loop_seconds * 1e3:7.1f} ms")
+    return 0
@@ -0,0 +1,63 @@
+"""
+Concurrent callers with and without micro-batching
+
+Usage:
+    python benchmark.py batching [--model crop_recommendation_model.pkl] [--threads 1 8 32 64] [--requests 4000]
+"""
+
+import threading
+import time
+
+from benchmarks.common import load_model, percentile_ms, random_inputs
+
+HELP = "Concurrent callers with and without micro-batching"
+
+def add_arguments(parser):
+    parser.add_argument('--model', default='crop_recommendation_model.pkl')
+    parser.add_argument('--threads', type=int, nargs='*', default=[1, 8, 32, 64])
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--window', type=float, default=2.0, help="Batching window in ms")
+
+def run_concurrent(predict, requests, n_threads):
+    """Split requests over n_threads closed-loop callers, returning (wall seconds, per-request latencies)"""
+    latencies = [[] for _ in range(n_threads)]
+    
+    def caller(i):
+        for N, P, K, pH, rainfall, temperature in requests[i::n_threads]:
+            start = time.perf_counter()
+            predict(N, P, K, pH, rainfall, temperature)
+            latencies[i].append(time.perf_counter() - start)
+    
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, [t for per_thread in latencies for t in per_thread]
+
+def run(args):
+    """Throughput and latency of concurrent callers: direct predict_crops vs BatchingPredictor"""
+    from batching_predictor import BatchingPredictor
+    
+    model = load_model(args.model)
+    requests = random_inputs(args.requests)
+    
+    # Both paths must give the same recommendations
+    with BatchingPredictor(model, args.batch_size, args.window / 1e3) as predictor:
+        for row in requests[:50]:
+            assert predictor.predict(*row) == model.predict_crops(*row)
+    
+    print(f"\n{args.requests} requests, batches of up to {args.batch_size} rows within {args.window} ms:")
+    print(f"  {'threads':>7s}  {'mode':9s} {'req/s':>8s} {'p50 ms':>8s} {'p99 ms':>8s} {'batch':>6s}")
+    for n_threads in args.threads:
+        wall, latencies = run_concurrent(model.predict_crops, requests, n_threads)
+        print(f"  {n_threads:7d}  {'direct':9s} {len(requests) / wall:8.0f} "
+              f"{percentile_ms(latencies, 50):8.3f} {percentile_ms(latencies, 99):8.3f} {1:6.1f}")
+        
+        with BatchingPredictor(model, args.batch_size, args.window / 1e3) as predictor:
+            wall, latencies = run_concurrent(predictor.predict, requests, n_threads)
+            mean_batch = predictor.stats()['mean_batch_size']
+        print(f"  {n_threads:7d}  {'batching':9s} {len(requests) / wall:8.0f} "
+              f"{percentile_ms(latencies, 50):8.3f} {percentile_ms(latencies, 99):8.3f} {mean_batch:6.1f}")
@@ -0,0 +1,37 @@
+"""
+Helpers shared by the benchmarks
+"""
+
+import time
+
+import numpy as np
+
+def time_call(func, repeats):
+    """Run func repeats times and return the individual wall-clock timings in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def percentile_ms(timings, q):
+    return float(np.percentile(timings, q)) * 1e3
+
+def random_inputs(n, seed=0):
+    """Random raw inputs over the ranges of the Streamlit sliders, shape (n, 6)"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 201, n),  # N
+        rng.integers(0, 201, n),  # P
+        rng.integers(0, 201, n),  # K
+        rng.integers(0, 141, n) / 10,  # pH
+        rng.integers(0, 2001, n),  # rainfall
+        rng.integers(0, 51, n),  # temperature
+    ]).astype(np.float64)
+
+def load_model(path):
+    from crop_recommendation_model import CropRecommendationModel
+    model = CropRecommendationModel()
+    model.load_model(path)
+    return model
@@ -0,0 +1,43 @@
+"""
+Training time with weighted row deduplication
+
+Usage:
+    python benchmark.py dedup [--repeats 3]
+"""
+
+import statistics
+
+from benchmarks.common import time_call
+
+HELP = "Training time with weighted row deduplication"
+
+def add_arguments(parser):
+    parser.add_argument('--repeats', type=int, default=3)
+
+def run(args):
+    """Training time on all rows vs on deduplicated weighted rows"""
+    from crop_recommendation_model import CropRecommendationModel
+
+    model = CropRecommendationModel()
+    df = model.load_data()
+    X, y_yield, y_crop, y_season, _ = model.prepare_data(df)
+
+    totals = {}
+    metrics = {}
+    for deduplicate in (False, True):
+        label = 'deduplicated' if deduplicate else 'all rows'
+        print(f"\n=== Training on {label} ===")
+        timings = time_call(lambda: model.train_models(X, y_yield, y_crop, y_season, deduplicate=deduplicate),
+                            args.repeats)
+        totals[label] = statistics.median(timings)
+        metrics[label] = model.metrics
+
+    print(f"\nMedian train_models time over {args.repeats} runs:")
+    for label, seconds in totals.items():
+        print(f"  {label:14s} {seconds:7.2f}s")
+    print(f"Speedup: {totals['all rows'] / totals['deduplicated']:.2f}x")
+    # The weighted unique rows bootstrap differently, so the models differ
+    print("\nHoldout metrics:")
+    for label, values in metrics.items():
+        print(f"  {label:14s} yield RMSE {values['yield_rmse']:.4f}   crop accuracy {values['crop_accuracy']:.4f}"
+              f"   season accuracy {values['season_accuracy']:.4f}")
@@ -0,0 +1,50 @@
+"""
+Drift monitor overhead and detection
+
+Usage:
+    python benchmark.py drift [--artifact crop_recommendation_model] [--requests 20000] [--shift 1.4]
+"""
+
+import time
+
+import numpy as np
+
+from benchmarks.common import percentile_ms, random_inputs, time_call
+
+HELP = "Drift monitor overhead and detection"
+
+def add_arguments(parser):
+    parser.add_argument('--artifact', default='crop_recommendation_model')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--predictions', type=int, default=500)
+    parser.add_argument('--shift', type=float, default=1.4, help="Factor applied to rainfall")
+
+def run(args):
+    """Per-request cost of the drift monitor, and its scores on training-like and shifted inputs"""
+    from crop_inference import INPUT_COLUMNS, CropPredictor
+    
+    predictor = CropPredictor(args.artifact)
+    monitor = predictor.enable_drift_monitor(half_life=None)
+    requests = [tuple(row) for row in random_inputs(args.requests)]
+    
+    start = time.perf_counter()
+    for row in requests:
+        monitor.observe(row)
+    observe_us = (time.perf_counter() - start) / len(requests) * 1e6
+    predict = [time_call(lambda: predictor.predict_crops(*row), 1)[0] for row in requests[:args.predictions]]
+    predictor.monitor = None
+    baseline = [time_call(lambda: predictor.predict_crops(*row), 1)[0] for row in requests[:args.predictions]]
+    print(f"observe: {observe_us:.2f} us per request; predict_crops p50 {percentile_ms(baseline, 50):.3f} ms "
+          f"without the monitor, {percentile_ms(predict, 50):.3f} ms with it")
+    
+    # The training rows themselves, then with rainfall scaled by --shift
+    training = np.asarray(predictor.record_index.arrays['inputs'])
+    shifted = training.copy()
+    shifted[:, INPUT_COLUMNS.index('rainfall')] *= args.shift
+    for label, inputs in [('training inputs', training), (f'rainfall x {args.shift}', shifted)]:
+        monitor.reset()
+        monitor.observe_batch(inputs)
+        metrics = monitor.metrics()
+        scores = ", ".join(f"{name} {value['psi']:.3f}/{value['ks']:.3f}" for name, value in metrics['features'].items())
+        print(f"  {label:18s} PSI/KS: {scores}; drifted: {metrics['drifted'] or 'none'}")
+    return 0
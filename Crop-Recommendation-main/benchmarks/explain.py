@@ -0,0 +1,58 @@
+"""
+Feature contribution additivity and overhead
+
+Usage:
+    python benchmark.py explain [--model crop_recommendation_model.pkl] [--requests 500] [--batch-size 256]
+"""
+
+import statistics
+
+import numpy as np
+
+from benchmarks.common import load_model, percentile_ms, random_inputs, time_call
+
+HELP = "Feature contribution additivity and overhead"
+
+def add_arguments(parser):
+    parser.add_argument('--model', default='crop_recommendation_model.pkl')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--repeats', type=int, default=5)
+
+def run(args):
+    """Additivity of the feature contributions and their cost on top of predict_crops"""
+    from crop_recommendation_model import engineer_features
+    
+    model = load_model(args.model)
+    samples = random_inputs(args.batch_size)
+    explanation = model.explain_batch(samples)
+    
+    # Baseline plus contributions must reproduce the predictions
+    values = model.engine.predict_values(engineer_features(samples))
+    top_probs = np.take_along_axis(values['crop_classifier'], np.argsort(-values['crop_classifier'], axis=1,
+                                                                          kind='stable')[:, :3], axis=1)
+    crop_error = np.abs(explanation['crop_baseline'] + explanation['crop_contributions'].sum(axis=2)
+                        - top_probs).max()
+    yield_error = np.abs(explanation['yield_baseline'] + explanation['yield_contributions'].sum(axis=1)
+                         - values['yield_model'][:, 0]).max()
+    batch = model.predict_crops_batch(samples)
+    same = np.array_equal(batch['crop'], explanation['crop']) and np.array_equal(batch['probability'],
+                                                                                 explanation['probability'])
+    for row in samples[:args.requests]:
+        explained = model.explain_crops(*row)['recommendations']
+        same = same and [(r['crop'], r['probability']) for r in explained] == [
+            (r['crop'], r['probability']) for r in model.predict_crops(*row)
+        ]
+    print(f"Additivity over {args.batch_size} samples: max crop error {crop_error:.2e}, "
+          f"max yield error {yield_error:.2e}; recommendations {'match' if same else 'DIFFER'}")
+    
+    print(f"\nPer-request latency over {args.requests} single-row requests:")
+    for label, func in [('predict_crops', model.predict_crops), ('explain_crops', model.explain_crops)]:
+        timings = [time_call(lambda: func(*row), 1)[0] for row in random_inputs(args.requests, seed=1)]
+        print(f"  {label:16s} p50 {percentile_ms(timings, 50):7.3f} ms   p99 {percentile_ms(timings, 99):7.3f} ms")
+    
+    print(f"\nBatch of {args.batch_size} rows (median of {args.repeats} runs):")
+    for label, func in [('predict_crops_batch', model.predict_crops_batch), ('explain_batch', model.explain_batch)]:
+        seconds = statistics.median(time_call(lambda: func(samples), args.repeats))
+        print(f"  {label:20s} {seconds * 1e3:8.2f} ms  ({seconds / args.batch_size * 1e6:6.1f} us/row)")
+    return 0 if same and crop_error < 1e-9 and yield_error < 1e-6 else 1
@@ -0,0 +1,84 @@
+"""
+Accuracy vs size/latency of the estimator backends
+
+Usage:
+    python benchmark.py frontier [--backends ...] [--requests 300] [--output-dir .frontier]
+"""
+
+import os
+import shutil
+import statistics
+import time
+
+import model_artifact
+from benchmarks.common import load_model, percentile_ms, random_inputs, time_call
+
+HELP = "Accuracy vs size/latency of the estimator backends"
+
+def add_arguments(parser):
+    parser.add_argument('--backends', nargs='*', help="Backends to compare (default: all)")
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output-dir', default='.frontier')
+
+def pareto_front(rows, objectives):
+    """Indices of rows not dominated on objectives, a list of (key, 'min' or 'max')"""
+    def at_least_as_good(a, b):
+        return all(a[key] <= b[key] if sense == 'min' else a[key] >= b[key] for key, sense in objectives)
+    
+    return [
+        i for i, row in enumerate(rows)
+        if not any(j != i and at_least_as_good(other, row) and other != row for j, other in enumerate(rows))
+    ]
+
+def run(args):
+    """Train every estimator backend and report accuracy next to size, load time and latency"""
+    from crop_recommendation_model import CropRecommendationModel, ESTIMATOR_BACKENDS
+    
+    backends = args.backends or list(ESTIMATOR_BACKENDS)
+    base = CropRecommendationModel()
+    df = base.load_data()
+    X, y_yield, y_crop, y_season, _ = base.prepare_data(df)
+    requests = random_inputs(args.requests)
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    rows = []
+    for backend in backends:
+        print(f"\n=== {backend} ===")
+        model = CropRecommendationModel(backend=backend)
+        model.label_encoders = base.label_encoders
+        model.train_models(X, y_yield, y_crop, y_season)
+        
+        # Artifact when the backend supports one, pickle otherwise
+        if model.supports_engine():
+            path = os.path.join(args.output_dir, backend)
+            shutil.rmtree(path, ignore_errors=True)
+            model.save_artifact(path)
+            size = model_artifact.artifact_size(path)
+        else:
+            path = os.path.join(args.output_dir, f'{backend}.pkl')
+            model.save_model(path)
+            size = os.path.getsize(path)
+        load_time = statistics.median(time_call(lambda: load_model(path), args.repeats))
+        
+        served = load_model(path)
+        timings = []
+        for N, P, K, pH, rainfall, temperature in requests:
+            start = time.perf_counter()
+            served.predict_crops(N, P, K, pH, rainfall, temperature)
+            timings.append(time.perf_counter() - start)
+        
+        rows.append(dict(model.metrics, backend=backend, size_mb=size / 1e6, load_ms=load_time * 1e3,
+                         p50_ms=percentile_ms(timings, 50), p99_ms=percentile_ms(timings, 99),
+                         engine=served.engine is not None))
+    
+    front = set(pareto_front(rows, [('yield_rmse', 'min'), ('crop_accuracy', 'max'),
+                                    ('season_accuracy', 'max'), ('p99_ms', 'min'), ('size_mb', 'min')]))
+    print(f"\nFrontier over {args.requests} single-row predict_crops requests (* = Pareto-optimal):")
+    print(f"  {'backend':24s} {'RMSE':>7s} {'crop acc':>8s} {'season acc':>10s} {'size MB':>8s} "
+          f"{'load ms':>8s} {'p50 ms':>7s} {'p99 ms':>7s}  engine")
+    for i, row in enumerate(rows):
+        marker = '*' if i in front else ' '
+        print(f"{marker} {row['backend']:24s} {row['yield_rmse']:7.4f} {row['crop_accuracy']:8.4f} "
+              f"{row['season_accuracy']:10.4f} {row['size_mb']:8.1f} {row['load_ms']:8.1f} "
+              f"{row['p50_ms']:7.3f} {row['p99_ms']:7.3f}  {'yes' if row['engine'] else 'no'}")
@@ -0,0 +1,62 @@
+"""
+Per-request latency of the fused predictor
+
+Usage:
+    python benchmark.py fused [--model crop_recommendation_model.pkl] [--requests 500]
+"""
+
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.common import load_model, percentile_ms, random_inputs
+
+HELP = "Per-request latency of the fused predictor"
+
+def add_arguments(parser):
+    parser.add_argument('--model', default='crop_recommendation_model.pkl')
+    parser.add_argument('--requests', type=int, default=500)
+
+def run(args):
+    """Per-request latency: separate sklearn calls vs separate flat forests vs fused pass"""
+    from crop_recommendation_model import engineer_features
+
+    model = load_model(args.model)
+    engine = model.engine
+    requests = [engineer_features(row[np.newaxis]) for row in random_inputs(args.requests)]
+
+    def sklearn_path(features):
+        # The predict_crops path before the engine: scale, then three sklearn calls
+        features_scaled = model.scaler.transform(features)
+        model.crop_classifier.predict_proba(features_scaled)
+        model.season_classifier.predict(features_scaled)
+        model.yield_model.predict(features_scaled)
+
+    def separate_path(features):
+        features_scaled = (features - model.scaler.mean_) / model.scaler.scale_
+        engine.forests['crop_classifier'].predict_proba(features_scaled)
+        engine.forests['season_classifier'].predict(features_scaled)
+        engine.forests['yield_model'].predict(features_scaled)
+
+    def fused_path(features):
+        engine.predict_values(features)
+
+    print(f"\nPer-request latency over {args.requests} single-row requests:")
+    results = {}
+    for label, func in [
+        ('sklearn, 3 calls', sklearn_path),
+        ('flat forests, 3 passes', separate_path),
+        ('fused, 1 pass', fused_path),
+    ]:
+        timings = []
+        for features in requests:
+            start = time.perf_counter()
+            func(features)
+            timings.append(time.perf_counter() - start)
+        results[label] = timings
+        print(f"  {label:24s} p50 {percentile_ms(timings, 50):7.3f} ms   p99 {percentile_ms(timings, 99):7.3f} ms")
+
+    baseline = statistics.median(results['sklearn, 3 calls'])
+    fused = statistics.median(results['fused, 1 pass'])
+    print(f"\nFused pass saves {(baseline - fused) * 1e3:.3f} ms per request ({baseline / fused:.0f}x faster at p50)")
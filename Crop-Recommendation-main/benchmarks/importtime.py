@@ -0,0 +1,65 @@
+"""
+Import-time budget of the inference module
+
+Usage:
+    python benchmark.py importtime [--budget-ms 300] [--repeats 5]
+"""
+
+import statistics
+import subprocess
+import sys
+
+HELP = "Import-time budget of the inference module"
+
+def add_arguments(parser):
+    parser.add_argument('--budget-ms', type=float, default=300)
+    parser.add_argument('--repeats', type=int, default=5)
+
+# Modules an inference-only process must not import
+TRAINING_ONLY_MODULES = ['sklearn', 'pandas', 'scipy']
+
+def import_profile(module):
+    """Run python -X importtime in a fresh interpreter, returning {module: (self us, cumulative us)}"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+def imported_modules(module):
+    """Top-level packages loaded by importing module in a fresh interpreter"""
+    code = f'import sys, {module}; print(" ".join(sorted({{m.split(".")[0] for m in sys.modules}})))'
+    return set(subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.split())
+
+def run(args):
+    """Cold import time of the inference-only module against the training module"""
+    print(f"Cold import time, median of {args.repeats} fresh interpreters:")
+    medians = {}
+    for module in ('crop_inference', 'crop_recommendation_model'):
+        profiles = [import_profile(module) for _ in range(args.repeats)]
+        medians[module] = statistics.median(profile[module][1] for profile in profiles) / 1e3
+        print(f"  {module:28s} {medians[module]:8.1f} ms")
+    
+    heaviest = sorted(profiles[0].items(), key=lambda item: item[1][0], reverse=True)[:5]
+    print("\nHeaviest imports of crop_recommendation_model (self time):")
+    for name, (self_us, _) in heaviest:
+        print(f"  {name:48s} {self_us / 1e3:8.1f} ms")
+    
+    # The startup budget guard: exit non-zero if the inference module regresses
+    failures = []
+    leaked = sorted(imported_modules('crop_inference') & set(TRAINING_ONLY_MODULES))
+    if leaked:
+        failures.append(f"crop_inference imports {', '.join(leaked)}")
+    if medians['crop_inference'] > args.budget_ms:
+        failures.append(f"crop_inference takes {medians['crop_inference']:.1f} ms, budget {args.budget_ms:.0f} ms")
+    print()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: crop_inference imports in {medians['crop_inference']:.1f} ms "
+              f"(budget {args.budget_ms:.0f} ms) without {', '.join(TRAINING_ONLY_MODULES)}")
+    return 1 if failures else 0
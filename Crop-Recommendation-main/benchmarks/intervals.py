@@ -0,0 +1,53 @@
+"""
+Yield quantile parity and cost
+
+Usage:
+    python benchmark.py intervals [--model crop_recommendation_model.pkl] [--requests 500] [--batch-sizes ...]
+"""
+
+import numpy as np
+
+from benchmarks.common import load_model, percentile_ms, random_inputs, time_call
+
+HELP = "Yield quantile parity and cost"
+
+def add_arguments(parser):
+    parser.add_argument('--model', default='crop_recommendation_model.pkl')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[1, 256, 2048])
+
+def run(args):
+    """Yield quantiles from the fused pass against per-estimator sklearn predictions, and their cost"""
+    from crop_inference import YIELD_ADJUSTMENTS, YIELD_QUANTILE_KEYS, YIELD_QUANTILES, engineer_features
+    
+    model = load_model(args.model)
+    if model.engine is None:
+        print(f"Backend {model.backend!r} has no per-tree outputs")
+        return 1
+    
+    # Reference: every tree of the sklearn yield model, one Python call per estimator
+    mismatches = 0
+    for n in args.batch_sizes:
+        samples = random_inputs(n, seed=2)
+        features_scaled = model.scaler.transform(engineer_features(samples))
+        tree_yields = np.stack([tree.predict(features_scaled) for tree in model.yield_model.estimators_])
+        expected = np.quantile(tree_yields, YIELD_QUANTILES, axis=0).T
+        result = model.predict_crops_batch(samples, top_k=1)
+        multipliers = np.array([YIELD_ADJUSTMENTS.get(crop.lower(), 1.0) for crop in result['crop'][:, 0]])
+        actual = np.column_stack([result[key][:, 0] for key in YIELD_QUANTILE_KEYS])
+        close = np.allclose(actual, expected * multipliers[:, np.newaxis], rtol=1e-9, atol=1e-9)
+        mismatches += not close
+        print(f"  {n:6d} rows: quantiles {'match' if close else 'DIFFER'} the per-estimator reference")
+    
+    print(f"\nPer-request latency over {args.requests} single-row requests:")
+    requests = [engineer_features(row[np.newaxis]) for row in random_inputs(args.requests, seed=1)]
+    for label, func in [
+        ('mean only', lambda features: model.engine.predict_values(features)),
+        ('mean + p10/p50/p90', lambda features: model._predict_features(features)),
+        ('sklearn per estimator', lambda features: [
+            tree.predict(model.scaler.transform(features)) for tree in model.yield_model.estimators_
+        ]),
+    ]:
+        timings = [time_call(lambda: func(features), 1)[0] for features in requests]
+        print(f"  {label:24s} p50 {percentile_ms(timings, 50):7.3f} ms   p99 {percentile_ms(timings, 99):7.3f} ms")
+    return 1 if mismatches else 0
@@ -0,0 +1,75 @@
+"""
+Three forests vs a joint crop+season classifier
+
+Usage:
+    python benchmark.py joint [--requests 500] [--batch-size 256] [--output-dir .joint]
+"""
+
+import os
+import shutil
+import statistics
+import time
+
+import numpy as np
+
+import model_artifact
+from benchmarks.common import percentile_ms, random_inputs, time_call
+
+HELP = "Three forests vs a joint crop+season classifier"
+
+def add_arguments(parser):
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--output-dir', default='.joint')
+
+def run(args):
+    """Three forests vs a joint (crop, season) classifier: accuracy, artifact size and latency"""
+    from crop_inference import CropPredictor
+    from crop_recommendation_model import ENGINE_MAX_ROWS, CropRecommendationModel
+    
+    base = CropRecommendationModel()
+    df = base.load_data()
+    X, y_yield, y_crop, y_season, _ = base.prepare_data(df)
+    requests = random_inputs(args.requests)
+    batch = random_inputs(args.batch_size, seed=1)
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    rows = []
+    for joint in (False, True):
+        label = 'joint' if joint else 'three forests'
+        print(f"\n=== {label} ===")
+        model = CropRecommendationModel(joint=joint)
+        model.label_encoders = base.label_encoders
+        model.train_models(X, y_yield, y_crop, y_season)
+        path = os.path.join(args.output_dir, 'joint' if joint else 'separate')
+        shutil.rmtree(path, ignore_errors=True)
+        model.save_artifact(path)
+        
+        served = CropPredictor(path)
+        # The artifact, the in-memory engine and sklearn (large batches) must agree
+        expected = model.predict_crops_batch(batch)
+        for result in (served.predict_crops_batch(batch),
+                       model.predict_crops_batch(np.tile(batch, (ENGINE_MAX_ROWS // len(batch) + 1, 1)))):
+            assert np.array_equal(result['crop'][:len(batch)], expected['crop']), label
+            assert np.array_equal(result['season'][:len(batch)], expected['season']), label
+            assert np.allclose(result['probability'][:len(batch)], expected['probability'], atol=1e-12), label
+        
+        timings = []
+        for N, P, K, pH, rainfall, temperature in requests:
+            start = time.perf_counter()
+            served.predict_crops(N, P, K, pH, rainfall, temperature)
+            timings.append(time.perf_counter() - start)
+        batch_seconds = statistics.median(time_call(lambda: served.predict_crops_batch(batch), 20))
+        
+        rows.append(dict(model.metrics, label=label, forests=len(served.engine.forests),
+                         size_mb=model_artifact.artifact_size(path) / 1e6, p50_ms=percentile_ms(timings, 50),
+                         p99_ms=percentile_ms(timings, 99), rows_per_s=len(batch) / batch_seconds))
+    
+    print(f"\nHoldout accuracy, artifact size, {args.requests} single-row predict_crops requests "
+          f"and batches of {args.batch_size}:")
+    print(f"  {'model':14s} {'forests':>7s} {'crop acc':>8s} {'season acc':>10s} {'size MB':>8s} "
+          f"{'p50 ms':>7s} {'p99 ms':>7s} {'batch rows/s':>12s}")
+    for row in rows:
+        print(f"  {row['label']:14s} {row['forests']:7d} {row['crop_accuracy']:8.4f} {row['season_accuracy']:10.4f} "
+              f"{row['size_mb']:8.1f} {row['p50_ms']:7.3f} {row['p99_ms']:7.3f} {row['rows_per_s']:12.0f}")
+    return 0
@@ -0,0 +1,49 @@
+"""
+Model load time: pickle vs artifact
+
+Usage:
+    python benchmark.py load [--pickle crop_recommendation_model.pkl] [--artifact crop_recommendation_model]
+"""
+
+import os
+import pickle
+import statistics
+
+import model_artifact
+from benchmarks.common import load_model, time_call
+
+HELP = "Model load time: pickle vs artifact"
+
+def add_arguments(parser):
+    parser.add_argument('--pickle', default='crop_recommendation_model.pkl')
+    parser.add_argument('--artifact', default='crop_recommendation_model')
+    parser.add_argument('--repeats', type=int, default=10)
+
+def run(args):
+    """Compare model load time: pickle vs memory-mapped artifact"""
+    if not os.path.isdir(args.artifact):
+        # Export the artifact from the pickle so both formats hold the same model
+        load_model(args.pickle).save_artifact(args.artifact)
+
+    def load_pickle():
+        with open(args.pickle, 'rb') as f:
+            pickle.load(f)
+
+    def load_mmap():
+        model_artifact.load_artifact(args.artifact)
+
+    def load_rebuild():
+        manifest, arrays = model_artifact.load_artifact(args.artifact)
+        for name in model_artifact.FOREST_NAMES:
+            model_artifact.rebuild_forest(manifest['forests'][name], arrays[name])
+
+    print(f"Pickle:   {args.pickle} ({os.path.getsize(args.pickle) / 1e6:.1f} MB)")
+    print(f"Artifact: {args.artifact} ({model_artifact.artifact_size(args.artifact) / 1e6:.1f} MB)")
+    print(f"\nLoad time over {args.repeats} runs (median / min):")
+    for label, func in [
+        ('pickle.load', load_pickle),
+        ('artifact (mmap arrays)', load_mmap),
+        ('artifact + sklearn rebuild', load_rebuild),
+    ]:
+        timings = time_call(func, args.repeats)
+        print(f"  {label:28s} {statistics.median(timings) * 1e3:8.2f} ms / {min(timings) * 1e3:8.2f} ms")
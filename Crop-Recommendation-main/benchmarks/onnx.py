@@ -0,0 +1,73 @@
+"""
+ONNX parity check and batch throughput
+
+Usage:
+    python benchmark.py onnx [--model crop_recommendation_model.pkl] [--onnx crop_recommendation_model.onnx]
+"""
+
+import os
+import statistics
+
+import numpy as np
+
+from benchmarks.common import load_model, random_inputs, time_call
+
+HELP = "ONNX parity check and batch throughput"
+
+def add_arguments(parser):
+    parser.add_argument('--model', default='crop_recommendation_model.pkl')
+    parser.add_argument('--onnx', default='crop_recommendation_model.onnx')
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[1, 64, 1024, 16384])
+    parser.add_argument('--repeats', type=int, default=5)
+
+def check_onnx_parity(model, onnx_model, samples, atol=1e-6):
+    """Count samples whose ONNX recommendations differ from predict_crops
+    
+    Crops and seasons must match exactly; probabilities and yields, which the
+    ONNX tree operators return as float32, must agree to atol relative.
+    """
+    mismatches = 0
+    for row in samples:
+        expected, actual = model.predict_crops(*row), onnx_model.predict_crops(*row)
+        same = all(
+            e['crop'] == a['crop'] and e['season'] == a['season']
+            and np.isclose(e['probability'], a['probability'], rtol=atol, atol=atol)
+            and np.isclose(e['yield_quintals_per_acre'], a['yield_quintals_per_acre'], rtol=atol, atol=atol)
+            for e, a in zip(expected, actual)
+        )
+        mismatches += not same
+    return mismatches
+
+def run(args):
+    """Parity of the ONNX graph with predict_crops, and batch throughput per backend"""
+    from crop_recommendation_model import CropRecommendationModel, engineer_features
+    
+    model = load_model(args.model)
+    if not os.path.exists(args.onnx):
+        model.save_onnx(args.onnx)
+    onnx_model = CropRecommendationModel()
+    onnx_model.load_model(args.onnx)
+    
+    samples = random_inputs(args.samples)
+    mismatches = check_onnx_parity(model, onnx_model, samples)
+    print(f"\nParity with predict_crops: {args.samples - mismatches}/{args.samples} samples match")
+    
+    print(f"\nBatch throughput (rows/s, median of {args.repeats} runs):")
+    print(f"  {'rows':>7s} {'sklearn':>10s} {'engine':>10s} {'onnx':>10s}")
+    for n in args.batch_sizes:
+        features = engineer_features(random_inputs(n, seed=1))
+        
+        def sklearn_path():
+            features_scaled = model.scaler.transform(features)
+            model.crop_classifier.predict_proba(features_scaled)
+            model.season_classifier.predict_proba(features_scaled)
+            model.yield_model.predict(features_scaled)
+        
+        rates = [
+            n / statistics.median(time_call(func, args.repeats))
+            for func in (sklearn_path, lambda: model.engine.predict_values(features),
+                         lambda: onnx_model.onnx.predict_values(features))
+        ]
+        print(f"  {n:7d} " + " ".join(f"{rate:10.0f}" for rate in rates))
+    return 1 if mismatches else 0
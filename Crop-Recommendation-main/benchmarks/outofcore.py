@@ -0,0 +1,64 @@
+"""
+Chunked bagging memory and time vs dataset size
+
+Usage:
+    python benchmark.py outofcore [--scales 4 16 64] [--max-samples 20000] [--jobs 2]
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+HELP = "Chunked bagging memory and time vs dataset size"
+
+def add_arguments(parser):
+    parser.add_argument('--scales', type=int, nargs='*', default=[4, 16, 64],
+                        help="Copies of the AP data in each dataset")
+    parser.add_argument('--max-samples', type=int, default=20000)
+    parser.add_argument('--chunksize', type=int, default=50000)
+    parser.add_argument('--jobs', type=int, default=2)
+
+# Run in a fresh process per dataset, so ru_maxrss is the peak of that run alone
+OUT_OF_CORE_RUN = """
+import resource, sys, time
+from chunked_bagging import train_out_of_core
+start = time.perf_counter()
+result = train_out_of_core(sys.argv[1], n_jobs=int(sys.argv[2]), max_samples=int(sys.argv[3]),
+                           chunksize=int(sys.argv[4]))
+seconds = time.perf_counter() - start
+peak = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+print('RESULT', seconds, peak / 1024, result['metrics']['crop_accuracy'], result['metrics']['yield_rmse'])
+"""
+
+def run(args):
+    """Peak memory and time of chunked bagging as the dataset grows"""
+    import tempfile
+    
+    from data_pipeline import DATA_FILE, load_crop_data, write_columnar_dataset
+    
+    df = load_crop_data(DATA_FILE)
+    numeric = ['N', 'P', 'K', 'pH', 'rainfall', 'temperature']
+    print(f"{'rows':>9s} {'on disk':>9s} {'wall':>8s} {'peak RSS':>9s} {'crop acc':>9s} {'yield RMSE':>10s}")
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as directory:
+            def copies():
+                # Jittered copies of the AP rows stand in for multi-state data
+                rng = np.random.default_rng(scale)
+                for _ in range(scale):
+                    copy = df.copy()
+                    copy[numeric] = copy[numeric] * rng.normal(1.0, 0.02, size=(len(copy), len(numeric)))
+                    copy['NPK_ratio'] = copy['N'] / (copy['P'] + copy['K'])
+                    copy['total_nutrients'] = copy['N'] + copy['P'] + copy['K']
+                    yield copy
+            rows = write_columnar_dataset(copies(), directory)
+            size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+            output = subprocess.run(
+                [sys.executable, '-c', OUT_OF_CORE_RUN, directory, str(args.jobs), str(args.max_samples),
+                 str(args.chunksize)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+        seconds, peak_mb, accuracy, rmse = (float(value) for value in output.split('RESULT')[1].split())
+        print(f"{rows:9d} {size / 2**20:7.1f}MB {seconds:7.1f}s {peak_mb:7.0f}MB {accuracy:9.4f} {rmse:10.3f}")
+    return 0
@@ -0,0 +1,54 @@
+"""
+Prediction log overhead and drop policies
+
+Usage:
+    python benchmark.py predlog [--artifact crop_recommendation_model] [--requests 5000] [--capacity 1024]
+"""
+
+import time
+
+from benchmarks.common import percentile_ms, random_inputs, time_call
+
+HELP = "Prediction log overhead and drop policies"
+
+def add_arguments(parser):
+    parser.add_argument('--artifact', default='crop_recommendation_model')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--flood', type=int, default=100000)
+    parser.add_argument('--capacity', type=int, default=1024)
+
+def run(args):
+    """predict_crops latency with the prediction log, and the drop counters under a flood"""
+    import tempfile
+    
+    import pandas as pd
+    
+    from crop_inference import CropPredictor
+    from prediction_log import PredictionLogger
+    
+    predictor = CropPredictor(args.artifact)
+    requests = [tuple(row) for row in random_inputs(args.requests)]
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = [time_call(lambda: predictor.predict_crops(*row), 1)[0] for row in requests]
+        log = predictor.enable_prediction_log(directory)
+        logged = [time_call(lambda: predictor.predict_crops(*row), 1)[0] for row in requests]
+        log.close()
+        rows = len(pd.read_parquet(directory))
+        print(f"predict_crops p50 {percentile_ms(baseline, 50):.3f} ms without the log, "
+              f"{percentile_ms(logged, 50):.3f} ms with it; {rows} rows in {log.stats()['files']} file(s)")
+    
+    # Producers far faster than the writer: a small buffer under each policy
+    recommendations = predictor.predict_crops(*requests[0])
+    print(f"\nFlood of {args.flood} records into a {args.capacity}-record buffer:")
+    for policy in ('drop_oldest', 'drop_newest', 'block'):
+        with tempfile.TemporaryDirectory() as directory:
+            log = PredictionLogger(directory, capacity=args.capacity, policy=policy, batch_size=args.capacity)
+            start = time.perf_counter()
+            for _ in range(args.flood):
+                log.log(predictor.model_version, requests[0], recommendations)
+            seconds = time.perf_counter() - start
+            log.close()
+            stats = log.stats()
+            print(f"  {policy:12s} {seconds / args.flood * 1e6:6.2f} us/record  "
+                  f"written {stats['written']:7d}  dropped {stats['dropped']:7d}")
+    return 0
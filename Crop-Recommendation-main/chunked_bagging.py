@@ -0,0 +1,277 @@
+"""
+Out-of-core training of the forests by chunked bagging
+
+train_models needs the whole feature matrix in memory. For multi-state data
+that does not fit, train_out_of_core streams an on-disk dataset (a Parquet
+dataset directory or production CSVs, see data_pipeline.iter_dataset_chunks)
+instead, chunk by chunk:
+
+1. One scan collects the crop and season labels, the scaler statistics of
+   the training rows (StandardScaler.partial_fit) and a bounded reservoir
+   sample for the drift reference and the similar-records index.
+2. The trees are split into groups of trees_per_group. A worker process per
+   group streams the dataset once and draws every tree's bootstrap sample
+   on the fly: each training row is drawn Poisson(rate) times, where rate
+   is max_samples / training rows (at most 1, which is the usual bootstrap).
+   The draw counts become sample weights, and the worker fits the yield,
+   crop and season trees of its group on them.
+3. The trees of all groups are merged into one forest per model. A tree
+   whose sample lacked some crops or seasons only knows the classes it saw;
+   its class columns are remapped to the full label set first.
+4. A final pass scores the merged forests on the holdout rows.
+
+Rows are split into training and holdout rows by a random draw seeded per
+chunk, so every pass agrees on the split. A worker holds one chunk plus the
+rows drawn for its group (at most trees_per_group * max_samples rows); the
+parent holds the reservoir sample and the merged forests. Neither depends on
+the dataset size.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from crop_inference import FEATURE_COLUMNS
+from data_pipeline import DEFAULT_CHUNK_SIZE, iter_dataset_chunks, sample_crop_data
+from model_artifact import FOREST_NAMES, FOREST_TARGETS
+
+# Expected bootstrap rows per tree
+DEFAULT_MAX_SAMPLES = 200_000
+
+DEFAULT_TREES_PER_GROUP = 10
+DEFAULT_TEST_SIZE = 0.2
+
+# Rows kept for the drift reference and the similar-records index
+DEFAULT_REFERENCE_ROWS = 100_000
+
+# Label encoder fitted on each classification target
+LABEL_ENCODERS = {'crop_classifier': 'crop', 'season_classifier': 'season'}
+
+def holdout_mask(chunk_index, n_rows, test_size=DEFAULT_TEST_SIZE, random_state=42):
+    """Which rows of a chunk are held out, the same in every pass over the dataset"""
+    return np.random.default_rng([random_state, chunk_index]).random(n_rows) < test_size
+
+def chunk_arrays(chunk, label_encoders):
+    """Feature matrix and the three targets of a cleaned chunk, with label-encoded classes"""
+    X = chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    targets = {'yield_model': chunk[FOREST_TARGETS['yield_model']].to_numpy(dtype=np.float64)}
+    for name, encoder in LABEL_ENCODERS.items():
+        labels = chunk[FOREST_TARGETS[name]].astype(str)
+        targets[name] = pd.Categorical(labels, categories=label_encoders[encoder].classes_).codes.astype(np.int64)
+    return X, targets
+
+def scan_dataset(path, chunksize=DEFAULT_CHUNK_SIZE, test_size=DEFAULT_TEST_SIZE, random_state=42,
+                 reference_rows=DEFAULT_REFERENCE_ROWS):
+    """One pass over a dataset: label encoders, a scaler fitted on the training rows,
+    row counts and a reservoir sample of at most reference_rows rows
+    """
+    scaler = StandardScaler()
+    labels = {name: set() for name in LABEL_ENCODERS}
+    counts = {'train': 0, 'holdout': 0}
+
+    def chunks():
+        for i, chunk in enumerate(iter_dataset_chunks(path, chunksize)):
+            for name, values in labels.items():
+                values.update(chunk[FOREST_TARGETS[name]].astype(str).unique())
+            holdout = holdout_mask(i, len(chunk), test_size, random_state)
+            if (~holdout).any():
+                scaler.partial_fit(chunk.loc[~holdout, FEATURE_COLUMNS])
+            counts['train'] += int((~holdout).sum())
+            counts['holdout'] += int(holdout.sum())
+            yield chunk
+
+    sample = sample_crop_data(chunks(), reference_rows, random_state)
+    if counts['train'] == 0:
+        raise ValueError(f"No training rows in {path}")
+
+    label_encoders = {}
+    for name, values in labels.items():
+        encoder = LabelEncoder()
+        encoder.fit(np.array(sorted(values), dtype=object))
+        label_encoders[LABEL_ENCODERS[name]] = encoder
+    return {
+        'scaler': scaler,
+        'label_encoders': label_encoders,
+        'train_rows': counts['train'],
+        'holdout_rows': counts['holdout'],
+        'sample': sample,
+    }
+
+def remap_classes(tree, classes, n_classes):
+    """Widen a fitted classification tree to all n_classes label codes
+
+    A tree fitted on a sample missing some classes has value columns for the
+    codes it saw (classes) only. The columns are moved to their codes and the
+    missing classes get zero, so the tree's predict_proba columns line up
+    with the merged forest's.
+    """
+    from sklearn.tree._tree import Tree
+
+    classes = np.asarray(classes, dtype=np.int64)
+    if len(classes) == n_classes:
+        return tree
+    state = tree.tree_.__getstate__()
+    values = np.zeros(state['values'].shape[:2] + (n_classes,))
+    values[:, :, classes] = state['values']
+    tree_ = Tree(tree.n_features_in_, np.array([n_classes] * tree.n_outputs_, dtype=np.intp), tree.n_outputs_)
+    tree_.__setstate__(dict(state, values=values))
+    tree.tree_ = tree_
+    tree.classes_ = np.arange(n_classes, dtype=np.float64)
+    tree.n_classes_ = np.int64(n_classes)
+    return tree
+
+def draw_group(path, group, n_trees, rate, label_encoders, chunksize=DEFAULT_CHUNK_SIZE,
+               test_size=DEFAULT_TEST_SIZE, random_state=42):
+    """Stream the training rows and draw the bootstrap samples of one group's trees
+
+    Returns (X, targets, draws): the rows drawn at least once for any tree
+    and an (n_rows, n_trees) array of how often each tree drew them.
+    """
+    rng = np.random.default_rng([random_state, group, 1])
+    parts = []
+    for i, chunk in enumerate(iter_dataset_chunks(path, chunksize)):
+        train = chunk[~holdout_mask(i, len(chunk), test_size, random_state)]
+        draws = rng.poisson(rate, size=(len(train), n_trees))
+        drawn = draws.any(axis=1)
+        if drawn.any():
+            X, targets = chunk_arrays(train[drawn], label_encoders)
+            parts.append((X, targets, draws[drawn]))
+
+    if not parts:
+        raise ValueError(f"Group {group} drew no rows; raise max_samples")
+    X = np.concatenate([part[0] for part in parts])
+    targets = {name: np.concatenate([part[1][name] for part in parts]) for name in FOREST_NAMES}
+    draws = np.concatenate([part[2] for part in parts]).astype(np.float64)
+    return X, targets, draws
+
+def fit_group(path, group, first_tree, n_trees, rate, label_encoders, scaler, backend,
+              chunksize=DEFAULT_CHUNK_SIZE, test_size=DEFAULT_TEST_SIZE, random_state=42):
+    """Fit one group's trees of all three models, returning (trees by model, rows drawn, seconds)"""
+    # Imported here: crop_recommendation_model imports this module
+    from crop_recommendation_model import make_estimator
+
+    start = time.perf_counter()
+    X, targets, draws = draw_group(path, group, n_trees, rate, label_encoders, chunksize, test_size, random_state)
+    X = scaler.transform(X)
+    n_classes = {name: len(label_encoders[encoder].classes_) for name, encoder in LABEL_ENCODERS.items()}
+
+    trees = {name: [] for name in FOREST_NAMES}
+    for t in range(n_trees):
+        rows = draws[:, t] > 0
+        for name in FOREST_NAMES:
+            task = 'regression' if name == 'yield_model' else 'classification'
+            # The Poisson draws are the bootstrap, so the one-tree forest must not resample
+            forest = make_estimator(backend, task, random_state=random_state + first_tree + t)
+            forest.set_params(n_estimators=1, bootstrap=False)
+            forest.fit(X[rows], targets[name][rows], sample_weight=draws[rows, t])
+            tree = forest.estimators_[0]
+            if task == 'classification':
+                tree = remap_classes(tree, forest.classes_, n_classes[name])
+            trees[name].append(tree)
+    return trees, len(X), time.perf_counter() - start
+
+def merge_forests(backend, name, trees, n_classes=None, random_state=42):
+    """One fitted forest of a backend made of trees fitted elsewhere"""
+    from crop_recommendation_model import make_estimator
+
+    forest = make_estimator(backend, 'regression' if name == 'yield_model' else 'classification', random_state)
+    forest.set_params(n_estimators=len(trees))
+    forest.estimator_ = clone(trees[0]).set_params(random_state=None)
+    forest.estimators_ = list(trees)
+    forest.n_features_in_ = trees[0].n_features_in_
+    forest.n_outputs_ = trees[0].n_outputs_
+    if n_classes is not None:
+        forest.classes_ = np.arange(n_classes)
+        forest.n_classes_ = n_classes
+    return forest
+
+def evaluate_holdout(forests, scaler, label_encoders, path, chunksize=DEFAULT_CHUNK_SIZE,
+                     test_size=DEFAULT_TEST_SIZE, random_state=42):
+    """Holdout metrics of the merged forests, streamed chunk by chunk"""
+    squared_error, correct = 0.0, {name: 0 for name in LABEL_ENCODERS}
+    rows = 0
+    for i, chunk in enumerate(iter_dataset_chunks(path, chunksize)):
+        holdout = chunk[holdout_mask(i, len(chunk), test_size, random_state)]
+        if not len(holdout):
+            continue
+        X, targets = chunk_arrays(holdout, label_encoders)
+        X = scaler.transform(X)
+        squared_error += float(((forests['yield_model'].predict(X) - targets['yield_model']) ** 2).sum())
+        for name in LABEL_ENCODERS:
+            correct[name] += int((forests[name].predict(X) == targets[name]).sum())
+        rows += len(holdout)
+    if rows == 0:
+        return {}
+    return {
+        'yield_rmse': float(np.sqrt(squared_error / rows)),
+        'crop_accuracy': correct['crop_classifier'] / rows,
+        'season_accuracy': correct['season_classifier'] / rows,
+    }
+
+def train_out_of_core(path, backend='random_forest', n_jobs=None, max_samples=DEFAULT_MAX_SAMPLES,
+                      trees_per_group=DEFAULT_TREES_PER_GROUP, chunksize=DEFAULT_CHUNK_SIZE,
+                      test_size=DEFAULT_TEST_SIZE, random_state=42, reference_rows=DEFAULT_REFERENCE_ROWS):
+    """Train the three forests of a backend on an on-disk dataset by chunked bagging
+
+    n_jobs is the number of worker processes fitting tree groups (-1 for
+    all cores; None fits them in this process). Returns a dict with the
+    'forests', 'scaler', 'label_encoders', holdout 'metrics' and the
+    reservoir 'sample' of the dataset.
+    """
+    from crop_recommendation_model import make_estimator
+
+    params = make_estimator(backend, 'regression').get_params()
+    if 'bootstrap' not in params:
+        raise ValueError(f"Chunked bagging needs a bagged forest backend, not {backend!r}")
+    n_estimators = params['n_estimators']
+
+    wall_start = time.perf_counter()
+    scan = scan_dataset(path, chunksize, test_size, random_state, reference_rows)
+    scaler, label_encoders = scan['scaler'], scan['label_encoders']
+    rate = min(1.0, max_samples / scan['train_rows'])
+    print(f"Scanned {scan['train_rows'] + scan['holdout_rows']} rows ({scan['holdout_rows']} held out) "
+          f"in {time.perf_counter() - wall_start:.2f}s")
+
+    groups = [
+        (group, first_tree, min(trees_per_group, n_estimators - first_tree))
+        for group, first_tree in enumerate(range(0, n_estimators, trees_per_group))
+    ]
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    group_args = [
+        (path, group, first_tree, n_trees, rate, label_encoders, scaler, backend, chunksize, test_size, random_state)
+        for group, first_tree, n_trees in groups
+    ]
+    fit_start = time.perf_counter()
+    if n_jobs is None or n_jobs <= 1:
+        results = [fit_group(*args) for args in group_args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(groups))) as pool:
+            futures = [pool.submit(fit_group, *args) for args in group_args]
+            results = [future.result() for future in futures]
+    fit_wall = time.perf_counter() - fit_start
+
+    forests = {}
+    for name in FOREST_NAMES:
+        encoder = LABEL_ENCODERS.get(name)
+        n_classes = None if encoder is None else len(label_encoders[encoder].classes_)
+        trees = [tree for group_trees, _, _ in results for tree in group_trees[name]]
+        forests[name] = merge_forests(backend, name, trees, n_classes, random_state)
+
+    metrics = evaluate_holdout(forests, scaler, label_encoders, path, chunksize, test_size, random_state)
+    drawn = [rows for _, rows, _ in results]
+    print(f"Chunked bagging ({n_estimators} trees in {len(groups)} groups, n_jobs={n_jobs}): "
+          f"fit wall {fit_wall:.2f}s, group time {sum(seconds for _, _, seconds in results):.2f}s, "
+          f"up to {max(drawn)} rows drawn per group, total wall {time.perf_counter() - wall_start:.2f}s")
+    return {
+        'forests': forests,
+        'scaler': scaler,
+        'label_encoders': label_encoders,
+        'metrics': metrics,
+        'sample': scan['sample'],
+    }
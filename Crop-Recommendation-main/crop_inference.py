@@ -0,0 +1,440 @@
+"""
+Inference-only entry point for the crop recommendation model
+
+Scoring processes (the Streamlit app, batch scorers, API workers) only need
+to load an exported artifact and walk its trees. This module does that with
+NumPy alone: it never imports scikit-learn, pandas or SciPy, so it starts in
+a fraction of the time of crop_recommendation_model, which pulls in the
+training stack. Predictions equal CropRecommendationModel's on the same
+artifact to within floating-point rounding. CropPredictor also serves an
+exported ONNX graph, with NumPy and onnxruntime only.
+
+The feature engineering and recommendation logic shared with training lives
+here and is imported by crop_recommendation_model.
+
+Usage:
+    from crop_inference import CropPredictor
+    predictor = CropPredictor('crop_recommendation_model')  # or 'crop_recommendation_model.onnx'
+    predictor.predict_crops(N=80, P=40, K=40, pH=5.5, rainfall=650, temperature=29)
+"""
+
+import numpy as np
+
+import model_artifact
+from drift_monitor import DEFAULT_HALF_LIFE, DriftMonitor
+from prediction_cache import PredictionCache
+from record_index import RecordIndex
+from tree_engine import FusedPredictor
+
+# Raw soil/climate inputs, in the order accepted by predict_crops_batch
+INPUT_COLUMNS = ['N', 'P', 'K', 'pH', 'rainfall', 'temperature']
+
+# Model features: raw inputs followed by the engineered features
+FEATURE_COLUMNS = INPUT_COLUMNS + ['NPK_ratio', 'total_nutrients']
+
+# Crop-specific yield multipliers applied on top of the general yield prediction
+YIELD_ADJUSTMENTS = {
+    'rice': 1.2, 'wheat': 1.2,  # Higher yielding crops
+    'cotton': 0.8, 'sunflower': 0.8,  # Lower yielding crops
+    'horsegram': 0.6, 'moong': 0.6,  # Pulses typically have lower yields
+}
+
+# Yield quantiles over the yield model's trees, and the keys they are returned under
+YIELD_QUANTILES = (0.1, 0.5, 0.9)
+YIELD_QUANTILE_KEYS = [f'yield_p{round(q * 100)}' for q in YIELD_QUANTILES]
+
+def engineer_features(inputs):
+    """Build the model feature matrix from an (n, 6) array of raw inputs"""
+    inputs = np.asarray(inputs, dtype=np.float64)
+    if inputs.ndim != 2 or inputs.shape[1] != len(INPUT_COLUMNS):
+        raise ValueError(f"Expected an (n, {len(INPUT_COLUMNS)}) array of {', '.join(INPUT_COLUMNS)}, "
+                         f"got shape {inputs.shape}")
+    N, P, K = inputs[:, 0], inputs[:, 1], inputs[:, 2]
+
+    # NPK_ratio falls back to 0 when P + K is 0, as in predict_crops
+    PK = P + K
+    NPK_ratio = np.divide(N, PK, out=np.zeros_like(N), where=PK > 0)
+    total_nutrients = N + P + K
+
+    return np.column_stack([inputs, NPK_ratio, total_nutrients])
+
+def single_features(N, P, K, pH, rainfall, temperature):
+    """Feature row of one sample, computed exactly as predict_crops always has"""
+    NPK_ratio = N / (P + K) if (P + K) > 0 else 0
+    total_nutrients = N + P + K
+    return np.array([[N, P, K, pH, rainfall, temperature, NPK_ratio, total_nutrients]])
+
+def top_3_indices(crop_probs):
+    """Indices of the 3 most probable crops of one sample, in predict_crops order
+
+    Forest probabilities often tie. Tied crops keep the order the reversed
+    argsort leaves them in, as predict_crops always has; crop_order
+    reproduces it for a batch.
+    """
+    return np.argsort(crop_probs)[-3:][::-1]
+
+def crop_order(crop_probs):
+    """Crop indices of every row of an (n, n_crops) array, most probable first, ties as in top_3_indices"""
+    return np.argsort(crop_probs, axis=1)[:, ::-1]
+
+def recommend_crops(crop_probs, season_name, yield_pred, crop_names, yield_quantiles=None):
+    """Top 3 crop recommendations from one sample's crop probabilities, season and yield
+
+    yield_quantiles holds the sample's YIELD_QUANTILES yields, if the model
+    provides them; they are adjusted like the yield and added to every
+    recommendation under YIELD_QUANTILE_KEYS.
+    """
+    # Get top 3 crops with highest probabilities
+    recommendations = []
+    for idx in top_3_indices(crop_probs):
+        crop_name = crop_names[idx]
+        probability = crop_probs[idx]
+
+        # For each crop, we need to predict its specific yield
+        # We'll use the general yield prediction but adjust based on crop type
+        crop_specific_yield = yield_pred
+
+        # Adjust yield based on crop type (some crops typically have different yields)
+        if crop_name.lower() in YIELD_ADJUSTMENTS:
+            crop_specific_yield = yield_pred * YIELD_ADJUSTMENTS[crop_name.lower()]
+
+        recommendation = {
+            'crop': crop_name,
+            'probability': probability,
+            'yield_quintals_per_acre': crop_specific_yield,
+            'estimated_yield_acres': crop_specific_yield,  # For 1 acre
+            'season': season_name
+        }
+        if yield_quantiles is not None:
+            multiplier = YIELD_ADJUSTMENTS.get(crop_name.lower(), 1.0)
+            for key, value in zip(YIELD_QUANTILE_KEYS, yield_quantiles):
+                recommendation[key] = value * multiplier
+        recommendations.append(recommendation)
+
+    return recommendations
+
+def _top_k_indices(crop_probs, top_k):
+    """Column indices and probabilities of the top_k crops of every row, most probable first
+
+    Ties are broken as in top_3_indices. A full sort of a few dozen crops
+    is cheap; argpartition would pick other crops among ties at the cut.
+    """
+    top_indices = crop_order(crop_probs)[:, :top_k]
+    return top_indices, np.take_along_axis(crop_probs, top_indices, axis=1)
+
+def top_k_crops(crop_probs, season_pred, yield_pred, crop_names, season_names, top_k=3, yield_quantiles=None):
+    """Columnar top-k recommendations for a batch, the result of predict_crops_batch
+
+    yield_quantiles is an optional (n, len(YIELD_QUANTILES)) array; its
+    adjusted (n, top_k) yields are returned under YIELD_QUANTILE_KEYS.
+    """
+    top_indices, top_probs = _top_k_indices(crop_probs, top_k)
+
+    # Crop-specific yield adjustment, looked up per class instead of per row
+    multipliers = np.array([YIELD_ADJUSTMENTS.get(name.lower(), 1.0) for name in crop_names])
+    crop_yields = yield_pred[:, None] * multipliers[top_indices]
+
+    result = {
+        'crop': crop_names[top_indices],
+        'probability': top_probs,
+        'yield_quintals_per_acre': crop_yields,
+        'season': season_names[season_pred],
+        'yield_pred': yield_pred,
+    }
+    if yield_quantiles is not None:
+        for i, key in enumerate(YIELD_QUANTILE_KEYS):
+            result[key] = yield_quantiles[:, i, np.newaxis] * multipliers[top_indices]
+    return result
+
+class JointLabels:
+    """(crop, season) label pairs of a joint classifier, which replaces the season forest
+
+    The joint classifier predicts one class per (crop, season) pair seen in
+    training; class i is pairs[i], with the pairs sorted by crop and then
+    season. split adds up per-pair values (probabilities, contributions,
+    baselines) over the last axis into per-crop and per-season values, in a
+    fixed order so single rows and batches give identical sums.
+    """
+
+    def __init__(self, pairs, n_crops, n_seasons):
+        self.pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        if (np.diff(self.pairs[:, 0]) < 0).any():
+            raise ValueError("Joint label pairs must be sorted by crop")
+        self.n_crops = n_crops
+        self.n_seasons = n_seasons
+        # Crops are contiguous runs of pairs; seasons are gathered
+        self.crops, self.crop_starts = np.unique(self.pairs[:, 0], return_index=True)
+        self.season_pairs = [np.flatnonzero(self.pairs[:, 1] == season) for season in range(n_seasons)]
+
+    @classmethod
+    def from_labels(cls, crop, season, n_crops, n_seasons):
+        """The pairs occurring in label-encoded crop and season targets"""
+        return cls(np.unique(np.column_stack([crop, season]), axis=0), n_crops, n_seasons)
+
+    def encode(self, crop, season):
+        """Joint classes of label-encoded crop and season targets"""
+        keys = self.pairs[:, 0] * self.n_seasons + self.pairs[:, 1]
+        return np.searchsorted(keys, np.asarray(crop, dtype=np.int64) * self.n_seasons + np.asarray(season, dtype=np.int64))
+
+    def split(self, values):
+        """Per-crop and per-season sums of per-pair values over the last axis"""
+        values = np.asarray(values, dtype=np.float64)
+        crop_values = np.zeros(values.shape[:-1] + (self.n_crops,))
+        crop_values[..., self.crops] = np.add.reduceat(values, self.crop_starts, axis=-1)
+        season_values = np.stack([values[..., pairs].sum(axis=-1) for pairs in self.season_pairs], axis=-1)
+        return crop_values, season_values
+
+def engine_predictions(engine, features, contributions=(), joint=None):
+    """Crop probabilities, season labels, yields and yield quantiles from one pass of a FusedPredictor
+
+    Returns (crop_probs, season_pred, yield_pred, yield_quantiles, contributions)
+    with yield_quantiles of shape (n, len(YIELD_QUANTILES)). For a joint
+    model (joint holds its JointLabels) crop probabilities and the season
+    come from the joint classifier, and crop contributions are per crop.
+    """
+    values, explained, quantiles = engine.evaluate(features, contributions=contributions,
+                                                   quantiles={'yield_model': YIELD_QUANTILES})
+    if joint is None:
+        crop_probs = values['crop_classifier']
+        season_pred = engine.classes['season_classifier'][np.argmax(values['season_classifier'], axis=1)]
+    else:
+        crop_probs, season_probs = joint.split(values['crop_classifier'])
+        season_pred = np.argmax(season_probs, axis=1)
+        if 'crop_classifier' in explained:
+            explained['crop_classifier'] = joint.split(explained['crop_classifier'])[0]
+    return (crop_probs, season_pred, values['yield_model'][:, 0],
+            quantiles['yield_model'][:, :, 0], explained)
+
+def onnx_predictions(onnx, features):
+    """engine_predictions from an onnx_backend.OnnxPredictor, which has no per-tree yields
+
+    Returns (crop_probs, season_pred, yield_pred, None).
+    """
+    values = onnx.predict_values(features)
+    season_classes = onnx.classes['season_classifier']
+    return (
+        values['crop_classifier'],
+        season_classes[np.argmax(values['season_classifier'], axis=1)],
+        values['yield_model'][:, 0],
+        None,
+    )
+
+def _explain_values(engine, features, joint=None):
+    """engine_predictions with the crop and yield contributions, and the crop baselines"""
+    if engine is None:
+        raise ValueError("Feature contributions need the flat-array engine (a forest backend)")
+    crop_probs, season_pred, yield_pred, yield_quantiles, explained = engine_predictions(
+        engine, features, contributions=['crop_classifier', 'yield_model'], joint=joint
+    )
+    crop_bias = engine.forests['crop_classifier'].bias
+    if joint is not None:
+        crop_bias = joint.split(crop_bias)[0]
+    return (crop_probs, season_pred, yield_pred, yield_quantiles,
+            explained['crop_classifier'], explained['yield_model'][:, :, 0], crop_bias)
+
+def explain_crops(engine, features, crop_names, season_names, joint=None):
+    """predict_crops recommendations of one feature row, with per-feature contributions
+
+    Each recommendation gains 'baseline_probability' (the crop's mean
+    probability before any split) and 'contributions' (the change in its
+    probability due to each feature); the result also holds 'yield_pred',
+    'yield_baseline' and 'yield_contributions'. A baseline plus its
+    contributions equals the prediction. Yield contributions explain
+    yield_pred, before the crop-specific adjustment.
+    """
+    (crop_probs, season_pred, yield_pred, yield_quantiles,
+     crop_contributions, yield_contributions, crop_bias) = _explain_values(engine, features, joint)
+    recommendations = recommend_crops(crop_probs[0], season_names[season_pred[0]], yield_pred[0], crop_names,
+                                      yield_quantiles[0])
+    for recommendation, idx in zip(recommendations, top_3_indices(crop_probs[0])):
+        recommendation['baseline_probability'] = float(crop_bias[idx])
+        recommendation['contributions'] = dict(zip(FEATURE_COLUMNS, crop_contributions[0, :, idx].tolist()))
+    return {
+        'recommendations': recommendations,
+        'yield_pred': yield_pred[0],
+        'yield_baseline': float(engine.forests['yield_model'].bias[0]),
+        'yield_contributions': dict(zip(FEATURE_COLUMNS, yield_contributions[0].tolist())),
+    }
+
+def explain_batch(engine, features, crop_names, season_names, top_k=3, joint=None):
+    """top_k_crops plus per-feature contributions, from one traversal of the engine
+
+    Adds to the top_k_crops result:
+        'crop_baseline'        (n, top_k) probability of each top crop before any split
+        'crop_contributions'   (n, top_k, n_features) change in that probability due to each feature
+        'yield_baseline'       yield before any split
+        'yield_contributions'  (n, n_features) change in yield_pred due to each feature
+        'feature_columns'      FEATURE_COLUMNS
+    """
+    (crop_probs, season_pred, yield_pred, yield_quantiles,
+     crop_contributions, yield_contributions, crop_bias) = _explain_values(engine, features, joint)
+    result = top_k_crops(crop_probs, season_pred, yield_pred, crop_names, season_names, top_k, yield_quantiles)
+    top_indices, _ = _top_k_indices(crop_probs, top_k)
+    result.update({
+        'crop_baseline': crop_bias[top_indices],
+        'crop_contributions': np.take_along_axis(crop_contributions, top_indices[:, np.newaxis, :], axis=2)
+                                .transpose(0, 2, 1),
+        'yield_baseline': float(engine.forests['yield_model'].bias[0]),
+        'yield_contributions': yield_contributions,
+        'feature_columns': list(FEATURE_COLUMNS),
+    })
+    return result
+
+def similar_records(record_index, inputs, k, crop_names, season_names):
+    """Query a RecordIndex for the k nearest historical records, nearest first"""
+    if record_index is None:
+        raise ValueError("This model has no record index; retrain it to build one")
+    return record_index.similar_records(inputs, k, crop_names, season_names, INPUT_COLUMNS)
+
+def input_matrix(samples):
+    """(n, 6) input array from an array-like or a DataFrame with the INPUT_COLUMNS"""
+    if hasattr(samples, 'columns'):
+        samples = samples[INPUT_COLUMNS].to_numpy(dtype=np.float64)
+    return samples
+
+class CropPredictor:
+    """Serve predictions from a model artifact directory with NumPy only, or from an ONNX graph
+
+    An ONNX graph (a path ending in .onnx) runs through onnxruntime with
+    intra_op_num_threads threads. Its labels, model version, metrics and
+    drift reference come from the graph's metadata. It has no yield
+    intervals, feature contributions or record index.
+    """
+
+    def __init__(self, path='crop_recommendation_model', intra_op_num_threads=0):
+        self.cache = None
+        self.monitor = None
+        self.prediction_log = None
+        self.onnx = None
+        if path.endswith('.onnx'):
+            self._load_onnx(path, intra_op_num_threads)
+        else:
+            self._load_artifact(path)
+
+    def _load_artifact(self, path):
+        manifest, arrays = model_artifact.load_artifact(path)
+        # Joint models have no season forest
+        self.engine = FusedPredictor.from_artifact(manifest, arrays)
+        self.crop_names = np.array(manifest['label_encoders']['crop'], dtype=object)
+        self.season_names = np.array(manifest['label_encoders']['season'], dtype=object)
+        self.joint_labels = None
+        if 'joint_labels' in manifest:
+            self.joint_labels = JointLabels(manifest['joint_labels'], len(self.crop_names), len(self.season_names))
+        self.model_version = manifest['model_id']
+        self.metrics = manifest['metadata'].get('metrics', {})
+        self.record_index = RecordIndex(arrays['record_index']) if 'record_index' in arrays else None
+        self.drift_reference = manifest['metadata'].get('drift_reference')
+
+    def _load_onnx(self, path, intra_op_num_threads):
+        # Imported here: only ONNX serving needs onnxruntime
+        from onnx_backend import OnnxPredictor
+        self.onnx = OnnxPredictor(path, intra_op_num_threads=intra_op_num_threads)
+        metadata = self.onnx.metadata
+        self.engine = None
+        self.crop_names = np.array(metadata['label_encoders']['crop'], dtype=object)
+        self.season_names = np.array(metadata['label_encoders']['season'], dtype=object)
+        self.joint_labels = None
+        self.model_version = metadata['model_version']
+        self.metrics = metadata.get('metrics', {})
+        self.record_index = None
+        self.drift_reference = metadata.get('drift_reference')
+
+    def _predict_features(self, features):
+        """Crop probabilities, season labels, yields and yield quantiles (None for ONNX) of a feature matrix"""
+        if self.onnx is not None:
+            return onnx_predictions(self.onnx, features)
+        return engine_predictions(self.engine, features, joint=self.joint_labels)[:4]
+
+    def enable_cache(self, max_entries=4096, ttl=3600.0, decimals=None):
+        """Cache predict_crops results keyed on the model version and inputs, see prediction_cache"""
+        self.cache = PredictionCache(max_entries=max_entries, ttl=ttl, decimals=decimals)
+        return self.cache
+
+    def enable_drift_monitor(self, half_life=DEFAULT_HALF_LIFE):
+        """Track the inputs of every prediction against the training distribution, see drift_monitor"""
+        if self.drift_reference is None:
+            raise ValueError("This model has no drift reference; retrain it to build one")
+        self.monitor = DriftMonitor(self.drift_reference, half_life=half_life)
+        return self.monitor
+
+    def enable_prediction_log(self, directory='prediction_logs', **options):
+        """Log every predict_crops call to Parquet files off the request path, see prediction_log"""
+        from prediction_log import PredictionLogger
+        if self.prediction_log is not None:
+            self.prediction_log.close()
+        self.prediction_log = PredictionLogger(directory, **options)
+        return self.prediction_log
+
+    def predict_crops(self, N, P, K, pH, rainfall, temperature):
+        """Predict top 3 crops with yield and season"""
+        if self.monitor is not None:
+            self.monitor.observe((N, P, K, pH, rainfall, temperature))
+        if self.cache is None:
+            recommendations = self._predict_crops(N, P, K, pH, rainfall, temperature)
+            if self.prediction_log is not None:
+                self.prediction_log.log(self.model_version, (N, P, K, pH, rainfall, temperature), recommendations)
+            return recommendations
+
+        key = self.cache.make_key(self.model_version, N=N, P=P, K=K, pH=pH,
+                                  rainfall=rainfall, temperature=temperature)
+        recommendations = self.cache.get(key)
+        if recommendations is None:
+            recommendations = self._predict_crops(N, P, K, pH, rainfall, temperature)
+            self.cache.put(key, recommendations)
+        if self.prediction_log is not None:
+            self.prediction_log.log(self.model_version, (N, P, K, pH, rainfall, temperature), recommendations)
+        return [dict(rec) for rec in recommendations]
+
+    def _predict_crops(self, N, P, K, pH, rainfall, temperature):
+        crop_probs, season_pred, yield_pred, yield_quantiles = self._predict_features(
+            single_features(N, P, K, pH, rainfall, temperature)
+        )
+        return recommend_crops(crop_probs[0], self.season_names[season_pred[0]], yield_pred[0], self.crop_names,
+                               None if yield_quantiles is None else yield_quantiles[0])
+
+    def predict_crops_many(self, samples):
+        """predict_crops for many samples at once, returning a recommendation list per sample"""
+        samples = input_matrix(samples)
+        if self.monitor is not None:
+            self.monitor.observe_batch(samples)
+        crop_probs, season_pred, yield_pred, yield_quantiles = self._predict_features(engineer_features(samples))
+        if yield_quantiles is None:
+            yield_quantiles = [None] * len(yield_pred)
+        results = [
+            recommend_crops(probs, self.season_names[season], value, self.crop_names, quantiles)
+            for probs, season, value, quantiles in zip(crop_probs, season_pred, yield_pred, yield_quantiles)
+        ]
+        if self.prediction_log is not None:
+            for inputs, recommendations in zip(samples, results):
+                self.prediction_log.log(self.model_version, tuple(inputs), recommendations)
+        return results
+
+    def predict_crops_batch(self, samples, top_k=3):
+        """Columnar top-k predictions, as CropRecommendationModel.predict_crops_batch"""
+        samples = input_matrix(samples)
+        if self.monitor is not None:
+            self.monitor.observe_batch(samples)
+        crop_probs, season_pred, yield_pred, yield_quantiles = self._predict_features(engineer_features(samples))
+        return top_k_crops(crop_probs, season_pred, yield_pred, self.crop_names, self.season_names, top_k,
+                           yield_quantiles)
+
+    def explain_crops(self, N, P, K, pH, rainfall, temperature):
+        """predict_crops with the contribution of every feature to each crop's probability and to the yield"""
+        return explain_crops(self.engine, single_features(N, P, K, pH, rainfall, temperature), self.crop_names,
+                             self.season_names, self.joint_labels)
+
+    def explain_batch(self, samples, top_k=3):
+        """predict_crops_batch with per-feature contributions, see crop_inference.explain_batch"""
+        return explain_batch(self.engine, engineer_features(input_matrix(samples)), self.crop_names,
+                             self.season_names, top_k, self.joint_labels)
+
+    def similar_records(self, N, P, K, pH, rainfall, temperature, k=5):
+        """The k historical records nearest to the inputs, with their crops and actual yields"""
+        return similar_records(self.record_index, [N, P, K, pH, rainfall, temperature], k,
+                               self.crop_names, self.season_names)
+
+    def minimum_amendment(self, target, N, P, K, pH, rainfall, temperature, **options):
+        """Cheapest N/P/K addition and pH shift that brings target into the top 3, see amendment_optimizer"""
+        # Imported here: amendment_optimizer imports this module
+        from amendment_optimizer import minimum_amendment
+        return minimum_amendment(self, [N, P, K, pH, rainfall, temperature], target, **options)
@@ -1,44 +1,186 @@
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.ensemble import (RandomForestRegressor, RandomForestClassifier, ExtraTreesRegressor,
+                              ExtraTreesClassifier, HistGradientBoostingRegressor, HistGradientBoostingClassifier)
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import mean_squared_error, accuracy_score, classification_report
+import model_artifact
+from tree_engine import FlatForest, FusedPredictor, sum_trees, tree_quantiles
+from crop_inference import (INPUT_COLUMNS, FEATURE_COLUMNS, JointLabels, engineer_features,
+                            explain_batch, explain_crops, engine_predictions, input_matrix, onnx_predictions,
+                            recommend_crops, similar_records, single_features, top_k_crops, YIELD_QUANTILES)
+from record_index import RecordIndex
+from drift_monitor import DEFAULT_HALF_LIFE, DriftMonitor, build_reference
+from prediction_cache import PredictionCache
+from amendment_optimizer import minimum_amendment
+from cross_validation import DEFAULT_N_SPLITS, cross_validate
+from chunked_bagging import DEFAULT_MAX_SAMPLES, DEFAULT_TREES_PER_GROUP, LABEL_ENCODERS, train_out_of_core
+from data_pipeline import DATA_CACHE_DIR, DATA_FILE, DEFAULT_CHUNK_SIZE, compress_training_sets, load_crop_data
 import pickle
+import os
+import shutil
+import time
+import uuid
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import warnings
 warnings.filterwarnings('ignore')
 
+# Batches up to this many rows run on the flat-array engine; larger batches
+# amortize sklearn's per-call overhead and use its compiled traversal
+ENGINE_MAX_ROWS = 512
+
+# Estimator backends: name -> (regressor, classifier) factories taking a random_state
+ESTIMATOR_BACKENDS = {
+    # The original model: 100 fully grown trees
+    'random_forest': (
+        lambda random_state: RandomForestRegressor(n_estimators=100, random_state=random_state),
+        lambda random_state: RandomForestClassifier(n_estimators=100, random_state=random_state),
+    ),
+    # Depth/leaf-limited forest: smaller artifact and shallower traversals
+    'random_forest_compact': (
+        lambda random_state: RandomForestRegressor(n_estimators=100, max_depth=12, min_samples_leaf=3,
+                                                   random_state=random_state),
+        lambda random_state: RandomForestClassifier(n_estimators=100, max_depth=12, min_samples_leaf=3,
+                                                    random_state=random_state),
+    ),
+    # Fewer, shallower trees for the tightest latency budgets
+    'random_forest_small': (
+        lambda random_state: RandomForestRegressor(n_estimators=30, max_depth=10, min_samples_leaf=5,
+                                                   random_state=random_state),
+        lambda random_state: RandomForestClassifier(n_estimators=30, max_depth=10, min_samples_leaf=5,
+                                                    random_state=random_state),
+    ),
+    'extra_trees': (
+        lambda random_state: ExtraTreesRegressor(n_estimators=100, random_state=random_state),
+        lambda random_state: ExtraTreesClassifier(n_estimators=100, random_state=random_state),
+    ),
+    # Not a bagged forest: runs through sklearn, without the flat-array engine or artifact support
+    'hist_gradient_boosting': (
+        lambda random_state: HistGradientBoostingRegressor(random_state=random_state),
+        lambda random_state: HistGradientBoostingClassifier(random_state=random_state),
+    ),
+}
+
+def make_estimator(backend, task, random_state=42):
+    """Create an unfitted estimator of a backend for task 'regression' or 'classification'"""
+    if backend not in ESTIMATOR_BACKENDS:
+        raise ValueError(f"Unknown estimator backend {backend!r}; choose from {sorted(ESTIMATOR_BACKENDS)}")
+    regressor, classifier = ESTIMATOR_BACKENDS[backend]
+    return (regressor if task == 'regression' else classifier)(random_state)
+
+def _fit_timed(estimator, X, y, sample_weight=None):
+    """Fit an estimator, returning it with the wall-clock and CPU seconds spent"""
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    estimator.fit(X, y, sample_weight=sample_weight)
+    return estimator, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+def split_core_budget(n_jobs, n_models):
+    """Split n_jobs cores into (processes, threads per model) for n_models models"""
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs is None or n_jobs <= 1:
+        return 1, [None] * n_models
+    
+    processes = min(n_models, n_jobs)
+    # Leftover cores go to the first models (the yield regressor considers all
+    # features at every split and is the slowest to build)
+    threads = [n_jobs // n_models + (1 if i < n_jobs % n_models else 0) for i in range(n_models)]
+    return processes, [max(1, t) for t in threads]
+
+def fit_estimators(estimators, datasets, n_jobs=None):
+    """Fit named estimators and print a per-model timing report
+    
+    datasets maps each estimator name to its (X, y, sample_weight) training
+    set; sample_weight may be None. With n_jobs > 1 (or -1 for all cores)
+    the models are fitted concurrently in a process pool and each forest
+    builds its trees on its share of the cores. Returns a dict of fitted
+    estimators keyed by name.
+    """
+    names = list(estimators)
+    processes, threads = split_core_budget(n_jobs, len(names))
+    
+    wall_start = time.perf_counter()
+    if processes == 1:
+        results = {name: _fit_timed(estimators[name], *datasets[name]) for name in names}
+    else:
+        for name, n_threads in zip(names, threads):
+            if 'n_jobs' in estimators[name].get_params():
+                estimators[name].set_params(n_jobs=n_threads)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {name: pool.submit(_fit_timed, estimators[name], *datasets[name]) for name in names}
+            results = {name: future.result() for name, future in futures.items()}
+    total_wall = time.perf_counter() - wall_start
+    
+    print(f"Training time (n_jobs={n_jobs}):")
+    for name, n_threads in zip(names, threads):
+        _, wall, cpu = results[name]
+        print(f"  {name:18s} wall {wall:7.2f}s  cpu {cpu:7.2f}s  threads {n_threads or 1}")
+    print(f"  {'total':18s} wall {total_wall:7.2f}s")
+    
+    fitted = {}
+    for name in names:
+        estimator = results[name][0]
+        # Inference stays single-threaded, as it was before training in parallel
+        if 'n_jobs' in estimator.get_params():
+            estimator.set_params(n_jobs=None)
+        fitted[name] = estimator
+    return fitted
+
 class CropRecommendationModel:
-    def __init__(self):
+    def __init__(self, backend='random_forest', joint=False):
+        # Estimator backend used by train_models, see ESTIMATOR_BACKENDS
+        self.backend = backend
+        # Train one classifier over (crop, season) pairs instead of a crop and a season forest
+        self.joint = joint
         self.yield_model = None
         self.crop_classifier = None
         self.season_classifier = None
+        # (crop, season) pairs of the joint classifier's classes, None for separate forests
+        self.joint_labels = None
         self.scaler = StandardScaler()
         self.label_encoders = {}
+        # Fused flat-array predictor used for inference, see compile_engine
+        self.engine = None
+        # onnxruntime predictor used for all batch sizes when set, see use_onnx
+        self.onnx = None
+        # (manifest, arrays) of the artifact the model was loaded from
+        self._artifact = None
+        # Identifies the trained model; cached predictions are keyed on it
+        self.model_version = None
+        # Optional predict_crops result cache, see enable_cache
+        self.cache = None
+        # Holdout metrics of the last train_models run
+        self.metrics = {}
+        # KD-tree of the historical records, see similar_records
+        self.record_index = None
+        # Training histograms of the inputs, and the optional live monitor, see enable_drift_monitor
+        self.drift_reference = None
+        self.monitor = None
+        # Optional audit log of predict_crops requests, see enable_prediction_log
+        self.prediction_log = None
+    
+    def __getattr__(self, name):
+        # Models loaded from an artifact rebuild their sklearn forests on first access
+        artifact = self.__dict__.get('_artifact')
+        if name in model_artifact.FOREST_NAMES and artifact is not None and name in artifact[0]['forests']:
+            manifest, arrays = artifact
+            forest = model_artifact.rebuild_forest(manifest['forests'][name], arrays[name])
+            setattr(self, name, forest)
+            return forest
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        
+    def load_data(self, path=DATA_FILE, cache_dir=DATA_CACHE_DIR):
+        """Load and preprocess the crop data
         
-    def load_data(self):
-        """Load and preprocess the crop data"""
+        The cleaned frame is cached in cache_dir, keyed by the hash of the source
+        file, and reloaded without parsing while the source is unchanged. Pass
+        cache_dir=None to always parse the CSV. path may also be a Parquet
+        dataset directory written by data_pipeline.py.
+        """
         try:
-            # Load the main dataset
-            df = pd.read_csv('Andhra_Pradesh_Crop_Production_with_Yield.csv')
-            
-            # Clean column names
-            df.columns = df.columns.str.strip()
-            
-            # Remove any unnamed columns
-            df = df.drop(columns=[col for col in df.columns if 'Unnamed' in col], errors='ignore')
-            
-            # Convert yield to numeric, handling any non-numeric values
-            df['Yield_quintals_per_acre'] = pd.to_numeric(df['Yield_quintals_per_acre'], errors='coerce')
-            
-            # Drop rows with missing values
-            df = df.dropna()
-            
-            # Create additional features
-            df['NPK_ratio'] = df['N'] / (df['P'] + df['K'])
-            df['total_nutrients'] = df['N'] + df['P'] + df['K']
-            
-            return df
+            return load_crop_data(path, cache_dir=cache_dir)
         except Exception as e:
             print(f"Error loading data: {e}")
             return None
@@ -46,7 +188,7 @@ class CropRecommendationModel:
     def prepare_data(self, df):
         """Prepare data for modeling"""
         # Features for prediction
-        feature_columns = ['N', 'P', 'K', 'pH', 'rainfall', 'temperature', 'NPK_ratio', 'total_nutrients']
+        feature_columns = list(FEATURE_COLUMNS)
         
         # Encode categorical variables
         le_crop = LabelEncoder()
@@ -66,8 +208,18 @@ class CropRecommendationModel:
         
         return X, y_yield, y_crop, y_season, feature_columns
     
-    def train_models(self, X, y_yield, y_crop, y_season):
-        """Train the prediction models"""
+    def train_models(self, X, y_yield, y_crop, y_season, n_jobs=None, deduplicate=False):
+        """Train the prediction models
+        
+        n_jobs is the core budget: None trains the models one after another on
+        one core, n_jobs > 1 (or -1 for all cores) trains them concurrently.
+        With deduplicate=True each model is fitted on the unique rows of its
+        (features, target) training set, weighted by their counts; the
+        forests bootstrap over the unique rows, so this fits a different
+        model and is off by default. A joint
+        model trains one classifier over the (crop, season) pairs of the data
+        in place of the crop and season classifiers.
+        """
         # Split data
         X_train, X_test, y_yield_train, y_yield_test, y_crop_train, y_crop_test, y_season_train, y_season_test = train_test_split(
             X, y_yield, y_crop, y_season, test_size=0.2, random_state=42
@@ -77,79 +229,343 @@ class CropRecommendationModel:
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
-        # Train yield prediction model
-        self.yield_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.yield_model.fit(X_train_scaled, y_yield_train)
-        
-        # Train crop classification model
-        self.crop_classifier = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.crop_classifier.fit(X_train_scaled, y_crop_train)
-        
-        # Train season classification model
-        self.season_classifier = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.season_classifier.fit(X_train_scaled, y_season_train)
+        # Yield prediction, crop classification and season classification models
+        estimators = {
+            'yield_model': make_estimator(self.backend, 'regression'),
+            'crop_classifier': make_estimator(self.backend, 'classification'),
+            'season_classifier': make_estimator(self.backend, 'classification'),
+        }
+        targets = {
+            'yield_model': y_yield_train,
+            'crop_classifier': y_crop_train,
+            'season_classifier': y_season_train,
+        }
+        self.joint_labels = None
+        if self.joint:
+            # One classifier over the (crop, season) pairs replaces the season forest
+            # Pairs of the training split only: the classifier never sees the others
+            self.joint_labels = JointLabels.from_labels(y_crop_train, y_season_train,
+                                                        len(self.label_encoders['crop'].classes_),
+                                                        len(self.label_encoders['season'].classes_))
+            targets['crop_classifier'] = self.joint_labels.encode(y_crop_train, y_season_train)
+            del estimators['season_classifier'], targets['season_classifier']
+        if deduplicate:
+            datasets = compress_training_sets(X_train_scaled, targets)
+        else:
+            datasets = {name: (X_train_scaled, y, None) for name, y in targets.items()}
+        fitted = fit_estimators(estimators, datasets, n_jobs=n_jobs)
+        self.yield_model = fitted['yield_model']
+        self.crop_classifier = fitted['crop_classifier']
+        self.season_classifier = fitted.get('season_classifier')
         
         # Evaluate models
         yield_pred = self.yield_model.predict(X_test_scaled)
-        crop_pred = self.crop_classifier.predict(X_test_scaled)
-        season_pred = self.season_classifier.predict(X_test_scaled)
+        if self.joint_labels is None:
+            crop_pred = self.crop_classifier.predict(X_test_scaled)
+            season_pred = self.season_classifier.predict(X_test_scaled)
+        else:
+            crop_probs, season_probs = self.joint_labels.split(self.crop_classifier.predict_proba(X_test_scaled))
+            crop_pred, season_pred = np.argmax(crop_probs, axis=1), np.argmax(season_probs, axis=1)
+        
+        # Holdout metrics
+        self.metrics = {
+            'yield_rmse': float(np.sqrt(mean_squared_error(y_yield_test, yield_pred))),
+            'crop_accuracy': float(accuracy_score(y_crop_test, crop_pred)),
+            'season_accuracy': float(accuracy_score(y_season_test, season_pred)),
+        }
         
         print("Model Performance:")
-        print(f"Yield Prediction RMSE: {np.sqrt(mean_squared_error(y_yield_test, yield_pred)):.4f}")
-        print(f"Crop Classification Accuracy: {accuracy_score(y_crop_test, crop_pred):.4f}")
-        print(f"Season Classification Accuracy: {accuracy_score(y_season_test, season_pred):.4f}")
+        print(f"Yield Prediction RMSE: {self.metrics['yield_rmse']:.4f}")
+        print(f"Crop Classification Accuracy: {self.metrics['crop_accuracy']:.4f}")
+        print(f"Season Classification Accuracy: {self.metrics['season_accuracy']:.4f}")
+        
+        # Index all historical records on the scaled raw inputs for similar_records
+        n_inputs = len(INPUT_COLUMNS)
+        self.record_index = RecordIndex.build(
+            np.asarray(X, dtype=np.float64)[:, :n_inputs], y_crop, y_season, y_yield,
+            self.scaler.mean_[:n_inputs], self.scaler.scale_[:n_inputs],
+        )
+        self.drift_reference = build_reference(np.asarray(X, dtype=np.float64)[:, :n_inputs], INPUT_COLUMNS)
+        
+        self._artifact = None
+        self.onnx = None
+        self.compile_engine()
+        self._set_model_version(uuid.uuid4().hex[:16])
         
         return X_train_scaled, X_test_scaled
     
+    def train_out_of_core(self, path, n_jobs=None, max_samples=DEFAULT_MAX_SAMPLES,
+                          trees_per_group=DEFAULT_TREES_PER_GROUP, chunksize=DEFAULT_CHUNK_SIZE):
+        """Train the models on an on-disk dataset too large for memory, see chunked_bagging
+        
+        path is a Parquet dataset directory written by data_pipeline.py or a
+        production CSV. Every tree is fit on its own bootstrap sample of about
+        max_samples rows, drawn while streaming the dataset; groups of
+        trees_per_group trees are fit in n_jobs worker processes. The
+        drift reference and the similar-records index are built from a
+        bounded sample of the rows.
+        """
+        if self.joint:
+            raise ValueError("Out-of-core training does not support joint models")
+        result = train_out_of_core(path, backend=self.backend, n_jobs=n_jobs, max_samples=max_samples,
+                                   trees_per_group=trees_per_group, chunksize=chunksize)
+        self.scaler = result['scaler']
+        self.label_encoders = result['label_encoders']
+        for name, forest in result['forests'].items():
+            setattr(self, name, forest)
+        self.metrics = result['metrics']
+        
+        print("Model Performance:")
+        print(f"Yield Prediction RMSE: {self.metrics['yield_rmse']:.4f}")
+        print(f"Crop Classification Accuracy: {self.metrics['crop_accuracy']:.4f}")
+        print(f"Season Classification Accuracy: {self.metrics['season_accuracy']:.4f}")
+        
+        sample = result['sample']
+        n_inputs = len(INPUT_COLUMNS)
+        inputs = sample[INPUT_COLUMNS].to_numpy(dtype=np.float64)
+        y_crop, y_season = (
+            self.label_encoders[LABEL_ENCODERS[name]].transform(sample[model_artifact.FOREST_TARGETS[name]].astype(str))
+            for name in ('crop_classifier', 'season_classifier')
+        )
+        self.record_index = RecordIndex.build(
+            inputs, y_crop, y_season, sample['Yield_quintals_per_acre'].to_numpy(dtype=np.float64),
+            self.scaler.mean_[:n_inputs], self.scaler.scale_[:n_inputs],
+        )
+        self.drift_reference = build_reference(inputs, INPUT_COLUMNS)
+        
+        self._artifact = None
+        self.onnx = None
+        self.compile_engine()
+        self._set_model_version(uuid.uuid4().hex[:16])
+    
+    def cross_validate(self, X, y_yield, y_crop, y_season, n_splits=DEFAULT_N_SPLITS, n_jobs=None,
+                       deduplicate=False):
+        """k-fold evaluation of the backend, stored in metrics['cross_validation']
+        
+        Run it after train_models, which resets the metrics. The folds and
+        models are evaluated in parallel with n_jobs worker processes.
+        """
+        summary = cross_validate(X, y_yield, y_crop, y_season, backend=self.backend, n_splits=n_splits,
+                                 n_jobs=n_jobs, deduplicate=deduplicate)
+        self.metrics['cross_validation'] = summary
+        return summary
+    
+    def enable_cache(self, max_entries=4096, ttl=3600.0, decimals=None):
+        """Cache predict_crops results keyed on the model version and inputs, see prediction_cache"""
+        self.cache = PredictionCache(max_entries=max_entries, ttl=ttl, decimals=decimals)
+        return self.cache
+    
+    def enable_drift_monitor(self, half_life=DEFAULT_HALF_LIFE):
+        """Track the inputs of every prediction against the training distribution
+        
+        Returns the DriftMonitor; its metrics() gives PSI and KS scores per input.
+        """
+        if self.drift_reference is None:
+            raise ValueError("This model has no drift reference; retrain it to build one")
+        self.monitor = DriftMonitor(self.drift_reference, half_life=half_life)
+        return self.monitor
+    
+    def enable_prediction_log(self, directory='prediction_logs', **options):
+        """Log the inputs and recommendations of every predict_crops call to Parquet files in directory
+        
+        Logging happens off the request path, see prediction_log.PredictionLogger
+        for the options. Returns the logger.
+        """
+        from prediction_log import PredictionLogger
+        if self.prediction_log is not None:
+            self.prediction_log.close()
+        self.prediction_log = PredictionLogger(directory, **options)
+        return self.prediction_log
+    
+    def _set_model_version(self, version):
+        if version != self.model_version and self.cache is not None:
+            self.cache.clear()
+        if version != self.model_version and self.monitor is not None:
+            # Score against the new model's training data from now on
+            half_life = self.monitor.half_life
+            self.monitor = None
+            if self.drift_reference is not None:
+                self.monitor = DriftMonitor(self.drift_reference, half_life=half_life)
+        self.model_version = version
+    
     def predict_crops(self, N, P, K, pH, rainfall, temperature):
         """Predict top 3 crops with yield and season"""
+        if self.monitor is not None:
+            self.monitor.observe((N, P, K, pH, rainfall, temperature))
+        if self.cache is None:
+            recommendations = self._predict_crops(N, P, K, pH, rainfall, temperature)
+            if self.prediction_log is not None:
+                self.prediction_log.log(self.model_version, (N, P, K, pH, rainfall, temperature), recommendations)
+            return recommendations
+        
+        key = self.cache.make_key(self.model_version, N=N, P=P, K=K, pH=pH,
+                                  rainfall=rainfall, temperature=temperature)
+        recommendations = self.cache.get(key)
+        if recommendations is None:
+            recommendations = self._predict_crops(N, P, K, pH, rainfall, temperature)
+            self.cache.put(key, recommendations)
+        if self.prediction_log is not None:
+            self.prediction_log.log(self.model_version, (N, P, K, pH, rainfall, temperature), recommendations)
+        # Copies, so callers cannot modify the cached entries
+        return [dict(rec) for rec in recommendations]
+    
+    def _predict_crops(self, N, P, K, pH, rainfall, temperature):
         # Prepare input features
-        NPK_ratio = N / (P + K) if (P + K) > 0 else 0
-        total_nutrients = N + P + K
+        features = single_features(N, P, K, pH, rainfall, temperature)
+        crop_probs, season_pred, yield_pred, yield_quantiles = self._predict_features(features)
+        return self._recommendations(crop_probs[0], season_pred[0], yield_pred[0],
+                                     None if yield_quantiles is None else yield_quantiles[0])
+    
+    def predict_crops_many(self, samples):
+        """predict_crops for many samples with one forest call, returning a recommendation list per sample
         
-        features = np.array([[N, P, K, pH, rainfall, temperature, NPK_ratio, total_nutrients]])
-        features_scaled = self.scaler.transform(features)
+        samples is an (n, 6) array or sequence of rows in INPUT_COLUMNS order.
+        """
+        if self.monitor is not None:
+            self.monitor.observe_batch(samples)
+        crop_probs, season_pred, yield_pred, yield_quantiles = self._predict_features(engineer_features(samples))
+        if yield_quantiles is None:
+            yield_quantiles = [None] * len(yield_pred)
+        results = [self._recommendations(*row) for row in zip(crop_probs, season_pred, yield_pred, yield_quantiles)]
+        if self.prediction_log is not None:
+            for inputs, recommendations in zip(samples, results):
+                self.prediction_log.log(self.model_version, tuple(inputs), recommendations)
+        return results
+    
+    def _recommendations(self, crop_probs, season_pred, yield_pred, yield_quantiles=None):
+        """Top 3 crop recommendations from one sample's crop probabilities, season label, yield and yield quantiles"""
+        season_name = self.label_encoders['season'].classes_[season_pred]
+        return recommend_crops(crop_probs, season_name, yield_pred, self.label_encoders['crop'].classes_,
+                               yield_quantiles)
+    
+    def explain_crops(self, N, P, K, pH, rainfall, temperature):
+        """predict_crops with per-feature contributions to each crop's probability and to the yield
         
-        # Get crop probabilities
-        crop_probs = self.crop_classifier.predict_proba(features_scaled)[0]
-        crop_names = self.label_encoders['crop'].classes_
+        Contributions come from the decision paths of the flat-array engine
+        (treeinterpreter-style): every split a sample passes adds the change in
+        node value to the feature it splits on, so a crop's baseline_probability
+        plus its contributions equals its probability. Returns a dict with the
+        'recommendations' (each with 'baseline_probability' and 'contributions'
+        keyed by feature), 'yield_pred', 'yield_baseline' and 'yield_contributions'.
+        """
+        return explain_crops(self.engine, single_features(N, P, K, pH, rainfall, temperature),
+                             self.label_encoders['crop'].classes_, self.label_encoders['season'].classes_,
+                             self.joint_labels)
+    
+    def explain_batch(self, samples, top_k=3):
+        """predict_crops_batch with per-feature contributions for the whole batch from one traversal
         
-        # Get season prediction
-        season_pred = self.season_classifier.predict(features_scaled)[0]
-        season_name = self.label_encoders['season'].classes_[season_pred]
+        See crop_inference.explain_batch for the extra keys.
+        """
+        return explain_batch(self.engine, engineer_features(input_matrix(samples)),
+                             self.label_encoders['crop'].classes_, self.label_encoders['season'].classes_, top_k,
+                             self.joint_labels)
+    
+    def similar_records(self, N, P, K, pH, rainfall, temperature, k=5):
+        """The k historical records nearest to the inputs, with their crops and actual yields
+        
+        Distances are Euclidean on the standardized inputs. Each record is a
+        dict with the inputs, crop, season, yield_quintals_per_acre, distance
+        and its row number in the training data.
+        """
+        return similar_records(self.record_index, [N, P, K, pH, rainfall, temperature], k,
+                               self.label_encoders['crop'].classes_, self.label_encoders['season'].classes_)
+    
+    def minimum_amendment(self, target, N, P, K, pH, rainfall, temperature, **options):
+        """Cheapest N/P/K addition and pH shift that brings target into the top 3
+        
+        Candidate amendments are scored in whole grids per model call, coarse
+        to fine; options (costs, limits, resolution, top_k) are passed to
+        amendment_optimizer.minimum_amendment. Returns the amendment, its
+        cost and the target's rank and probability after it.
+        """
+        return minimum_amendment(self, [N, P, K, pH, rainfall, temperature], target, **options)
+    
+    def predict_crops_batch(self, samples, top_k=3):
+        """Predict the top crops, yield and season for many samples at once
+        
+        samples is a DataFrame with the INPUT_COLUMNS or an (n, 6) array in
+        that column order. Returns a dict of arrays: 'crop', 'probability' and
+        'yield_quintals_per_acre' have shape (n, top_k) ordered by decreasing
+        probability; 'season' and 'yield_pred' have shape (n,). Forest backends
+        also return the crop-adjusted p10/p50/p90 yields over the yield model's
+        trees as 'yield_p10', 'yield_p50' and 'yield_p90', shape (n, top_k).
+        """
+        samples = input_matrix(samples)
+        if self.monitor is not None:
+            self.monitor.observe_batch(samples)
+        # One call per forest for the whole batch
+        crop_probs, season_pred, yield_pred, yield_quantiles = self._predict_features(engineer_features(samples))
+        return top_k_crops(crop_probs, season_pred, yield_pred, self.label_encoders['crop'].classes_,
+                           self.label_encoders['season'].classes_, top_k, yield_quantiles)
+    
+    def forest_names(self):
+        """Names of the fitted models: a joint model has no season classifier"""
+        if self.joint_labels is None:
+            return model_artifact.FOREST_NAMES
+        return [name for name in model_artifact.FOREST_NAMES if name != 'season_classifier']
+    
+    def supports_engine(self):
+        """Whether all the models are bagged tree ensembles the flat-array engine can run"""
+        for name in self.forest_names():
+            estimators = getattr(getattr(self, name), 'estimators_', None)
+            if not estimators or not all(hasattr(tree, 'tree_') for tree in estimators):
+                return False
+        return True
+    
+    def compile_engine(self):
+        """Compile the fitted forests into flat arrays for fast inference
         
-        # Get yield prediction
-        yield_pred = self.yield_model.predict(features_scaled)[0]
-        
-        # Get top 3 crops with highest probabilities
-        top_3_indices = np.argsort(crop_probs)[-3:][::-1]
-        
-        recommendations = []
-        for idx in top_3_indices:
-            crop_name = crop_names[idx]
-            probability = crop_probs[idx]
-            
-            # For each crop, we need to predict its specific yield
-            # We'll use the general yield prediction but adjust based on crop type
-            crop_specific_yield = yield_pred
-            
-            # Adjust yield based on crop type (some crops typically have different yields)
-            if crop_name.lower() in ['rice', 'wheat']:
-                crop_specific_yield = yield_pred * 1.2  # Higher yielding crops
-            elif crop_name.lower() in ['cotton', 'sunflower']:
-                crop_specific_yield = yield_pred * 0.8  # Lower yielding crops
-            elif crop_name.lower() in ['horsegram', 'moong']:
-                crop_specific_yield = yield_pred * 0.6  # Pulses typically have lower yields
-            
-            recommendations.append({
-                'crop': crop_name,
-                'probability': probability,
-                'yield_quintals_per_acre': crop_specific_yield,
-                'estimated_yield_acres': crop_specific_yield,  # For 1 acre
-                'season': season_name
-            })
-        
-        return recommendations
+        Backends the engine cannot run (see supports_engine) keep using sklearn.
+        """
+        if not self.supports_engine():
+            self.engine = None
+            return
+        forests = {name: FlatForest.from_estimator(getattr(self, name)) for name in self.forest_names()}
+        self.engine = FusedPredictor(forests, self.scaler.mean_, self.scaler.scale_)
+    
+    def save_onnx(self, path='crop_recommendation_model.onnx'):
+        """Export the scaler and the three forests as a single ONNX graph"""
+        import onnx_backend
+        onnx_backend.export_onnx(self, path)
+        print(f"Model exported to {path}")
+    
+    def use_onnx(self, path='crop_recommendation_model.onnx', intra_op_num_threads=0):
+        """Run inference through onnxruntime on an exported graph"""
+        import onnx_backend
+        self.onnx = onnx_backend.OnnxPredictor(path, intra_op_num_threads=intra_op_num_threads)
+        return self.onnx
+    
+    def _predict_features(self, features):
+        """Crop probabilities, season labels, yields and yield quantiles for an (n, 8) feature matrix
+        
+        The yield quantiles (YIELD_QUANTILES over the yield model's trees, shape
+        (n, 3)) are None when the trees are not available: non-forest backends
+        and ONNX graphs.
+        """
+        if self.onnx is not None:
+            # onnxruntime is multi-threaded, so it also takes the large batches
+            return onnx_predictions(self.onnx, features)
+        
+        if self.engine is not None and len(features) <= ENGINE_MAX_ROWS:
+            # One validation, one scaling and one traversal for all the forests
+            return engine_predictions(self.engine, features, joint=self.joint_labels)[:4]
+        
+        features_scaled = self.scaler.transform(features)
+        crop_probs = self.crop_classifier.predict_proba(features_scaled)
+        if self.joint_labels is None:
+            season_pred = self.season_classifier.predict(features_scaled)
+        else:
+            crop_probs, season_probs = self.joint_labels.split(crop_probs)
+            season_pred = np.argmax(season_probs, axis=1)
+        if self.engine is None:
+            return crop_probs, season_pred, self.yield_model.predict(features_scaled), None
+        
+        # Per-tree yields from sklearn's leaf indices, gathered from the flat leaf values
+        forest = self.engine.forests['yield_model']
+        tree_values = forest.leaf_value[forest.roots[:, np.newaxis] + self.yield_model.apply(features_scaled).T]
+        yield_pred = sum_trees(tree_values)[:, 0] / forest.n_trees
+        return crop_probs, season_pred, yield_pred, tree_quantiles(tree_values, YIELD_QUANTILES)[:, :, 0]
     
     def save_model(self, filename='crop_recommendation_model.pkl'):
         """Save the trained model"""
@@ -157,16 +573,77 @@ class CropRecommendationModel:
             'yield_model': self.yield_model,
             'crop_classifier': self.crop_classifier,
             'season_classifier': self.season_classifier,
+            'joint_labels': None if self.joint_labels is None else self.joint_labels.pairs,
             'scaler': self.scaler,
-            'label_encoders': self.label_encoders
+            'label_encoders': self.label_encoders,
+            'backend': self.backend,
+            'metrics': self.metrics,
+            'record_index': self.record_index,
+            'drift_reference': self.drift_reference,
         }
         
         with open(filename, 'wb') as f:
             pickle.dump(model_data, f)
         print(f"Model saved as {filename}")
     
+    def save_artifact(self, path='crop_recommendation_model', metadata=None):
+        """Save the trained model as a versioned, memory-mappable artifact directory"""
+        if not self.supports_engine():
+            raise ValueError(f"Model artifacts only support forest backends, not {self.backend!r}")
+        metadata = dict(metadata or {}, backend=self.backend, metrics=self.metrics,
+                        drift_reference=self.drift_reference)
+        manifest = model_artifact.save_artifact(self, path, metadata=metadata)
+        print(f"Model artifact saved to {path} (model id {manifest['model_id']})")
+        return manifest
+    
     def load_model(self, filename='crop_recommendation_model.pkl'):
-        """Load the trained model"""
+        """Load the trained model from a pickle file, an artifact directory or an ONNX graph"""
+        if filename.endswith('.onnx'):
+            # Serving only: no sklearn estimators, every prediction runs through onnxruntime
+            metadata = self.use_onnx(filename).metadata
+            # Drop the estimators and the artifact they are rebuilt from, so
+            # nothing falls back to a previously loaded model
+            for name in model_artifact.FOREST_NAMES:
+                setattr(self, name, None)
+            self.scaler = StandardScaler()
+            self.engine = None
+            self._artifact = None
+            self.joint_labels = None
+            self.joint = False
+            self.label_encoders = model_artifact.rebuild_label_encoders(metadata)
+            self.backend = metadata.get('backend', 'random_forest')
+            self.metrics = metadata.get('metrics', {})
+            self.record_index = None
+            self.drift_reference = metadata.get('drift_reference')
+            self._set_model_version(metadata['model_version'])
+            print(f"Model loaded from {filename} (model id {metadata['model_version']})")
+            return
+        
+        if os.path.isdir(filename):
+            manifest, arrays = model_artifact.load_artifact(filename)
+            # Inference runs on the memory-mapped arrays; sklearn forests are rebuilt on first access
+            self._artifact = (manifest, arrays)
+            self.onnx = None
+            for name in model_artifact.FOREST_NAMES:
+                self.__dict__.pop(name, None)
+            self.scaler = model_artifact.rebuild_scaler(manifest)
+            # Joint models have no season forest
+            self.engine = FusedPredictor.from_artifact(manifest, arrays)
+            self.label_encoders = model_artifact.rebuild_label_encoders(manifest)
+            self.joint_labels = None
+            if 'joint_labels' in manifest:
+                self.joint_labels = JointLabels(manifest['joint_labels'], len(self.label_encoders['crop'].classes_),
+                                                len(self.label_encoders['season'].classes_))
+                self.season_classifier = None
+            self.joint = self.joint_labels is not None
+            self.backend = manifest['metadata'].get('backend', 'random_forest')
+            self.metrics = manifest['metadata'].get('metrics', {})
+            self.record_index = RecordIndex(arrays['record_index']) if 'record_index' in arrays else None
+            self.drift_reference = manifest['metadata'].get('drift_reference')
+            self._set_model_version(manifest['model_id'])
+            print(f"Model loaded from {filename} (model id {manifest['model_id']})")
+            return
+        
         with open(filename, 'rb') as f:
             model_data = pickle.load(f)
         
@@ -175,33 +652,81 @@ class CropRecommendationModel:
         self.season_classifier = model_data['season_classifier']
         self.scaler = model_data['scaler']
         self.label_encoders = model_data['label_encoders']
+        self.joint_labels = None
+        if model_data.get('joint_labels') is not None:
+            self.joint_labels = JointLabels(model_data['joint_labels'], len(self.label_encoders['crop'].classes_),
+                                            len(self.label_encoders['season'].classes_))
+        self.joint = self.joint_labels is not None
+        self.backend = model_data.get('backend', 'random_forest')
+        self.metrics = model_data.get('metrics', {})
+        self.record_index = model_data.get('record_index')
+        self.drift_reference = model_data.get('drift_reference')
+        self._artifact = None
+        self.onnx = None
+        self.compile_engine()
+        self._set_model_version(model_artifact.file_sha256(filename)[:16])
         print(f"Model loaded from {filename}")
 
 def main():
     """Main function to train and test the model"""
+    parser = argparse.ArgumentParser(description="Train the crop recommendation model")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Core budget for training (-1 for all cores; default trains on one core)")
+    parser.add_argument('--backend', default='random_forest', choices=sorted(ESTIMATOR_BACKENDS),
+                        help="Estimator backend for the three models")
+    parser.add_argument('--deduplicate', action='store_true',
+                        help="Train each model on unique rows weighted by their counts (changes the fitted model)")
+    parser.add_argument('--joint', action='store_true',
+                        help="Predict crop and season with one classifier over (crop, season) pairs")
+    parser.add_argument('--cv-folds', type=int, default=0,
+                        help=f"Folds of a cross-validation stored with the model, e.g. {DEFAULT_N_SPLITS} "
+                             "(default 0 skips it)")
+    parser.add_argument('--out-of-core', metavar='DATASET',
+                        help="Train by chunked bagging on a Parquet dataset directory or CSV too large for memory")
+    parser.add_argument('--max-samples', type=int, default=DEFAULT_MAX_SAMPLES,
+                        help="Bootstrap rows per tree when training out of core")
+    parser.add_argument('--trees-per-group', type=int, default=DEFAULT_TREES_PER_GROUP,
+                        help="Trees fit per worker pass over the dataset when training out of core")
+    args = parser.parse_args()
+    
     print("Crop Recommendation Model Training...")
     
     # Initialize model
-    model = CropRecommendationModel()
-    
-    # Load data
-    df = model.load_data()
-    if df is None:
-        print("Failed to load data")
-        return
-    
-    print(f"Loaded {len(df)} records")
-    print(f"Available crops: {df['Crop'].unique()}")
-    print(f"Available seasons: {df['Crop_Type'].unique()}")
+    model = CropRecommendationModel(backend=args.backend, joint=args.joint)
     
-    # Prepare data
-    X, y_yield, y_crop, y_season, feature_columns = model.prepare_data(df)
-    
-    # Train models
-    model.train_models(X, y_yield, y_crop, y_season)
+    if args.out_of_core:
+        # Streams the dataset; cross-validation needs it in memory and is skipped
+        model.train_out_of_core(args.out_of_core, n_jobs=args.jobs, max_samples=args.max_samples,
+                                trees_per_group=args.trees_per_group)
+    else:
+        # Load data
+        df = model.load_data()
+        if df is None:
+            print("Failed to load data")
+            return
+        
+        print(f"Loaded {len(df)} records")
+        print(f"Available crops: {df['Crop'].unique()}")
+        print(f"Available seasons: {df['Crop_Type'].unique()}")
+        
+        # Prepare data
+        X, y_yield, y_crop, y_season, feature_columns = model.prepare_data(df)
+        
+        # Train models
+        model.train_models(X, y_yield, y_crop, y_season, n_jobs=args.jobs, deduplicate=args.deduplicate)
+        # Cross-validation evaluates separate crop and season forests, so joint models skip it
+        if args.cv_folds and not args.joint:
+            model.cross_validate(X, y_yield, y_crop, y_season, n_splits=args.cv_folds, n_jobs=args.jobs,
+                                 deduplicate=args.deduplicate)
     
     # Save model
     model.save_model()
+    if model.supports_engine():
+        model.save_artifact()
+    elif os.path.isdir('crop_recommendation_model'):
+        # Loaders prefer the artifact, so an old one would shadow the new pickle
+        shutil.rmtree('crop_recommendation_model')
+        print("Removed stale model artifact crop_recommendation_model")
     
     # Test predictions
     print("\n" + "="*50)
@@ -0,0 +1,154 @@
+"""
+Parallel k-fold evaluation of the crop recommendation models
+
+Every (fold, model) pair is an independent task: scale the fold's training
+rows, fit the yield, crop or season model and score it on the held-out fold.
+With a core budget the tasks run in a process pool. The feature matrix and
+targets are placed in shared memory once, and each task attaches to them by
+name and receives only its fold number. Tasks never pickle the data.
+
+The summary (mean, standard deviation and per-fold values of the yield RMSE
+and the crop/season accuracies) is stored by CropRecommendationModel in its
+metrics, which are saved in the pickle and the artifact metadata.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from sklearn.metrics import accuracy_score, mean_squared_error
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import StandardScaler
+
+from data_pipeline import deduplicate_rows
+
+# Metric reported for each model
+CV_METRICS = {
+    'yield_model': 'yield_rmse',
+    'crop_classifier': 'crop_accuracy',
+    'season_classifier': 'season_accuracy',
+}
+
+DEFAULT_N_SPLITS = 5
+
+def fold_indices(n_rows, n_splits, fold, random_state=42):
+    """Train and test row indices of one fold of a shuffled k-fold split"""
+    splits = KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(np.arange(n_rows))
+    for i, (train_index, test_index) in enumerate(splits):
+        if i == fold:
+            return train_index, test_index
+    raise ValueError(f"fold {fold} out of range for {n_splits} splits")
+
+def evaluate_fold(arrays, name, backend, n_splits, fold, random_state=42, deduplicate=False):
+    """Fit one model on one fold's training rows, returning (score, seconds)
+
+    arrays maps 'X', 'yield_model', 'crop_classifier' and 'season_classifier'
+    to the feature matrix and the targets.
+    """
+    # Imported here: crop_recommendation_model imports this module
+    from crop_recommendation_model import make_estimator
+
+    start = time.perf_counter()
+    X, y = arrays['X'], arrays[name]
+    train_index, test_index = fold_indices(len(X), n_splits, fold, random_state)
+
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X[train_index])
+    X_test = scaler.transform(X[test_index])
+    y_train, sample_weight = y[train_index], None
+    if deduplicate:
+        X_train, y_train, sample_weight = deduplicate_rows(X_train, y_train)
+
+    task = 'regression' if name == 'yield_model' else 'classification'
+    estimator = make_estimator(backend, task, random_state=random_state)
+    estimator.fit(X_train, y_train, sample_weight=sample_weight)
+    y_pred = estimator.predict(X_test)
+
+    if task == 'regression':
+        score = float(np.sqrt(mean_squared_error(y[test_index], y_pred)))
+    else:
+        score = float(accuracy_score(y[test_index], y_pred))
+    return score, time.perf_counter() - start
+
+def _evaluate_shared(specs, name, backend, n_splits, fold, random_state, deduplicate):
+    # Worker side: attach to the parent's shared memory blocks by name
+    blocks = {key: shared_memory.SharedMemory(name=spec[0]) for key, spec in specs.items()}
+    arrays = {
+        key: np.ndarray(spec[1], dtype=spec[2], buffer=blocks[key].buf)
+        for key, spec in specs.items()
+    }
+    try:
+        return evaluate_fold(arrays, name, backend, n_splits, fold, random_state, deduplicate)
+    finally:
+        # The views must go before the blocks can be closed
+        del arrays
+        for block in blocks.values():
+            block.close()
+
+def _share(arrays):
+    """Copy arrays into new shared memory blocks, returning (blocks, specs)"""
+    blocks, specs = {}, {}
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks[key] = block
+        specs[key] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+def cross_validate(X, y_yield, y_crop, y_season, backend='random_forest', n_splits=DEFAULT_N_SPLITS,
+                   n_jobs=None, random_state=42, deduplicate=False):
+    """k-fold scores of the three models, with folds and models evaluated in parallel
+
+    n_jobs is the number of worker processes (-1 for all cores; None runs
+    the tasks in this process). Returns a summary dict with the mean, std
+    and per-fold scores of every metric.
+    """
+    arrays = {
+        'X': np.asarray(X, dtype=np.float64),
+        'yield_model': np.asarray(y_yield, dtype=np.float64),
+        'crop_classifier': np.asarray(y_crop),
+        'season_classifier': np.asarray(y_season),
+    }
+    tasks = [(name, fold) for fold in range(n_splits) for name in CV_METRICS]
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+
+    wall_start = time.perf_counter()
+    if n_jobs is None or n_jobs <= 1:
+        results = [
+            evaluate_fold(arrays, name, backend, n_splits, fold, random_state, deduplicate)
+            for name, fold in tasks
+        ]
+    else:
+        blocks, specs = _share(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+                futures = [
+                    pool.submit(_evaluate_shared, specs, name, backend, n_splits, fold, random_state, deduplicate)
+                    for name, fold in tasks
+                ]
+                results = [future.result() for future in futures]
+        finally:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+    wall = time.perf_counter() - wall_start
+
+    scores = {metric: [None] * n_splits for metric in CV_METRICS.values()}
+    task_seconds = 0.0
+    for (name, fold), (score, seconds) in zip(tasks, results):
+        scores[CV_METRICS[name]][fold] = score
+        task_seconds += seconds
+
+    summary = {'n_splits': n_splits, 'backend': backend}
+    for metric, values in scores.items():
+        summary[metric] = {'mean': float(np.mean(values)), 'std': float(np.std(values)), 'folds': values}
+
+    print(f"{n_splits}-fold cross-validation ({len(tasks)} tasks, n_jobs={n_jobs}): "
+          f"wall {wall:.2f}s, task time {task_seconds:.2f}s")
+    for metric in CV_METRICS.values():
+        print(f"  {metric:16s} {summary[metric]['mean']:.4f} +/- {summary[metric]['std']:.4f}")
+    return summary
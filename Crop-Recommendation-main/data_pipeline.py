@@ -0,0 +1,280 @@
+"""
+Data preprocessing stages for the crop recommendation training data
+
+The cleaned, feature-engineered frame is cached as an uncompressed Feather
+(Arrow) file keyed by the SHA-256 of the source CSV, so unchanged data is
+reloaded without parsing. Caching needs pyarrow; without it the CSV is
+parsed on every load.
+
+Multi-state data too large for one DataFrame is streamed with
+iter_crop_chunks: the CSVs are read in chunks with explicit dtypes, filtered
+by state/season/crop during the read and cleaned per chunk. The chunks can be
+written as an on-disk Parquet dataset (write_columnar_dataset) or reduced to a
+bounded-size training sample (sample_crop_data), and iter_dataset_chunks
+streams either kind of dataset back for out-of-core training.
+
+Usage:
+    python data_pipeline.py INPUT.csv [...] --output DATASET_DIR [--states ...] [--seasons ...] [--crops ...]
+    python data_pipeline.py INPUT.csv [...] --sample 100000 --sample-output sample.feather
+"""
+
+import argparse
+import glob
+import os
+import numpy as np
+import pandas as pd
+
+from model_artifact import file_sha256
+
+DATA_FILE = 'Andhra_Pradesh_Crop_Production_with_Yield.csv'
+DATA_CACHE_DIR = '.data_cache'
+
+# Text columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['State_Name', 'Crop_Type', 'Crop']
+
+# Columns that are not model inputs or targets and can be stored as float32;
+# features and the yield target keep float64 so training is unchanged
+FLOAT32_COLUMNS = ['Production_in_quintals', 'Area_in_acres']
+
+def clean_crop_data(df):
+    """Clean a raw crop production frame and add the engineered features"""
+    # Clean column names
+    df.columns = df.columns.str.strip()
+    
+    # Remove any unnamed columns
+    df = df.drop(columns=[col for col in df.columns if 'Unnamed' in col], errors='ignore')
+    
+    # Convert yield to numeric, handling any non-numeric values
+    df['Yield_quintals_per_acre'] = pd.to_numeric(df['Yield_quintals_per_acre'], errors='coerce')
+    
+    # Drop rows with missing values
+    df = df.dropna()
+    
+    # Create additional features
+    df['NPK_ratio'] = df['N'] / (df['P'] + df['K'])
+    df['total_nutrients'] = df['N'] + df['P'] + df['K']
+    
+    return df
+
+def compact_dtypes(df):
+    """Shrink a cleaned frame: categoricals for text, smallest ints, float32 extras"""
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype('category')
+        elif col in FLOAT32_COLUMNS:
+            df[col] = df[col].astype(np.float32)
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+# Explicit dtypes of the production CSVs, so chunks never fall back to
+# inferred object columns. Yield is read as text and coerced by clean_crop_data.
+CSV_DTYPES = {
+    'State_Name': str,
+    'Crop_Type': str,
+    'Crop': str,
+    'N': np.float64,
+    'P': np.float64,
+    'K': np.float64,
+    'pH': np.float64,
+    'rainfall': np.float64,
+    'temperature': np.float64,
+    'Production_in_quintals': np.float32,
+    'Area_in_acres': np.float32,
+    'Yield_quintals_per_acre': str,
+}
+
+DEFAULT_CHUNK_SIZE = 200_000
+
+def _arrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def load_crop_data(path=DATA_FILE, cache_dir=DATA_CACHE_DIR):
+    """Load the cleaned, feature-engineered crop frame, reusing the cache if the source is unchanged"""
+    if os.path.isdir(path):
+        return load_columnar_dataset(path)
+    if cache_dir is None or not _arrow_available():
+        return compact_dtypes(clean_crop_data(pd.read_csv(path))).reset_index(drop=True)
+    
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, f'{stem}-{file_sha256(path)[:16]}.feather')
+    if os.path.exists(cache_path):
+        return pd.read_feather(cache_path)
+    
+    df = compact_dtypes(clean_crop_data(pd.read_csv(path))).reset_index(drop=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write under a temporary name so concurrent loaders never see a partial file
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    df.to_feather(tmp_path, compression='uncompressed')
+    os.replace(tmp_path, cache_path)
+    return df
+
+def load_columnar_dataset(path):
+    """Load an on-disk Parquet dataset written by write_columnar_dataset"""
+    return compact_dtypes(pd.read_parquet(path)).reset_index(drop=True)
+
+def _normalize(values):
+    return None if values is None else {str(value).strip().lower() for value in values}
+
+def iter_crop_chunks(paths, states=None, seasons=None, crops=None, chunksize=DEFAULT_CHUNK_SIZE):
+    """Yield cleaned, feature-engineered chunks of one or more production CSVs
+
+    Only rows whose State_Name, Crop_Type and Crop are in states, seasons and
+    crops (case-insensitive; None keeps everything) are kept. Filtering
+    happens per chunk before cleaning, so memory is bounded by chunksize.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    filters = {
+        'State_Name': _normalize(states),
+        'Crop_Type': _normalize(seasons),
+        'Crop': _normalize(crops),
+    }
+    
+    for path in paths:
+        # Raw header names may carry whitespace; map the explicit dtypes onto them
+        header = pd.read_csv(path, nrows=0).columns
+        dtypes = {raw: CSV_DTYPES[raw.strip()] for raw in header if raw.strip() in CSV_DTYPES}
+        usecols = [raw for raw in header if 'Unnamed' not in raw]
+        
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=dtypes, usecols=usecols):
+            chunk.columns = chunk.columns.str.strip()
+            for col, allowed in filters.items():
+                if allowed is not None:
+                    chunk = chunk[chunk[col].str.strip().str.lower().isin(allowed)]
+            if len(chunk):
+                yield compact_dtypes(clean_crop_data(chunk))
+
+def iter_dataset_chunks(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """Yield cleaned chunks of an on-disk dataset: a Parquet dataset directory or production CSVs
+
+    Chunk boundaries only depend on the files and chunksize, so every pass
+    over the same dataset sees the same chunks in the same order.
+    """
+    if isinstance(path, str) and os.path.isdir(path):
+        if not _arrow_available():
+            raise ImportError("Reading a columnar dataset requires pyarrow (pip install pyarrow)")
+        import pyarrow.parquet as pq
+        for part in sorted(glob.glob(os.path.join(path, 'part-*.parquet'))):
+            for batch in pq.ParquetFile(part).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+    else:
+        yield from iter_crop_chunks(path, chunksize=chunksize)
+
+def write_columnar_dataset(chunks, path):
+    """Write chunks as numbered Parquet part files under path, returning the row count"""
+    if not _arrow_available():
+        raise ImportError("Writing a columnar dataset requires pyarrow (pip install pyarrow)")
+    
+    os.makedirs(path, exist_ok=True)
+    for old_part in glob.glob(os.path.join(path, 'part-*.parquet')):
+        os.remove(old_part)
+    
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        # Plain strings, so part files do not carry conflicting category sets
+        chunk = chunk.astype({col: str for col in CATEGORICAL_COLUMNS if col in chunk.columns})
+        chunk.reset_index(drop=True).to_parquet(os.path.join(path, f'part-{i:05d}.parquet'), index=False)
+        rows += len(chunk)
+    return rows
+
+def sample_crop_data(chunks, sample_size, random_state=42):
+    """Uniform reservoir sample of at most sample_size rows across all chunks
+
+    Every row gets a random key and the rows with the smallest keys are kept,
+    so memory stays bounded by sample_size + one chunk. The returned frame has
+    a 'sample_weight' column: the number of source rows each sampled row
+    stands for (rows seen / rows sampled).
+    """
+    rng = np.random.default_rng(random_state)
+    sample, keys = None, np.empty(0)
+    rows_seen = 0
+    
+    for chunk in chunks:
+        rows_seen += len(chunk)
+        chunk_keys = rng.random(len(chunk))
+        if sample is None:
+            sample, keys = chunk, chunk_keys
+        else:
+            sample = pd.concat([sample, chunk], ignore_index=True)
+            keys = np.concatenate([keys, chunk_keys])
+        if len(sample) > sample_size:
+            keep = np.sort(np.argpartition(keys, sample_size - 1)[:sample_size])
+            sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+    
+    if sample is None:
+        return pd.DataFrame(columns=list(CSV_DTYPES) + ['NPK_ratio', 'total_nutrients', 'sample_weight'])
+    sample = compact_dtypes(sample.reset_index(drop=True))
+    sample['sample_weight'] = rows_seen / len(sample)
+    return sample
+
+def deduplicate_rows(X, y, sample_weight=None):
+    """Collapse identical (features, target) rows into unique weighted rows
+
+    Returns (X_unique, y_unique, weights) where weights counts how many input
+    rows (or how much input sample_weight) each unique row stands for.
+
+    The weighted rows are not equivalent for every estimator: a random
+    forest bootstraps over the unique rows and only weights the split
+    criterion, so its trees, and its predictions, change.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    rows = np.column_stack([X, y.astype(np.float64)])
+
+    unique_rows, inverse = np.unique(rows, axis=0, return_inverse=True)
+    weights = np.bincount(inverse.ravel(), weights=sample_weight, minlength=len(unique_rows))
+    return unique_rows[:, :-1], unique_rows[:, -1].astype(y.dtype), weights
+
+def compress_training_sets(X, targets, report=True):
+    """Deduplicate the training rows of each model against its own target
+
+    targets maps model name -> target vector. Returns a dict of
+    (X_unique, y_unique, sample_weight) per model and prints the compression
+    ratio of each.
+    """
+    datasets = {}
+    if report:
+        print("Deduplicated training rows:")
+    for name, y in targets.items():
+        X_unique, y_unique, weights = deduplicate_rows(X, y)
+        datasets[name] = (X_unique, y_unique, weights)
+        if report:
+            print(f"  {name:18s} {len(X):7d} -> {len(X_unique):7d} rows ({len(X) / len(X_unique):5.1f}x)")
+    return datasets
+
+def main():
+    """Stream production CSVs into a columnar dataset or a training sample"""
+    parser = argparse.ArgumentParser(description="Chunked loader for crop production CSVs")
+    parser.add_argument('inputs', nargs='+', help="Production CSV files")
+    parser.add_argument('--states', nargs='*', help="Keep only these states")
+    parser.add_argument('--seasons', nargs='*', help="Keep only these seasons (Crop_Type)")
+    parser.add_argument('--crops', nargs='*', help="Keep only these crops")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--output', help="Directory for the Parquet dataset")
+    parser.add_argument('--sample', type=int, help="Reservoir sample size")
+    parser.add_argument('--sample-output', default='crop_sample.feather', help="File for the sample")
+    args = parser.parse_args()
+    
+    if not args.output and not args.sample:
+        parser.error("pass --output and/or --sample")
+    
+    def chunks():
+        return iter_crop_chunks(args.inputs, states=args.states, seasons=args.seasons,
+                                crops=args.crops, chunksize=args.chunksize)
+    
+    if args.output:
+        rows = write_columnar_dataset(chunks(), args.output)
+        print(f"Wrote {rows} rows to {args.output}")
+    if args.sample:
+        sample = sample_crop_data(chunks(), args.sample)
+        sample.to_feather(args.sample_output)
+        print(f"Wrote a sample of {len(sample)} rows to {args.sample_output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Streaming drift monitor for the soil and climate inputs
+
+At training time build_reference summarises every raw input over the
+training rows as a histogram on quantile bin edges, so each bin holds about
+the same share of the training data. The reference is a few hundred numbers
+and is saved with the model (pickle, artifact metadata and ONNX metadata).
+
+At serving time DriftMonitor counts the incoming inputs in the same bins.
+Its memory is fixed: one (n_inputs, n_bins) array of counts, halved every
+half_life observations so that recent traffic dominates. Counting a request
+is one comparison against the edges and one increment per input, a few
+microseconds. metrics() compares the live histograms with the reference:
+
+    psi  population stability index, sum((live - ref) * ln(live / ref));
+         below 0.1 is stable, 0.1-0.25 a moderate and above 0.25 a major shift
+    ks   Kolmogorov-Smirnov statistic on the binned distributions: the largest
+         gap between the reference and live cumulative proportions
+
+Non-finite values (NaN, infinities) are left out of the histograms by both
+observe and observe_batch, and counted per input instead.
+
+Only NumPy is needed, so the monitor also runs in crop_inference processes.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+DEFAULT_BINS = 20
+
+# Observations after which the live counts are halved; None keeps them all
+DEFAULT_HALF_LIFE = 10000
+
+# PSI levels of the 'warning' and 'alert' statuses
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+# Proportion assumed for empty bins, so PSI stays finite
+PSI_EPSILON = 1e-4
+
+def bin_counts(inputs, edges):
+    """(n_inputs, n_bins) histogram of (n, n_inputs) inputs over per-input inner bin edges
+
+    A value falls in the bin numbered by how many edges lie strictly below
+    it; the first and last bins are open-ended. Non-finite values are not
+    counted.
+    """
+    inputs = np.asarray(inputs, dtype=np.float64).reshape(-1, len(edges))
+    n_bins = edges.shape[1] + 1
+    counts = np.empty((len(edges), n_bins))
+    for i, column_edges in enumerate(edges):
+        column = inputs[:, i]
+        bins = np.searchsorted(column_edges, column[np.isfinite(column)], side='left')
+        counts[i] = np.bincount(bins, minlength=n_bins)
+    return counts
+
+def build_reference(inputs, columns, n_bins=DEFAULT_BINS):
+    """Reference histograms of the raw (n, n_inputs) training inputs, as a JSON-serializable dict"""
+    inputs = np.asarray(inputs, dtype=np.float64)
+    # Inner edges at the training quantiles
+    edges = np.quantile(inputs, np.linspace(0, 1, n_bins + 1)[1:-1], axis=0).T
+    return {
+        'columns': list(columns),
+        'edges': edges.tolist(),
+        'counts': bin_counts(inputs, edges).tolist(),
+    }
+
+def drift_scores(live, reference):
+    """PSI and KS of each row of live counts against reference proportions, as two arrays"""
+    totals = live.sum(axis=1, keepdims=True)
+    live = live / np.where(totals > 0, totals, 1)
+    psi = ((live - reference) * np.log(np.maximum(live, PSI_EPSILON) / np.maximum(reference, PSI_EPSILON))).sum(axis=1)
+    ks = np.abs(np.cumsum(live, axis=1) - np.cumsum(reference, axis=1)).max(axis=1)
+    return psi, ks
+
+class DriftMonitor:
+    """Fixed-memory streaming histograms of the inputs, scored against a training reference"""
+
+    def __init__(self, reference, half_life=DEFAULT_HALF_LIFE):
+        self.columns = list(reference['columns'])
+        self.edges = np.asarray(reference['edges'], dtype=np.float64)
+        counts = np.asarray(reference['counts'], dtype=np.float64)
+        self.reference = counts / counts.sum(axis=1, keepdims=True)
+        self.half_life = half_life
+
+        self.counts = np.zeros_like(self.reference)
+        # Non-finite values per input since the last reset, left out of counts
+        self.non_finite = np.zeros(len(self.columns), dtype=np.int64)
+        # Per-request fast path: the bin of a value is the first upper edge at or
+        # above it, and its count is found in the flat view at row offset + bin
+        self._upper = np.column_stack([self.edges, np.full(len(self.edges), np.inf)])
+        self._flat_counts = self.counts.reshape(-1)
+        self._offsets = np.arange(len(self.columns)) * self.counts.shape[1]
+        # Streamlit sessions and server threads share one model
+        self._lock = threading.Lock()
+        self.observations = 0
+        self._since_halving = 0
+
+    def observe(self, inputs):
+        """Count one request's raw inputs, given in column order"""
+        values = np.asarray(inputs, dtype=np.float64)
+        positions = self._offsets + (values[:, np.newaxis] <= self._upper).argmax(axis=1)
+        # Cheap check first: the sum is only non-finite if a value is (or it overflows)
+        all_finite = math.isfinite(sum(values.tolist()))
+        with self._lock:
+            if all_finite:
+                self._flat_counts[positions] += 1
+            else:
+                finite = np.isfinite(values)
+                self._flat_counts[positions[finite]] += 1
+                self.non_finite += ~finite
+            self._count(1)
+
+    def observe_batch(self, inputs):
+        """Count the rows of an (n, n_inputs) array of raw inputs"""
+        inputs = np.asarray(inputs, dtype=np.float64).reshape(-1, len(self.columns))
+        counts = bin_counts(inputs, self.edges)
+        non_finite = (~np.isfinite(inputs)).sum(axis=0)
+        with self._lock:
+            self.counts += counts
+            self.non_finite += non_finite
+            self._count(len(inputs))
+
+    def _count(self, n):
+        # Called with self._lock held
+        self.observations += n
+        if self.half_life:
+            self._since_halving += n
+            while self._since_halving >= self.half_life:
+                self.counts *= 0.5
+                self._since_halving -= self.half_life
+
+    def reset(self):
+        """Forget all observations"""
+        with self._lock:
+            self.counts[:] = 0
+            self.non_finite[:] = 0
+            self.observations = 0
+            self._since_halving = 0
+
+    def metrics(self):
+        """Drift scores per input, with the inputs whose PSI reaches PSI_ALERT
+
+        Returns a dict with 'observations' (all requests counted since the
+        last reset), 'weight' (their decayed weight in the live histograms),
+        'features' (psi, ks, a stable/warning/alert status and the count of
+        non-finite values per input),
+        'max_psi' and 'drifted'.
+        """
+        with self._lock:
+            live = self.counts.copy()
+            non_finite = self.non_finite.tolist()
+            observations = self.observations
+        psi, ks = drift_scores(live, self.reference)
+        if observations == 0:
+            psi, ks = np.zeros_like(psi), np.zeros_like(ks)
+
+        features = {}
+        for column, column_psi, column_ks, column_non_finite in zip(self.columns, psi.tolist(), ks.tolist(),
+                                                                    non_finite):
+            status = 'alert' if column_psi >= PSI_ALERT else 'warning' if column_psi >= PSI_WARNING else 'stable'
+            features[column] = {'psi': column_psi, 'ks': column_ks, 'status': status,
+                                'non_finite': column_non_finite}
+        return {
+            'observations': observations,
+            'weight': float(live[0].sum()),
+            'features': features,
+            'max_psi': float(psi.max()),
+            'drifted': [column for column, scores in features.items() if scores['status'] == 'alert'],
+        }
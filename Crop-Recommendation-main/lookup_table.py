@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Precomputed recommendation table for offline and low-powered machines
+
+The build job evaluates a model once over a quantized grid of the six inputs
+(N, P, K, pH, rainfall, temperature; each axis is start:stop:step) and
+stores, for every grid cell, the top 3 crops, their probabilities, the
+season and the yield:
+
+    recommendation_table/
+        manifest.json       grid, crop and season names, model version,
+                            size and agreement with the model
+        crops.npy           (grid..., 3) crop codes
+        probabilities.npy   (grid..., 3) float32
+        season.npy          (grid...) season codes
+        yield.npy           (grid...) float32 yield before crop adjustment
+
+RecommendationTable memory-maps the arrays and answers predict_crops by
+direct index, in microseconds and with NumPy only. Inputs between grid
+points are answered according to mode:
+
+    'nearest'      the nearest grid cell (the default)
+    'interpolate'  multilinear interpolation over the 64 surrounding cells:
+                   crop probabilities and yield are weighted averages, the
+                   season is the weighted majority
+    'exact'        only exact grid points; any other input is off-grid
+
+Inputs outside the grid, and inputs off-grid in 'exact' mode, are passed to
+the fallback model (the full model) if one is given.
+
+Usage:
+    python lookup_table.py build [--model crop_recommendation_model] [--output recommendation_table]
+                                 [--grid N=0:200:25 rainfall=0:2000:100 ...] [--samples 2000]
+    python lookup_table.py report [--table recommendation_table] [--model crop_recommendation_model]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from crop_inference import INPUT_COLUMNS, YIELD_ADJUSTMENTS, CropPredictor
+
+TABLE_FORMAT = 'crop-recommendation-table'
+TABLE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# start, stop and step of every input axis: the Streamlit slider ranges, except
+# pH, which covers the agricultural range 4-9; other pH values go to the fallback
+DEFAULT_GRID = {
+    'N': (0.0, 200.0, 25.0),
+    'P': (0.0, 200.0, 25.0),
+    'K': (0.0, 200.0, 25.0),
+    'pH': (4.0, 9.0, 0.5),
+    'rainfall': (0.0, 2000.0, 250.0),
+    'temperature': (0.0, 50.0, 5.0),
+}
+
+MODES = ('nearest', 'interpolate', 'exact')
+
+# Grid positions closer than this to a grid point count as on it
+GRID_TOLERANCE = 1e-6
+
+# Grid cells evaluated per model call while building
+BUILD_CHUNK_ROWS = 65536
+
+# Corner offsets of a grid cell in all six dimensions, shape (64, 6)
+_CORNERS = np.array(list(itertools.product((0, 1), repeat=len(INPUT_COLUMNS))), dtype=np.int64)
+
+def grid_axes(grid):
+    """Values of every grid axis, in INPUT_COLUMNS order"""
+    axes = []
+    for column in INPUT_COLUMNS:
+        start, stop, step = grid[column]
+        axes.append(start + step * np.arange(int(round((stop - start) / step)) + 1))
+    return axes
+
+def load_model(path):
+    """CropPredictor for an artifact directory or ONNX graph, CropRecommendationModel for a pickle"""
+    if os.path.isdir(path) or path.endswith('.onnx'):
+        return CropPredictor(path)
+    from crop_recommendation_model import CropRecommendationModel
+    model = CropRecommendationModel()
+    model.load_model(path)
+    return model
+
+def _class_names(model):
+    if hasattr(model, 'crop_names'):
+        return model.crop_names, model.season_names
+    return model.label_encoders['crop'].classes_, model.label_encoders['season'].classes_
+
+def build_table(model, path, grid=None, samples=2000):
+    """Evaluate model over the grid and write the table directory, returning its manifest"""
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    axes = grid_axes(grid)
+    shape = tuple(len(axis) for axis in axes)
+    crop_names, season_names = _class_names(model)
+    crop_codes = {name: i for i, name in enumerate(crop_names)}
+    season_codes = {name: i for i, name in enumerate(season_names)}
+    crop_dtype = np.uint8 if len(crop_names) <= 256 else np.uint16
+
+    os.makedirs(path, exist_ok=True)
+    files = {
+        'crops': ('crops.npy', crop_dtype, shape + (3,)),
+        'probabilities': ('probabilities.npy', np.float32, shape + (3,)),
+        'season': ('season.npy', np.uint8, shape),
+        'yield': ('yield.npy', np.float32, shape),
+    }
+    arrays = {
+        name: np.lib.format.open_memmap(os.path.join(path, file), mode='w+', dtype=dtype, shape=array_shape)
+        for name, (file, dtype, array_shape) in files.items()
+    }
+    flat = {name: array.reshape((-1,) + array.shape[len(shape):]) for name, array in arrays.items()}
+
+    n_cells = int(np.prod(shape))
+    print(f"Evaluating {n_cells} grid cells {shape}...")
+    start_time = time.perf_counter()
+    for start in range(0, n_cells, BUILD_CHUNK_ROWS):
+        cells = np.arange(start, min(start + BUILD_CHUNK_ROWS, n_cells))
+        index = np.unravel_index(cells, shape)
+        inputs = np.column_stack([axis[i] for axis, i in zip(axes, index)])
+        result = model.predict_crops_batch(inputs, top_k=3)
+        flat['crops'][cells] = [[crop_codes[name] for name in row] for row in result['crop']]
+        flat['probabilities'][cells] = result['probability']
+        flat['season'][cells] = [season_codes[name] for name in result['season']]
+        flat['yield'][cells] = result['yield_pred']
+    for array in arrays.values():
+        array.flush()
+    build_seconds = time.perf_counter() - start_time
+    del arrays, flat
+
+    manifest = {
+        'format': TABLE_FORMAT,
+        'version': TABLE_VERSION,
+        'model_version': model.model_version,
+        'columns': list(INPUT_COLUMNS),
+        'grid': {column: list(grid[column]) for column in INPUT_COLUMNS},
+        'shape': list(shape),
+        'crop_names': [str(name) for name in crop_names],
+        'season_names': [str(name) for name in season_names],
+        'files': {name: file for name, (file, _, _) in files.items()},
+        'build_seconds': build_seconds,
+    }
+    with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    table = RecommendationTable(path)
+    manifest['size_bytes'] = table.nbytes
+    manifest['agreement'] = {mode: agreement(table, model, samples, mode) for mode in ('nearest', 'interpolate')}
+    with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def random_grid_inputs(table, n, seed=0):
+    """Uniform random inputs inside the grid's ranges, shape (n, 6)"""
+    rng = np.random.default_rng(seed)
+    low = table.start
+    high = table.start + table.step * (table.size - 1)
+    return rng.uniform(low, high, size=(n, len(INPUT_COLUMNS)))
+
+def agreement(table, model, samples=2000, mode='nearest', seed=0):
+    """How often the table agrees with the model on random inputs inside the grid"""
+    inputs = random_grid_inputs(table, samples, seed)
+    expected = model.predict_crops_batch(inputs, top_k=3)
+    actual = table.lookup_batch(inputs, mode=mode)
+    yield_error = np.abs(actual['yield_pred'] - expected['yield_pred'])
+    return {
+        'samples': samples,
+        'top1_crop': float(np.mean(actual['crop'][:, 0] == expected['crop'][:, 0])),
+        'top3_crops': float(np.mean([set(a) == set(e) for a, e in zip(actual['crop'], expected['crop'])])),
+        'season': float(np.mean(actual['season'] == expected['season'])),
+        'yield_mae': float(yield_error.mean()),
+        'yield_mape': float(np.mean(yield_error / np.maximum(np.abs(expected['yield_pred']), 1e-9))),
+    }
+
+class RecommendationTable:
+    """Memory-mapped precomputed recommendations, queried by grid index"""
+
+    def __init__(self, path='recommendation_table', fallback=None, mode='nearest', mmap_mode='r'):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}; choose from {', '.join(MODES)}")
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != TABLE_FORMAT:
+            raise ValueError(f"{path} is not a recommendation table")
+        if self.manifest.get('version', 0) > TABLE_VERSION:
+            raise ValueError(f"Table version {self.manifest['version']} is newer than supported version {TABLE_VERSION}")
+
+        self.path = path
+        self.fallback = fallback
+        self.mode = mode
+        self.model_version = self.manifest['model_version']
+        grid = np.array([self.manifest['grid'][column] for column in INPUT_COLUMNS], dtype=np.float64)
+        self.start, self.step = grid[:, 0], grid[:, 2]
+        self.size = np.array(self.manifest['shape'], dtype=np.int64)
+        self.crop_names = np.array(self.manifest['crop_names'], dtype=object)
+        self.season_names = np.array(self.manifest['season_names'], dtype=object)
+        self.multipliers = np.array([YIELD_ADJUSTMENTS.get(name.lower(), 1.0) for name in self.crop_names])
+        # Plain ndarray views of the memory maps: indexing a np.memmap is several times slower
+        self.arrays = {
+            name: np.asarray(np.load(os.path.join(path, file), mmap_mode=mmap_mode))
+            for name, file in self.manifest['files'].items()
+        }
+        # Python floats for the per-request path, where NumPy's overhead dominates six values
+        self._axes = list(zip(self.start.tolist(), self.step.tolist(), self.size.tolist()))
+        self.hits = 0
+        self.fallbacks = 0
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def stats(self):
+        """Table hits and fallback calls"""
+        lookups = self.hits + self.fallbacks
+        return {
+            'hits': self.hits,
+            'fallbacks': self.fallbacks,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size_bytes': self.nbytes,
+        }
+
+    def predict_crops(self, N, P, K, pH, rainfall, temperature):
+        """predict_crops from the table, or from the fallback model for off-grid inputs"""
+        inputs = (N, P, K, pH, rainfall, temperature)
+        if self.mode == 'interpolate':
+            result = self.lookup_batch([inputs])
+            on_grid = result['on_grid'][0]
+        else:
+            # The same range and exact-point tests as lookup_batch
+            cell = []
+            on_grid = True
+            for value, (start, step, size) in zip(inputs, self._axes):
+                position = (float(value) - start) / step
+                if not -GRID_TOLERANCE <= position <= size - 1 + GRID_TOLERANCE:
+                    on_grid = False
+                    break
+                index = min(max(round(position), 0), size - 1)
+                if self.mode == 'exact' and abs(position - index) > GRID_TOLERANCE:
+                    on_grid = False
+                    break
+                cell.append(index)
+
+        if not on_grid:
+            self.fallbacks += 1
+            if self.fallback is None:
+                raise ValueError(f"Inputs {inputs} are off the table's grid and there is no fallback model")
+            return self.fallback.predict_crops(N, P, K, pH, rainfall, temperature)
+        self.hits += 1
+
+        if self.mode == 'interpolate':
+            crops, probabilities = result['crop'][0], result['probability'][0]
+            season, yields = result['season'][0], result['yield_quintals_per_acre'][0]
+        else:
+            cell = tuple(cell)
+            codes = self.arrays['crops'][cell]
+            crops, probabilities = self.crop_names[codes], self.arrays['probabilities'][cell].tolist()
+            season = self.season_names[self.arrays['season'][cell]]
+            yields = (float(self.arrays['yield'][cell]) * self.multipliers[codes]).tolist()
+        return [
+            {
+                'crop': crop,
+                'probability': probability,
+                'yield_quintals_per_acre': crop_yield,
+                'estimated_yield_acres': crop_yield,  # For 1 acre
+                'season': season,
+            }
+            for crop, probability, crop_yield in zip(crops, probabilities, yields)
+        ]
+
+    def lookup_batch(self, inputs, mode=None):
+        """Columnar top-3 recommendations for an (n, 6) input array, like predict_crops_batch
+
+        Adds 'on_grid', which is False for rows the table cannot answer;
+        their other values are meaningless. There is no fallback here.
+        """
+        mode = mode or self.mode
+        inputs = np.asarray(inputs, dtype=np.float64).reshape(-1, len(INPUT_COLUMNS))
+        position = (inputs - self.start) / self.step
+        in_range = ((position >= -GRID_TOLERANCE) & (position <= self.size - 1 + GRID_TOLERANCE)).all(axis=1)
+        # Rows out of range are never answered; any in-range position keeps the indexing below valid
+        position = np.where(in_range[:, np.newaxis], position, 0.0)
+
+        if mode != 'interpolate':
+            index = np.clip(np.rint(position), 0, self.size - 1).astype(np.int64)
+            on_grid = in_range
+            if mode == 'exact':
+                on_grid = on_grid & (np.abs(position - np.rint(position)) <= GRID_TOLERANCE).all(axis=1)
+            cell = tuple(index.T)
+            codes = self.arrays['crops'][cell]
+            probabilities = self.arrays['probabilities'][cell].astype(np.float64)
+            season_codes = self.arrays['season'][cell]
+            yield_pred = self.arrays['yield'][cell].astype(np.float64)
+        else:
+            codes, probabilities, season_codes, yield_pred = self._interpolate(position)
+            on_grid = in_range
+
+        return {
+            'crop': self.crop_names[codes],
+            'probability': probabilities,
+            'yield_quintals_per_acre': yield_pred[:, np.newaxis] * self.multipliers[codes],
+            'season': self.season_names[season_codes],
+            'yield_pred': yield_pred,
+            'on_grid': on_grid,
+        }
+
+    def _interpolate(self, position):
+        """Multilinear blend of the 64 cells around every position"""
+        n = len(position)
+        position = np.clip(position, 0, self.size - 1)
+        lower = np.minimum(np.floor(position), np.maximum(self.size - 2, 0)).astype(np.int64)
+        fraction = position - lower
+        # (n, 64, 6) corner indices and (n, 64) weights
+        corners = np.minimum(lower[:, np.newaxis, :] + _CORNERS, self.size - 1)
+        weights = np.where(_CORNERS, fraction[:, np.newaxis, :], 1 - fraction[:, np.newaxis, :]).prod(axis=2)
+        cells = tuple(corners.reshape(-1, len(INPUT_COLUMNS)).T)
+
+        rows = np.repeat(np.arange(n), len(_CORNERS))
+        flat_weights = weights.ravel()
+        yield_pred = (self.arrays['yield'][cells] * flat_weights).reshape(n, -1).sum(axis=1)
+
+        # Weighted probability of every crop over the corners' top 3 lists, then a new top 3
+        scores = np.zeros((n, len(self.crop_names)))
+        np.add.at(scores, (rows[:, np.newaxis], self.arrays['crops'][cells]),
+                  self.arrays['probabilities'][cells] * flat_weights[:, np.newaxis])
+        codes = np.argsort(-scores, axis=1, kind='stable')[:, :3]
+        probabilities = np.take_along_axis(scores, codes, axis=1)
+
+        season_scores = np.zeros((n, len(self.season_names)))
+        np.add.at(season_scores, (rows, self.arrays['season'][cells]), flat_weights)
+        return codes, probabilities, np.argmax(season_scores, axis=1), yield_pred
+
+def parse_grid(specs):
+    """{column: (start, stop, step)} from COLUMN=START:STOP:STEP strings"""
+    grid = {}
+    for spec in specs or []:
+        column, _, values = spec.partition('=')
+        if column not in INPUT_COLUMNS:
+            raise ValueError(f"Unknown input {column!r}; choose from {', '.join(INPUT_COLUMNS)}")
+        start, stop, step = (float(value) for value in values.split(':'))
+        grid[column] = (start, stop, step)
+    return grid
+
+def print_report(manifest):
+    shape = manifest['shape']
+    print(f"Table: {int(np.prod(shape))} cells {tuple(shape)}, {manifest['size_bytes'] / 1e6:.1f} MB, "
+          f"model {manifest['model_version']}, built in {manifest['build_seconds']:.1f}s")
+    for mode, scores in manifest['agreement'].items():
+        print(f"  {mode:12s} agreement on {scores['samples']} random inputs: top-1 crop {scores['top1_crop']:.1%}, "
+              f"top-3 set {scores['top3_crops']:.1%}, season {scores['season']:.1%}, "
+              f"yield MAE {scores['yield_mae']:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed crop recommendation table")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Evaluate the model over a grid and save the table")
+    build_parser.add_argument('--model', default='crop_recommendation_model',
+                              help="Artifact directory (preferred), ONNX graph or pickle file")
+    build_parser.add_argument('--output', default='recommendation_table')
+    build_parser.add_argument('--grid', nargs='*', help="Axes to change, as COLUMN=START:STOP:STEP")
+    build_parser.add_argument('--samples', type=int, default=2000, help="Random inputs for the agreement check")
+
+    report_parser = subparsers.add_parser('report', help="Size, agreement and query latency of a table")
+    report_parser.add_argument('--table', default='recommendation_table')
+    report_parser.add_argument('--model', default='crop_recommendation_model')
+    report_parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        manifest = build_table(load_model(args.model), args.output, parse_grid(args.grid), args.samples)
+        print_report(manifest)
+        return
+
+    model = load_model(args.model)
+    table = RecommendationTable(args.table, fallback=model)
+    print_report(table.manifest)
+    if table.model_version != model.model_version:
+        print(f"Warning: the table was built from model {table.model_version}, not {model.model_version}")
+
+    requests = [tuple(row) for row in random_grid_inputs(table, args.requests, seed=1)]
+    print(f"\nPer-request latency over {args.requests} requests (median):")
+    for label, predict in [('model', model.predict_crops)] + [
+        (f'table, {mode}', RecommendationTable(args.table, mode=mode).predict_crops) for mode in ('nearest', 'interpolate')
+    ]:
+        timings = []
+        for row in requests:
+            start = time.perf_counter()
+            predict(*row)
+            timings.append(time.perf_counter() - start)
+        print(f"  {label:20s} {np.median(timings) * 1e6:8.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Versioned on-disk artifact for the crop recommendation model
+
+An artifact is a directory with a JSON manifest plus one raw .npy file per
+tree array. The tree arrays of all forests are flattened (all trees of a
+forest concatenated, child indices made global) so that they can be opened
+with np.load(mmap_mode='r') and shared between processes through the page
+cache instead of every process unpickling a private copy. The fused
+traversal arrays of the inference engine (tree_engine.fuse_forests) are
+stored as well, so serving copies none of the tree arrays.
+
+This module only needs NumPy at import time; scikit-learn is imported lazily
+when estimators are rebuilt from an artifact.
+"""
+
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+ARTIFACT_FORMAT = 'crop-recommendation-artifact'
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# Forests stored in an artifact, in the order they are written
+FOREST_NAMES = ['yield_model', 'crop_classifier', 'season_classifier']
+
+# Target column predicted by each forest
+FOREST_TARGETS = {
+    'yield_model': 'Yield_quintals_per_acre',
+    'crop_classifier': 'Crop',
+    'season_classifier': 'Crop_Type',
+}
+
+# Target of the crop forest of a joint model, which has no season forest
+JOINT_TARGET = 'Crop+Crop_Type'
+
+# sklearn uses this marker for the feature/threshold of leaf nodes
+TREE_UNDEFINED = -2
+
+def flatten_forest(forest):
+    """Flatten the trees of a fitted forest into concatenated node arrays
+
+    Child indices are global (offset by the tree's first node) and leaves
+    point to themselves, so a traversal can step every tree in lock-step.
+    'leaf_value' holds what each tree predicts at a node: the mean for
+    regressors, the normalized class distribution for classifiers.
+    """
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    node_counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int64)
+
+    left, right, feature, threshold = [], [], [], []
+    for tree, root in zip(trees, roots):
+        own_index = np.arange(tree.node_count, dtype=np.int64) + root
+        is_leaf = tree.children_left == -1
+        left.append(np.where(is_leaf, own_index, tree.children_left + root))
+        right.append(np.where(is_leaf, own_index, tree.children_right + root))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+
+    value = np.concatenate([tree.value for tree in trees])
+    if hasattr(forest, 'classes_'):
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        leaf_value = value[:, 0, :].copy()
+        normalizer = leaf_value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        leaf_value /= normalizer
+    else:
+        leaf_value = value[:, 0, :].copy()
+
+    return {
+        'roots': roots,
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'impurity': np.concatenate([tree.impurity for tree in trees]),
+        'n_node_samples': np.concatenate([tree.n_node_samples for tree in trees]).astype(np.int64),
+        'weighted_n_node_samples': np.concatenate([tree.weighted_n_node_samples for tree in trees]),
+        'missing_go_to_left': np.concatenate([tree.__getstate__()['nodes']['missing_go_to_left'] for tree in trees]).astype(np.uint8),
+        'value': value,
+        'leaf_value': leaf_value,
+    }
+
+def describe_forest(forest):
+    """Manifest entry with everything needed to rebuild a forest besides its arrays"""
+    entry = {
+        'estimator': type(forest).__name__,
+        'params': forest.get_params(),
+        'n_estimators': len(forest.estimators_),
+        'n_features_in': int(forest.n_features_in_),
+        'n_outputs': int(forest.n_outputs_),
+        'tree_estimator': type(forest.estimators_[0]).__name__,
+        'tree_max_features': int(forest.estimators_[0].max_features_),
+        'tree_random_states': [int(tree.random_state) for tree in forest.estimators_],
+        'node_counts': [int(tree.tree_.node_count) for tree in forest.estimators_],
+        'max_depths': [int(tree.tree_.max_depth) for tree in forest.estimators_],
+    }
+    if hasattr(forest, 'classes_'):
+        entry['classes'] = forest.classes_.tolist()
+    return entry
+
+def file_sha256(path):
+    """Hex SHA-256 digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _save_arrays(path, prefix, arrays):
+    """Write arrays as {prefix}.{name}.npy files, returning their manifest specs"""
+    specs = {}
+    for array_name, array in arrays.items():
+        filename = f'{prefix}.{array_name}.npy'
+        np.save(os.path.join(path, filename), np.ascontiguousarray(array))
+        specs[array_name] = {
+            'file': filename,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'sha256': file_sha256(os.path.join(path, filename)),
+        }
+    return specs
+
+def _load_arrays(path, specs, mmap_mode):
+    arrays = {}
+    for array_name, spec in specs.items():
+        array = np.load(os.path.join(path, spec['file']), mmap_mode=mmap_mode)
+        if list(array.shape) != spec['shape'] or array.dtype.str != spec['dtype']:
+            raise ValueError(f"{spec['file']} does not match the artifact manifest")
+        arrays[array_name] = array
+    return arrays
+
+def save_artifact(model, path, metadata=None):
+    """Write a trained CropRecommendationModel as a versioned artifact directory"""
+    from crop_inference import FEATURE_COLUMNS, INPUT_COLUMNS
+
+    os.makedirs(path, exist_ok=True)
+    joint_labels = getattr(model, 'joint_labels', None)
+
+    forests = {}
+    forest_arrays = {}
+    for name in FOREST_NAMES:
+        forest = getattr(model, name)
+        if forest is None:
+            continue
+        entry = describe_forest(forest)
+        entry['target'] = JOINT_TARGET if joint_labels is not None and name == 'crop_classifier' else FOREST_TARGETS[name]
+        forest_arrays[name] = flatten_forest(forest)
+        entry['arrays'] = _save_arrays(path, name, forest_arrays[name])
+        forests[name] = entry
+
+    scaler = model.scaler
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'version': ARTIFACT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'library_versions': _library_versions(),
+        'schema': {
+            'input_columns': list(INPUT_COLUMNS),
+            'feature_columns': list(FEATURE_COLUMNS),
+            'targets': dict(FOREST_TARGETS),
+        },
+        'scaler': {
+            'mean': scaler.mean_.tolist(),
+            'scale': scaler.scale_.tolist(),
+            'var': scaler.var_.tolist(),
+            'n_samples_seen': float(scaler.n_samples_seen_),
+        },
+        'label_encoders': {
+            name: encoder.classes_.tolist() for name, encoder in model.label_encoders.items()
+        },
+        'forests': forests,
+        'metadata': metadata or {},
+    }
+    if joint_labels is not None:
+        # (crop, season) code pair of every class of the joint crop forest
+        manifest['joint_labels'] = joint_labels.pairs.tolist()
+    # Fused traversal arrays, derived from the forests; not part of the model id
+    manifest['engine'] = {'forests': list(forests), 'arrays': _save_arrays(path, 'engine', _fuse(forest_arrays))}
+    # Historical records for similar_records; not part of the model id
+    if getattr(model, 'record_index', None) is not None:
+        manifest['record_index'] = {'arrays': _save_arrays(path, 'record_index', model.record_index.arrays)}
+    manifest['model_id'] = _model_id(manifest)
+
+    with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def _fuse(forest_arrays):
+    # Imported here: tree_engine imports this module
+    from tree_engine import FlatForest, fuse_forests
+    return fuse_forests({name: FlatForest(arrays, max_depth=0) for name, arrays in forest_arrays.items()})
+
+def _model_id(manifest):
+    """Content hash identifying the trained model, independent of when it was saved"""
+    content = {key: manifest[key] for key in ('schema', 'scaler', 'label_encoders', 'forests', 'joint_labels')
+               if key in manifest}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+
+def _library_versions():
+    versions = {'numpy': np.__version__}
+    try:
+        import sklearn
+        versions['sklearn'] = sklearn.__version__
+    except ImportError:
+        pass
+    return versions
+
+def read_manifest(path):
+    """Read and validate the manifest of an artifact directory"""
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a crop recommendation artifact")
+    if manifest.get('version', 0) > ARTIFACT_VERSION:
+        raise ValueError(
+            f"Artifact version {manifest['version']} is newer than supported version {ARTIFACT_VERSION}"
+        )
+    return manifest
+
+def load_artifact(path, mmap_mode='r'):
+    """Open an artifact directory, returning (manifest, arrays)
+
+    arrays maps forest name (and 'engine' and 'record_index' when the
+    artifact has them) -> array name -> ndarray. With the default mmap_mode='r' the arrays are
+    read-only memory maps backed by the page cache, so every process opening
+    the same artifact shares them.
+    """
+    manifest = read_manifest(path)
+
+    arrays = {}
+    for name, entry in manifest['forests'].items():
+        arrays[name] = _load_arrays(path, entry['arrays'], mmap_mode)
+    for section in ('engine', 'record_index'):
+        if section in manifest:
+            arrays[section] = _load_arrays(path, manifest[section]['arrays'], mmap_mode)
+    return manifest, arrays
+
+def rebuild_forest(entry, arrays):
+    """Rebuild a fitted sklearn forest from its manifest entry and flat arrays"""
+    from sklearn import ensemble, tree as sk_tree
+    from sklearn.tree._tree import Tree, NODE_DTYPE
+
+    forest = getattr(ensemble, entry['estimator'])(**entry['params'])
+    tree_class = getattr(sk_tree, entry['tree_estimator'])
+    tree_params = {param: entry['params'][param] for param in forest.estimator_params}
+    is_classifier = 'classes' in entry
+
+    n_features = entry['n_features_in']
+    n_outputs = entry['n_outputs']
+    n_classes = np.array([len(entry['classes']) if is_classifier else 1] * n_outputs, dtype=np.intp)
+
+    estimators = []
+    for root, node_count, max_depth, random_state in zip(
+        arrays['roots'], entry['node_counts'], entry['max_depths'], entry['tree_random_states']
+    ):
+        nodes_slice = slice(int(root), int(root) + node_count)
+        left = arrays['left'][nodes_slice].astype(np.intp)
+        is_leaf = left == np.arange(root, root + node_count)
+
+        nodes = np.zeros(node_count, dtype=NODE_DTYPE)
+        nodes['left_child'] = np.where(is_leaf, -1, left - root)
+        nodes['right_child'] = np.where(is_leaf, -1, arrays['right'][nodes_slice] - root)
+        nodes['feature'] = np.where(is_leaf, TREE_UNDEFINED, arrays['feature'][nodes_slice])
+        nodes['threshold'] = np.where(is_leaf, TREE_UNDEFINED, arrays['threshold'][nodes_slice])
+        nodes['impurity'] = arrays['impurity'][nodes_slice]
+        nodes['n_node_samples'] = arrays['n_node_samples'][nodes_slice]
+        nodes['weighted_n_node_samples'] = arrays['weighted_n_node_samples'][nodes_slice]
+        if 'missing_go_to_left' in NODE_DTYPE.names:
+            nodes['missing_go_to_left'] = arrays['missing_go_to_left'][nodes_slice]
+
+        tree_ = Tree(n_features, n_classes, n_outputs)
+        tree_.__setstate__({
+            'max_depth': max_depth,
+            'node_count': node_count,
+            'nodes': nodes,
+            'values': np.ascontiguousarray(arrays['value'][nodes_slice]),
+        })
+
+        estimator = tree_class(**dict(tree_params, random_state=random_state))
+        estimator.tree_ = tree_
+        estimator.n_features_in_ = n_features
+        estimator.n_outputs_ = n_outputs
+        estimator.max_features_ = entry['tree_max_features']
+        if is_classifier:
+            estimator.classes_ = np.arange(len(entry['classes']), dtype=np.float64)
+            estimator.n_classes_ = np.int64(len(entry['classes']))
+        estimators.append(estimator)
+
+    forest.estimator_ = tree_class(**{param: value for param, value in tree_params.items() if param != 'random_state'})
+    forest.estimators_ = estimators
+    forest.n_features_in_ = n_features
+    forest.n_outputs_ = n_outputs
+    if is_classifier:
+        forest.classes_ = np.array(entry['classes'])
+        forest.n_classes_ = len(entry['classes'])
+    return forest
+
+def rebuild_scaler(manifest):
+    """Rebuild the fitted StandardScaler recorded in a manifest"""
+    from sklearn.preprocessing import StandardScaler
+
+    spec = manifest['scaler']
+    scaler = StandardScaler()
+    scaler.feature_names_in_ = np.array(manifest['schema']['feature_columns'], dtype=object)
+    scaler.n_features_in_ = len(spec['mean'])
+    scaler.n_samples_seen_ = np.float64(spec['n_samples_seen'])
+    scaler.mean_ = np.array(spec['mean'])
+    scaler.var_ = np.array(spec['var'])
+    scaler.scale_ = np.array(spec['scale'])
+    return scaler
+
+def rebuild_label_encoders(manifest):
+    """Rebuild the fitted LabelEncoders recorded in a manifest"""
+    from sklearn.preprocessing import LabelEncoder
+
+    encoders = {}
+    for name, classes in manifest['label_encoders'].items():
+        encoder = LabelEncoder()
+        encoder.classes_ = np.array(classes, dtype=object)
+        encoders[name] = encoder
+    return encoders
+
+def artifact_size(path):
+    """Total size in bytes of the files in an artifact directory"""
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
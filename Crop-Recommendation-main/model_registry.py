@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Per-region model registry with lazy loading and a memory budget
+
+A registry is a directory holding one model artifact per region (a state or
+an agro-climatic zone) plus a registry.json index:
+
+    models/
+        registry.json            regions, their row counts and model ids,
+                                 and aliases mapping states to zones
+        andhra_pradesh/          artifact directory (see model_artifact)
+        telangana/
+
+ModelRegistry loads a region's model with crop_inference.CropPredictor on the
+first request for it and keeps recently used models resident while their
+total size fits in memory_budget bytes, evicting the least recently used
+ones. Serving needs NumPy only; train_registry (and the train command) need
+the training stack.
+
+Usage:
+    python model_registry.py train --root models [--data data.csv] [--states ...] [--zones zones.json]
+    python model_registry.py stats --root models [--budget-mb 512] REGION [REGION ...]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from crop_inference import CropPredictor
+
+REGISTRY_INDEX = 'registry.json'
+
+# Regions with fewer rows are not worth a model of their own
+DEFAULT_MIN_ROWS = 200
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+def region_key(name):
+    """Directory name of a region: lower case, words joined by underscores"""
+    return '_'.join(str(name).strip().lower().split())
+
+class ModelRegistry:
+    """Lazily loaded per-region models kept within a memory budget in LRU order"""
+
+    def __init__(self, root, memory_budget=DEFAULT_MEMORY_BUDGET, loader=CropPredictor):
+        self.root = root
+        self.memory_budget = memory_budget
+        self._loader = loader
+        with open(os.path.join(root, REGISTRY_INDEX)) as f:
+            index = json.load(f)
+        self.regions = index['regions']
+        self.aliases = index.get('aliases', {})
+
+        self._models = OrderedDict()  # region -> (model, nbytes)
+        self._lock = threading.Lock()
+        # One lock per region, so a slow load does not block other regions
+        self._load_locks = {region: threading.Lock() for region in self.regions}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def resolve(self, region):
+        """Registry region serving a state or zone name"""
+        key = region_key(region)
+        key = self.aliases.get(key, key)
+        if key not in self.regions:
+            raise KeyError(f"No model for region {region!r}; available: {sorted(self.regions)}")
+        return key
+
+    def get(self, region):
+        """The model of a region, loading it (and evicting others) if it is not resident"""
+        key = self.resolve(region)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        with self._load_locks[key]:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    return entry[0]
+
+            start = time.perf_counter()
+            model = self._loader(os.path.join(self.root, key))
+            nbytes = model.engine.nbytes
+            if model.record_index is not None:
+                nbytes += model.record_index.nbytes
+
+            with self._lock:
+                self.loads += 1
+                self.load_seconds += time.perf_counter() - start
+                self._models[key] = (model, nbytes)
+                self._evict_over_budget(keep=key)
+            return model
+
+    def predict_crops(self, region, N, P, K, pH, rainfall, temperature):
+        """predict_crops with the model of a region"""
+        return self.get(region).predict_crops(N, P, K, pH, rainfall, temperature)
+
+    def evict(self, region):
+        """Drop a region's model from memory, returning whether it was resident"""
+        with self._lock:
+            if self._models.pop(self.resolve(region), None) is None:
+                return False
+            self.evictions += 1
+            return True
+
+    def _evict_over_budget(self, keep):
+        # Called with self._lock held; the model just loaded always stays
+        while self.resident_bytes() > self.memory_budget and len(self._models) > 1:
+            region = next(iter(self._models))
+            if region == keep:
+                self._models.move_to_end(region)
+                continue
+            del self._models[region]
+            self.evictions += 1
+
+    def resident_bytes(self):
+        return sum(nbytes for _, nbytes in self._models.values())
+
+    def resident(self):
+        """Resident regions, least recently used first"""
+        with self._lock:
+            return list(self._models)
+
+    def stats(self):
+        """Hit/miss/load/eviction counters and resident memory"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'regions': len(self.regions),
+                'resident': len(self._models),
+                'resident_bytes': self.resident_bytes(),
+                'memory_budget': self.memory_budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'loads': self.loads,
+                'mean_load_ms': self.load_seconds / self.loads * 1e3 if self.loads else 0.0,
+                'evictions': self.evictions,
+            }
+
+def train_registry(df, root, regions=None, zones=None, min_rows=DEFAULT_MIN_ROWS, backend='random_forest'):
+    """Train and save one model artifact per region, then write the registry index
+
+    Rows are grouped by State_Name, or by zone when zones maps state names to
+    zone names. regions restricts training to some states or zones. Regions
+    with fewer than min_rows rows are skipped.
+    """
+    from crop_recommendation_model import CropRecommendationModel
+
+    states = df['State_Name'].astype(str).map(region_key)
+    aliases = {}
+    if zones:
+        zones = {region_key(state): region_key(zone) for state, zone in zones.items()}
+        aliases = {state: zone for state, zone in zones.items() if state != zone}
+        groups = states.map(lambda state: zones.get(state, state))
+    else:
+        groups = states
+    wanted = None if regions is None else {aliases.get(region_key(r), region_key(r)) for r in regions}
+
+    index_path = os.path.join(root, REGISTRY_INDEX)
+    index = {'regions': {}, 'aliases': {}}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+
+    os.makedirs(root, exist_ok=True)
+    for region in sorted(groups.unique()):
+        if wanted is not None and region not in wanted:
+            continue
+        region_df = df[(groups == region).to_numpy()].reset_index(drop=True)
+        if len(region_df) < min_rows:
+            print(f"Skipping {region}: {len(region_df)} rows (< {min_rows})")
+            continue
+
+        print(f"\n=== {region}: {len(region_df)} rows ===")
+        model = CropRecommendationModel(backend=backend)
+        X, y_yield, y_crop, y_season, _ = model.prepare_data(region_df)
+        model.train_models(X, y_yield, y_crop, y_season)
+        manifest = model.save_artifact(os.path.join(root, region), metadata={'region': region})
+        index['regions'][region] = {
+            'rows': len(region_df),
+            'states': sorted(states[(groups == region).to_numpy()].unique()),
+            'model_id': manifest['model_id'],
+        }
+
+    index['aliases'].update(aliases)
+    with open(index_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-region crop model registry")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help="Train one model per state or zone")
+    train_parser.add_argument('--root', default='models')
+    train_parser.add_argument('--data', default=None, help="CSV or Parquet dataset (default: the AP CSV)")
+    train_parser.add_argument('--states', nargs='*', help="Only these states or zones")
+    train_parser.add_argument('--zones', help="JSON file mapping state names to agro-climatic zones")
+    train_parser.add_argument('--min-rows', type=int, default=DEFAULT_MIN_ROWS)
+    train_parser.add_argument('--backend', default='random_forest')
+
+    stats_parser = subparsers.add_parser('stats', help="Load regions through the registry and print its metrics")
+    stats_parser.add_argument('--root', default='models')
+    stats_parser.add_argument('--budget-mb', type=float, default=DEFAULT_MEMORY_BUDGET / 2**20)
+    stats_parser.add_argument('regions', nargs='+', help="Regions to request, in order")
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        from data_pipeline import DATA_FILE, load_crop_data
+        df = load_crop_data(args.data or DATA_FILE)
+        zones = None
+        if args.zones:
+            with open(args.zones) as f:
+                zones = json.load(f)
+        index = train_registry(df, args.root, regions=args.states, zones=zones, min_rows=args.min_rows,
+                               backend=args.backend)
+        print(f"\nRegistry {args.root}: {', '.join(sorted(index['regions']))}")
+    else:
+        registry = ModelRegistry(args.root, memory_budget=int(args.budget_mb * 2**20))
+        for region in args.regions:
+            registry.predict_crops(region, 80, 40, 40, 5.5, 650, 29)
+        for key, value in registry.stats().items():
+            print(f"  {key:16s} {value}")
+        print(f"  {'resident (LRU)':16s} {', '.join(registry.resident())}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+ONNX export and onnxruntime inference for the crop recommendation model
+
+export_onnx writes the scaler and the three forests as one ONNX graph:
+
+    features (n, 8 double) -> scaled -> crop_probabilities (n, n_crops)
+                                     -> season_probabilities (n, n_seasons)
+                                     -> season (n,) class index
+                                     -> yield (n, 1)
+
+The trees are built from the flat arrays of the inference engine, so a model
+loaded from an artifact can be exported without scikit-learn. Scaled inputs
+are rounded to float32 and compared against double thresholds, which is how
+sklearn evaluates its trees. Probabilities and yields come out of the
+ensemble operators as float32, so they match sklearn to float32 precision.
+Label classes, the feature schema and the model version are stored in the
+graph's metadata, so OnnxPredictor needs only NumPy and onnxruntime.
+
+Exporting needs the onnx package, inference needs onnxruntime.
+"""
+
+import json
+
+import numpy as np
+
+# Opsets of the default and ai.onnx.ml domains used by the graph
+ONNX_OPSET = 17
+ONNX_ML_OPSET = 3
+
+# Key of the JSON metadata entry in the graph's metadata_props
+METADATA_KEY = 'crop_recommendation'
+
+# Graph output carrying each forest's averaged values
+FOREST_OUTPUTS = {
+    'yield_model': 'yield',
+    'crop_classifier': 'crop_probabilities',
+    'season_classifier': 'season_probabilities',
+}
+
+def _tree_ensemble_attributes(forest):
+    """TreeEnsembleRegressor attributes averaging a FlatForest's leaf values"""
+    n_nodes = len(forest.left)
+    roots = np.asarray(forest.roots, dtype=np.int64)
+    node_counts = np.diff(np.append(roots, n_nodes))
+    tree_ids = np.repeat(np.arange(len(roots)), node_counts)
+    local_ids = np.arange(n_nodes) - roots[tree_ids]
+
+    left = np.asarray(forest.left, dtype=np.int64)
+    is_leaf = left == np.arange(n_nodes)
+    right = np.asarray(forest.right, dtype=np.int64)
+    tree_roots = roots[tree_ids]
+
+    # One target entry per leaf and non-zero output
+    leaf_value = np.asarray(forest.leaf_value, dtype=np.float64)
+    leaves, targets = np.nonzero(is_leaf[:, np.newaxis] & (leaf_value != 0))
+
+    return {
+        'nodes_treeids': tree_ids.tolist(),
+        'nodes_nodeids': local_ids.tolist(),
+        'nodes_featureids': np.where(is_leaf, 0, forest.feature).tolist(),
+        'nodes_modes': np.where(is_leaf, 'LEAF', 'BRANCH_LEQ').tolist(),
+        # sklearn sends x <= threshold to the left child
+        'nodes_truenodeids': np.where(is_leaf, 0, left - tree_roots).tolist(),
+        'nodes_falsenodeids': np.where(is_leaf, 0, right - tree_roots).tolist(),
+        'nodes_missing_value_tracks_true': [0] * n_nodes,
+        'n_targets': leaf_value.shape[1],
+        'target_treeids': tree_ids[leaves].tolist(),
+        'target_nodeids': local_ids[leaves].tolist(),
+        'target_ids': targets.tolist(),
+        'aggregate_function': 'AVERAGE',
+        'post_transform': 'NONE',
+    }, np.where(is_leaf, 0.0, forest.threshold), leaf_value[leaves, targets]
+
+def export_onnx(model, path):
+    """Write the scaler and forests of a CropRecommendationModel as an ONNX graph"""
+    try:
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+    except ImportError:
+        raise ImportError("Exporting to ONNX requires onnx (pip install onnx)")
+    from crop_inference import FEATURE_COLUMNS, INPUT_COLUMNS
+
+    if model.engine is None:
+        raise ValueError(f"ONNX export only supports forest backends, not {model.backend!r}")
+    if model.joint_labels is not None:
+        raise ValueError("ONNX export does not support joint models")
+    forests = model.engine.forests
+
+    nodes = [
+        helper.make_node('Sub', ['features', 'mean'], ['centered']),
+        helper.make_node('Div', ['centered', 'scale'], ['scaled']),
+        # Trees compare float32 inputs against double thresholds, as in sklearn
+        helper.make_node('Cast', ['scaled'], ['scaled_float'], to=TensorProto.FLOAT),
+        helper.make_node('Cast', ['scaled_float'], ['tree_input'], to=TensorProto.DOUBLE),
+    ]
+    outputs = []
+    for name, output in FOREST_OUTPUTS.items():
+        attributes, thresholds, weights = _tree_ensemble_attributes(forests[name])
+        nodes.append(helper.make_node(
+            'TreeEnsembleRegressor', ['tree_input'], [f'{output}_float'], domain='ai.onnx.ml', name=name,
+            nodes_values_as_tensor=numpy_helper.from_array(thresholds.astype(np.float64)),
+            target_weights_as_tensor=numpy_helper.from_array(weights.astype(np.float64)),
+            **attributes,
+        ))
+        nodes.append(helper.make_node('Cast', [f'{output}_float'], [output], to=TensorProto.DOUBLE))
+        outputs.append(helper.make_tensor_value_info(output, TensorProto.DOUBLE, [None, attributes['n_targets']]))
+    # First maximum, like np.argmax
+    nodes.append(helper.make_node('ArgMax', ['season_probabilities'], ['season'], axis=1, keepdims=0))
+    outputs.append(helper.make_tensor_value_info('season', TensorProto.INT64, [None]))
+
+    graph = helper.make_graph(
+        nodes,
+        'crop_recommendation',
+        [helper.make_tensor_value_info('features', TensorProto.DOUBLE, [None, len(FEATURE_COLUMNS)])],
+        outputs,
+        initializer=[
+            numpy_helper.from_array(np.asarray(model.engine.mean, dtype=np.float64), 'mean'),
+            numpy_helper.from_array(np.asarray(model.engine.scale, dtype=np.float64), 'scale'),
+        ],
+    )
+    onnx_model = helper.make_model(graph, opset_imports=[
+        helper.make_opsetid('', ONNX_OPSET), helper.make_opsetid('ai.onnx.ml', ONNX_ML_OPSET),
+    ], producer_name='crop-recommendation')
+    onnx_model.ir_version = 8
+
+    metadata = {
+        'input_columns': list(INPUT_COLUMNS),
+        'feature_columns': list(FEATURE_COLUMNS),
+        'label_encoders': {name: encoder.classes_.tolist() for name, encoder in model.label_encoders.items()},
+        'forest_classes': {
+            name: forest.classes.tolist() for name, forest in forests.items() if forest.classes is not None
+        },
+        'model_version': model.model_version,
+        'backend': model.backend,
+        'metrics': model.metrics,
+        'drift_reference': model.drift_reference,
+    }
+    helper.set_model_props(onnx_model, {METADATA_KEY: json.dumps(metadata)})
+    onnx.checker.check_model(onnx_model)
+    onnx.save(onnx_model, path)
+    return onnx_model
+
+class OnnxPredictor:
+    """Run an exported crop recommendation graph with onnxruntime
+
+    predict_values has the same interface as tree_engine.FusedPredictor.
+    """
+
+    def __init__(self, path, intra_op_num_threads=0):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("ONNX inference requires onnxruntime (pip install onnxruntime)")
+
+        options = onnxruntime.SessionOptions()
+        # 0 lets onnxruntime use all physical cores for large batches
+        options.intra_op_num_threads = intra_op_num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.metadata = json.loads(self.session.get_modelmeta().custom_metadata_map[METADATA_KEY])
+        self.n_features = len(self.metadata['feature_columns'])
+        self.classes = {name: None for name in FOREST_OUTPUTS}
+        for name, classes in self.metadata['forest_classes'].items():
+            self.classes[name] = np.asarray(classes)
+
+    def validate(self, features):
+        """Check an (n, n_features) feature matrix"""
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if features.ndim != 2 or features.shape[1] != self.n_features:
+            raise ValueError(f"Expected features of shape (n, {self.n_features}), got {features.shape}")
+        if not np.isfinite(features).all():
+            raise ValueError("Features contain NaN or infinite values")
+        return np.ascontiguousarray(features)
+
+    def predict_values(self, features):
+        """Averaged outputs of every forest for raw (unscaled) features, keyed by forest name"""
+        names = list(FOREST_OUTPUTS)
+        results = self.session.run([FOREST_OUTPUTS[name] for name in names], {'features': self.validate(features)})
+        return dict(zip(names, results))
@@ -0,0 +1,95 @@
+"""
+Result cache for crop recommendations
+
+The Streamlit sliders produce integer N/P/K/rainfall/temperature and pH in
+0.1 steps, and the same combinations are submitted over and over. The cache
+keys results on the model version plus the inputs, keeps at most max_entries
+results in LRU order and expires entries after ttl seconds.
+
+By default the inputs are used exactly, so a cached result is always the one
+the model returns for those inputs. decimals (e.g. SLIDER_DECIMALS) opts into
+quantization: inputs are rounded for the key only, so every input in one
+rounding cell is answered with the result of the first one the model ran on.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Key order of the inputs
+INPUT_NAMES = ('N', 'P', 'K', 'pH', 'rainfall', 'temperature')
+
+# Decimal places matching the Streamlit slider steps, for opt-in quantization
+SLIDER_DECIMALS = {'N': 0, 'P': 0, 'K': 0, 'pH': 1, 'rainfall': 0, 'temperature': 0}
+
+class PredictionCache:
+    """Bounded LRU cache with a time-to-live, keyed on exact or quantized inputs"""
+
+    def __init__(self, max_entries=4096, ttl=3600.0, decimals=None, clock=time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.decimals = None if decimals is None else dict(decimals)
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        # Streamlit serves sessions from several threads sharing one model
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def quantize(self, **inputs):
+        """Inputs in INPUT_NAMES order, rounded to self.decimals if set"""
+        if self.decimals is None:
+            return tuple(float(inputs[name]) for name in INPUT_NAMES)
+        return tuple(float(round(inputs[name], self.decimals.get(name, 0))) for name in INPUT_NAMES)
+
+    def make_key(self, model_version, **inputs):
+        return (model_version,) + self.quantize(**inputs)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            expires_at = None if self.ttl is None else self._clock() + self.ttl
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Entry count and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,296 @@
+"""
+Non-blocking audit log of crop recommendations
+
+PredictionLogger.log() runs in the request path: it appends the request's
+timestamp, model version, inputs and top crops to a bounded in-memory ring
+buffer and returns, which costs a few microseconds. A background thread
+drains the buffer every flush_interval seconds, or as soon as batch_size
+records are waiting, and writes each batch as one row group of a Parquet
+file. Files are rotated after max_file_rows rows or max_file_seconds seconds
+and the oldest are deleted beyond max_files. Several processes (e.g. the
+pre-fork workers) may log to one directory and prune each other's files.
+
+A file is written under a hidden name (.predictions-...) and renamed to
+predictions-<time>-<pid>-<n>.parquet when it is closed, so pandas.read_parquet
+on the log directory only sees complete files. close(), which also runs
+at interpreter exit, flushes the buffer and closes the current file.
+
+The Parquet footer is only written when a file is closed, so a crash
+(SIGKILL, OOM kill, power loss) loses the records still in the buffer and
+the rows of the open hidden file. Rotating every max_file_seconds bounds
+that window: with the defaults, a record is in a readable file at most
+about a minute (max_file_seconds plus flush_interval) after it is logged.
+Shorter intervals narrow the window at the cost of more, smaller files.
+
+When the buffer is full, the policy decides what happens to a new record:
+
+    'drop_oldest'  the oldest queued record is overwritten (the default)
+    'drop_newest'  the new record is discarded
+    'block'        the caller waits up to block_timeout seconds for the
+                   writer to make room, then the new record is discarded
+
+Dropped records, and records lost to write errors, are counted in stats().
+Writing needs pyarrow.
+"""
+
+import atexit
+import collections
+import glob
+import os
+import threading
+import time
+
+# Records held in memory before the policy applies
+DEFAULT_CAPACITY = 65536
+
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_FILE_ROWS = 1_000_000
+# Upper bound on how long written rows stay unreadable, and lost on a crash
+DEFAULT_MAX_FILE_SECONDS = 60.0
+# A week of one-minute files
+DEFAULT_MAX_FILES = 10080
+
+POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+# Recommendations recorded per prediction
+LOGGED_CROPS = 3
+
+FILE_PREFIX = 'predictions-'
+
+def _schema(pa):
+    fields = [
+        pa.field('timestamp', pa.timestamp('us', tz='UTC')),
+        pa.field('model_version', pa.string()),
+    ]
+    fields += [pa.field(column, pa.float64()) for column in ('N', 'P', 'K', 'pH', 'rainfall', 'temperature')]
+    for i in range(1, LOGGED_CROPS + 1):
+        fields += [
+            pa.field(f'crop_{i}', pa.string()),
+            pa.field(f'probability_{i}', pa.float64()),
+            pa.field(f'yield_{i}', pa.float64()),
+        ]
+    fields.append(pa.field('season', pa.string()))
+    return pa.schema(fields)
+
+class PredictionLogger:
+    """Ring-buffered prediction log flushed to rotating Parquet files by a background thread"""
+
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY, policy='drop_oldest', block_timeout=0.01,
+                 batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_file_rows=DEFAULT_MAX_FILE_ROWS, max_file_seconds=DEFAULT_MAX_FILE_SECONDS,
+                 max_files=DEFAULT_MAX_FILES):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Prediction logging requires pyarrow (pip install pyarrow)")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; choose from {', '.join(POLICIES)}")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.schema = _schema(pyarrow)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.batch_size = min(batch_size, capacity)
+        self.flush_interval = flush_interval
+        self.max_file_rows = max_file_rows
+        self.max_file_seconds = max_file_seconds
+        self.max_files = max_files
+
+        self._buffer = collections.deque()
+        # One condition for both directions: the writer waits for records,
+        # blocked callers wait for room
+        self._condition = threading.Condition(threading.Lock())
+        self._closed = False
+        self._flush_requested = False
+        self.logged = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.files = 0
+
+        self._writer = None
+        self._file_path = None
+        self._file_rows = 0
+        self._file_opened = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='PredictionLogger', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, model_version, inputs, recommendations):
+        """Queue one prediction: its six raw inputs and predict_crops recommendations
+
+        Returns False if the record was dropped.
+        """
+        # Values only: callers may modify the recommendation dicts afterwards
+        record = (time.time(), model_version, inputs, recommendations[0]['season'] if recommendations else None,
+                  [(rec['crop'], rec['probability'], rec['yield_quintals_per_acre'])
+                   for rec in recommendations[:LOGGED_CROPS]])
+        with self._condition:
+            self.logged += 1
+            if len(self._buffer) >= self.capacity:
+                if self.policy == 'drop_oldest':
+                    self._buffer.popleft()
+                    self.dropped += 1
+                elif self.policy == 'block':
+                    self._condition.notify_all()
+                    if not self._condition.wait_for(lambda: len(self._buffer) < self.capacity,
+                                                    timeout=self.block_timeout):
+                        self.dropped += 1
+                        return False
+                else:
+                    self.dropped += 1
+                    return False
+            self._buffer.append(record)
+            if len(self._buffer) == self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    def flush(self, timeout=None):
+        """Write everything queued so far and close the current file, waiting until done"""
+        with self._condition:
+            if self._closed:
+                return
+            self._flush_requested = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: not self._flush_requested, timeout=timeout)
+
+    def close(self):
+        """Write the queued records, close the current file and stop the writer thread"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        """Record counters, the queue length and the number of files written
+
+        Every logged record ends up exactly once as written, dropped (by the
+        buffer policy), failed (lost to a write error) or still queued.
+        """
+        with self._condition:
+            return {
+                'logged': self.logged,
+                'queued': len(self._buffer),
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches,
+                'files': self.files,
+            }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or self._flush_requested or len(self._buffer) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                records = list(self._buffer)
+                self._buffer.clear()
+                closing, flushing = self._closed, self._flush_requested
+                # Wake callers blocked on a full buffer
+                self._condition.notify_all()
+
+            if records:
+                self._write(records)
+            if closing or flushing or (self._writer is not None and self._rotation_due()):
+                try:
+                    self._close_file()
+                except Exception:
+                    # Never end the thread: log() would fill a buffer nobody drains
+                    self._writer = None
+            if flushing:
+                with self._condition:
+                    self._flush_requested = False
+                    self._condition.notify_all()
+            if closing:
+                return
+
+    def _rotation_due(self):
+        return (self._file_rows >= self.max_file_rows
+                or time.monotonic() - self._file_opened >= self.max_file_seconds)
+
+    def _write(self, records):
+        try:
+            table = self._to_table(records)
+            if self._writer is None:
+                self._open_file()
+            self._writer.write_table(table)
+            self._file_rows += len(records)
+            with self._condition:
+                self.written += len(records)
+                self.batches += 1
+        except Exception:
+            with self._condition:
+                self.failed += len(records)
+
+    def _to_table(self, records):
+        columns = {name: [] for name in self.schema.names}
+        for timestamp, model_version, inputs, season, top_crops in records:
+            columns['timestamp'].append(int(timestamp * 1e6))
+            columns['model_version'].append(model_version)
+            for column, value in zip(('N', 'P', 'K', 'pH', 'rainfall', 'temperature'), inputs):
+                columns[column].append(float(value))
+            for i in range(LOGGED_CROPS):
+                crop, probability, yield_ = top_crops[i] if i < len(top_crops) else (None, None, None)
+                columns[f'crop_{i + 1}'].append(crop)
+                columns[f'probability_{i + 1}'].append(None if probability is None else float(probability))
+                columns[f'yield_{i + 1}'].append(None if yield_ is None else float(yield_))
+            columns['season'].append(season)
+        return self._pa.table(columns, schema=self.schema)
+
+    def _open_file(self):
+        name = f"{FILE_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.files:05d}.parquet"
+        self._file_path = os.path.join(self.directory, name)
+        self._writer = self._pq.ParquetWriter(os.path.join(self.directory, '.' + name), self.schema)
+        self._file_rows = 0
+        self._file_opened = time.monotonic()
+        self.files += 1
+
+    def _close_file(self):
+        if self._writer is None:
+            return
+        hidden_path = os.path.join(self.directory, '.' + os.path.basename(self._file_path))
+        try:
+            self._writer.close()
+            os.replace(hidden_path, self._file_path)
+        except Exception:
+            # The file's rows were written but never became readable
+            with self._condition:
+                self.written -= self._file_rows
+                self.failed += self._file_rows
+        self._writer = None
+        self._remove_old_files()
+
+    def _remove_old_files(self):
+        if not self.max_files:
+            return
+        files = sorted(glob.glob(os.path.join(self.directory, FILE_PREFIX + '*.parquet')))
+        for path in files[:-self.max_files]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Another process logging to the directory pruned it first
+                pass
+            except OSError:
+                # Retried at the next rotation
+                pass
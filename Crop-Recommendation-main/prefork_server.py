@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Pre-fork HTTP server sharing one loaded crop recommendation model
+
+The parent process loads the model once, compiles it into the flat NumPy
+arrays of the inference engine, binds the listening socket and then forks the
+workers. The workers inherit the model copy-on-write and all accept on the
+same socket. The forest nodes are held as a few large NumPy buffers, and
+gc.freeze() keeps the garbage collector from writing to the inherited
+objects, so requests do not copy the model pages into each worker.
+Serving an artifact directory is preferred: its arrays are memory-mapped
+files, shared through the page cache, and the sklearn forests are never
+rebuilt.
+
+The parent reports the unique (USS) and proportional (PSS) memory of every
+worker once they are ready, and then every --report-interval seconds.
+
+Usage:
+    python prefork_server.py [--model crop_recommendation_model] [--workers 4] [--port 8000]
+    curl -d '{"N": 80, "P": 40, "K": 40, "pH": 5.5, "rainfall": 650, "temperature": 29}' localhost:8000/predict
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import signal
+import sys
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from crop_inference import CropPredictor, INPUT_COLUMNS
+
+def process_memory(pid):
+    """RSS, PSS and USS of a process in bytes, from /proc/<pid>/smaps_rollup (Linux)"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+def print_memory_report(parent_pid, worker_pids):
+    """Print RSS/PSS/USS of the parent and every worker"""
+    print(f"{'process':>14s} {'RSS MB':>8s} {'PSS MB':>8s} {'USS MB':>8s}")
+    totals = {'rss': 0, 'pss': 0, 'uss': 0}
+    for label, pid in [('parent', parent_pid)] + [(f'worker {pid}', pid) for pid in worker_pids]:
+        try:
+            memory = process_memory(pid)
+        except OSError:
+            continue
+        for key in totals:
+            totals[key] += memory[key]
+        print(f"{label:>14s} {memory['rss'] / 1e6:8.1f} {memory['pss'] / 1e6:8.1f} {memory['uss'] / 1e6:8.1f}")
+    # PSS adds up to the real footprint of the pool; RSS double counts shared pages
+    print(f"{'total':>14s} {totals['rss'] / 1e6:8.1f} {totals['pss'] / 1e6:8.1f} {totals['uss'] / 1e6:8.1f}")
+    sys.stdout.flush()
+
+def to_json(recommendations):
+    """Convert NumPy scalars in predict_crops output to plain JSON types"""
+    return [
+        {key: value.item() if hasattr(value, 'item') else value for key, value in rec.items()}
+        for rec in recommendations
+    ]
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """POST /predict with a JSON object of inputs (or a list of them); GET /health"""
+
+    # Set on the class by the parent before forking
+    model = None
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_error(404)
+            return
+        self._send_json({'status': 'ok', 'pid': os.getpid(), 'model_version': self.model.model_version})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.send_error(404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            samples = body if isinstance(body, list) else [body]
+            rows = [[float(sample[col]) for col in INPUT_COLUMNS] for sample in samples]
+            # json.loads accepts NaN and Infinity
+            if not all(math.isfinite(value) for row in rows for value in row):
+                raise ValueError("inputs must be finite numbers")
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_error(400, f"Expected JSON with {', '.join(INPUT_COLUMNS)}: {e}")
+            return
+
+        if not rows:
+            self._send_json([])
+            return
+        try:
+            if isinstance(body, list):
+                result = [to_json(recs) for recs in self.model.predict_crops_many(rows)]
+            else:
+                result = to_json(self.model.predict_crops(*rows[0]))
+        except Exception as e:
+            # Answer instead of dropping the connection; the worker keeps serving
+            self.send_error(500, f"Prediction failed: {type(e).__name__}: {e}")
+            return
+        self._send_json(result)
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # One line per request from every worker would drown the memory reports
+        pass
+
+def run_worker(server, ready_fd):
+    """Worker body: warm up, signal the parent and serve until terminated; never returns"""
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: os._exit(0))
+        # Warm up, so lazily created state exists before the memory report
+        PredictionHandler.model.predict_crops(80, 40, 40, 5.5, 650, 29)
+        os.write(ready_fd, b'1')
+        os.close(ready_fd)
+        server.serve_forever()
+    except BaseException:
+        # Never return into the parent's code in the forked child
+        traceback.print_exc()
+        os._exit(1)
+    os._exit(0)
+
+def spawn_worker(server):
+    """Fork a worker and wait until it is ready; returns its pid, or None if it died during warmup"""
+    ready_read, ready_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(ready_read)
+        run_worker(server, ready_write)
+    # Only the worker holds the write end now, so its exit reads as EOF
+    os.close(ready_write)
+    try:
+        ready = os.read(ready_read, 1)
+    finally:
+        os.close(ready_read)
+    if ready:
+        return pid
+    _, status = os.waitpid(pid, 0)
+    print(f"Worker {pid} failed to start (exit code {os.waitstatus_to_exitcode(status)})")
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork HTTP server for the crop recommendation model")
+    parser.add_argument('--model', default='crop_recommendation_model',
+                        help="Artifact directory (preferred), ONNX graph or pickle file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-entries', type=int, default=0,
+                        help="Per-worker result cache size (0 disables it)")
+    parser.add_argument('--report-interval', type=float, default=0,
+                        help="Seconds between memory reports (0 reports once at startup)")
+    args = parser.parse_args()
+
+    # Everything shared is loaded and compiled before forking
+    if os.path.isdir(args.model) or args.model.endswith('.onnx'):
+        # NumPy-only predictor: the workers never import the training stack
+        model = CropPredictor(args.model)
+    else:
+        from crop_recommendation_model import CropRecommendationModel
+        model = CropRecommendationModel()
+        model.load_model(args.model)
+    if args.cache_entries:
+        model.enable_cache(max_entries=args.cache_entries)
+    PredictionHandler.model = model
+    server = HTTPServer((args.host, args.port), PredictionHandler)
+
+    # Move the loaded objects to a permanent generation the collector never
+    # scans, so it does not dirty their pages in the workers
+    gc.collect()
+    gc.freeze()
+
+    workers = set()
+    for _ in range(args.workers):
+        pid = spawn_worker(server)
+        if pid is None:
+            for pid in workers:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            server.server_close()
+            sys.exit("Worker startup failed")
+        workers.add(pid)
+    print(f"Serving {args.model} on http://{args.host}:{args.port} with {args.workers} workers")
+    print_memory_report(os.getpid(), sorted(workers))
+
+    def shutdown(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, shutdown)
+
+    last_report = time.monotonic()
+    try:
+        while True:
+            time.sleep(0.5)
+            # Replace workers that died
+            while workers:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    break
+                workers.discard(pid)
+                print(f"Worker {pid} exited, starting a replacement")
+                replacement = spawn_worker(server)
+                if replacement is not None:
+                    workers.add(replacement)
+            if not workers:
+                sys.exit("No workers left")
+            if args.report_interval and time.monotonic() - last_report >= args.report_interval:
+                print_memory_report(os.getpid(), sorted(workers))
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        print("\nStopping workers")
+    finally:
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+        for pid in workers:
+            os.waitpid(pid, 0)
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
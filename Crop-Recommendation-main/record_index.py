@@ -0,0 +1,151 @@
+"""
+KD-tree index of historical records for "similar fields" lookups
+
+The raw soil/climate inputs of every training row are standardized with the
+model's scaler and organised in a KD-tree: the points are reordered so that
+every node covers a contiguous slice, and every node stores the bounding box
+of its points. A k-nearest-neighbour query walks the nodes closest-first and
+stops as soon as the nearest unvisited box is farther than the current k-th
+neighbour. Only a few leaves are scanned, instead of the whole table.
+
+Everything is held in flat NumPy arrays, so the index is saved with the model
+artifact, memory-mapped on load and queried without scikit-learn or SciPy.
+"""
+
+import heapq
+
+import numpy as np
+
+# Maximum number of points in a leaf
+DEFAULT_LEAF_SIZE = 32
+
+class RecordIndex:
+    """KD-tree over standardized inputs with the records' crop, season and yield"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.points = arrays['points']
+        self.start = arrays['start']
+        self.end = arrays['end']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.box_min = arrays['box_min']
+        self.box_max = arrays['box_max']
+        self.mean = np.asarray(arrays['mean'])
+        self.scale = np.asarray(arrays['scale'])
+
+    @classmethod
+    def build(cls, inputs, crop, season, yield_, mean, scale, leaf_size=DEFAULT_LEAF_SIZE):
+        """Index raw (n, n_inputs) inputs, standardized with mean and scale
+
+        crop and season are the label-encoded classes of the records and
+        yield_ their actual yields; they are stored in the tree's order.
+        """
+        inputs = np.asarray(inputs, dtype=np.float64)
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        points = (inputs - mean) / scale
+        order = np.arange(len(points))
+
+        start, end, left, right = [], [], [], []
+
+        def new_node(lo, hi):
+            start.append(lo)
+            end.append(hi)
+            left.append(-1)
+            right.append(-1)
+            return len(start) - 1
+
+        # Depth-first construction; each stack entry is (node, lo, hi)
+        stack = [(new_node(0, len(points)), 0, len(points))]
+        while stack:
+            node, lo, hi = stack.pop()
+            if hi - lo <= leaf_size:
+                continue
+            # Split the widest dimension at its median
+            block = points[order[lo:hi]]
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (hi - lo) // 2
+            partition = np.argpartition(block[:, dim], mid)
+            order[lo:hi] = order[lo:hi][partition]
+            left[node] = new_node(lo, lo + mid)
+            right[node] = new_node(lo + mid, hi)
+            stack.append((left[node], lo, lo + mid))
+            stack.append((right[node], lo + mid, hi))
+
+        points = points[order]
+        start = np.array(start, dtype=np.int64)
+        end = np.array(end, dtype=np.int64)
+        # Bounding box of every node's contiguous slice
+        box_min = np.array([points[s:e].min(axis=0) for s, e in zip(start, end)])
+        box_max = np.array([points[s:e].max(axis=0) for s, e in zip(start, end)])
+
+        return cls({
+            'points': points,
+            'start': start,
+            'end': end,
+            'left': np.array(left, dtype=np.int64),
+            'right': np.array(right, dtype=np.int64),
+            'box_min': box_min,
+            'box_max': box_max,
+            'mean': mean,
+            'scale': scale,
+            'row': order.astype(np.int64),
+            'inputs': inputs[order],
+            'crop': np.asarray(crop)[order].astype(np.int32),
+            'season': np.asarray(season)[order].astype(np.int32),
+            'yield': np.asarray(yield_, dtype=np.float64)[order],
+        })
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def query(self, inputs, k=5):
+        """Positions (in tree order) and distances of the k nearest records to one raw input row"""
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        point = (np.asarray(inputs, dtype=np.float64).ravel() - self.mean) / self.scale
+        k = min(k, len(self.points))
+        best_dist = np.full(k, np.inf)
+        best_pos = np.full(k, -1, dtype=np.int64)
+
+        heap = [(0.0, 0)]
+        while heap:
+            box_dist, node = heapq.heappop(heap)
+            if box_dist >= best_dist[-1]:
+                break
+            if self.left[node] == -1:
+                lo, hi = self.start[node], self.end[node]
+                dist = ((self.points[lo:hi] - point) ** 2).sum(axis=1)
+                candidates = np.concatenate([best_dist, dist])
+                positions = np.concatenate([best_pos, np.arange(lo, hi)])
+                keep = np.argsort(candidates, kind='stable')[:k]
+                best_dist, best_pos = candidates[keep], positions[keep]
+                continue
+            for child in (self.left[node], self.right[node]):
+                # Squared distance from the point to the child's bounding box
+                gap = np.maximum(self.box_min[child] - point, 0) + np.maximum(point - self.box_max[child], 0)
+                heapq.heappush(heap, (float(gap @ gap), int(child)))
+
+        found = best_pos >= 0
+        return best_pos[found], np.sqrt(best_dist[found])
+
+    def similar_records(self, inputs, k, crop_names, season_names, input_columns):
+        """The k most similar historical records to one raw input row, nearest first"""
+        positions, distances = self.query(inputs, k)
+        records = []
+        for position, distance in zip(positions, distances):
+            record = dict(zip(input_columns, self.arrays['inputs'][position].tolist()))
+            record.update({
+                'crop': crop_names[self.arrays['crop'][position]],
+                'season': season_names[self.arrays['season'][position]],
+                'yield_quintals_per_acre': float(self.arrays['yield'][position]),
+                'distance': float(distance),
+                'row': int(self.arrays['row'][position]),
+            })
+            records.append(record)
+        return records
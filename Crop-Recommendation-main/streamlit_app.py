@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import pickle
-from crop_recommendation_model import CropRecommendationModel
+from crop_inference import CropPredictor
 import plotly.express as px
 import plotly.graph_objects as go
 import os
@@ -51,19 +51,50 @@ st.markdown("""
 def load_model():
     """Load the trained model with error handling"""
     try:
-        # Check if model file exists
+        # Prefer the artifact: it is served with NumPy only, without importing the training stack
+        artifact_path = 'crop_recommendation_model'
         model_path = 'crop_recommendation_model.pkl'
-        if not os.path.exists(model_path):
-            st.error(f"Model file not found: {model_path}")
+        if os.path.isdir(artifact_path):
+            model = CropPredictor(artifact_path)
+        elif os.path.exists(model_path):
+            from crop_recommendation_model import CropRecommendationModel
+            model = CropRecommendationModel()
+            model.load_model(model_path)
+        else:
+            st.error(f"Model file not found: {artifact_path} or {model_path}")
             return None
         
-        model = CropRecommendationModel()
-        model.load_model(model_path)
+        # Farmers and agents resubmit the same slider combinations all day
+        model.enable_cache(max_entries=4096, ttl=3600)
+        # Audit trail of every recommendation, written by a background thread
+        try:
+            model.enable_prediction_log('prediction_logs')
+        except ImportError:
+            st.warning("pyarrow is not installed; predictions are not logged")
         return model
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
         return None
 
+def performance_summary(metrics):
+    """Markdown list of the metrics saved with the model, preferring cross-validation"""
+    cv = metrics.get('cross_validation')
+    if cv:
+        return (
+            f"- **Crop Classification Accuracy:** {cv['crop_accuracy']['mean']:.2%} ± {cv['crop_accuracy']['std']:.2%}\n"
+            f"- **Season Classification Accuracy:** {cv['season_accuracy']['mean']:.2%} ± {cv['season_accuracy']['std']:.2%}\n"
+            f"- **Yield Prediction RMSE:** {cv['yield_rmse']['mean']:.2f} ± {cv['yield_rmse']['std']:.2f} quintals/acre\n"
+            f"- *{cv['n_splits']}-fold cross-validation*"
+        )
+    if metrics:
+        return (
+            f"- **Crop Classification Accuracy:** {metrics['crop_accuracy']:.2%}\n"
+            f"- **Season Classification Accuracy:** {metrics['season_accuracy']:.2%}\n"
+            f"- **Yield Prediction RMSE:** {metrics['yield_rmse']:.2f} quintals/acre\n"
+            f"- *20% holdout split*"
+        )
+    return "Metrics were not saved with this model. Retrain it to record them."
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">🌾 Crop Recommendation System</h1>', unsafe_allow_html=True)
@@ -122,6 +153,11 @@ def main():
                         </div>
                         """, unsafe_allow_html=True)
                         
+                        # Spread of the yield model's trees, when the backend provides it
+                        if 'yield_p10' in rec:
+                            st.markdown(f"**Yield Range (p10–p90):** {rec['yield_p10']:.2f} – {rec['yield_p90']:.2f} "
+                                        f"quintals per acre (median {rec['yield_p50']:.2f})")
+                        
                         # Season information
                         if rec['season'].lower() == 'kharif':
                             st.markdown("""
@@ -147,6 +183,15 @@ def main():
                         st.markdown(f"**Yield Status:** {yield_status}")
                         st.markdown("---")
                 
+                # Nearest historical records and what they actually yielded
+                if model.record_index is not None:
+                    st.markdown("### 🗂️ Similar Historical Fields")
+                    similar = pd.DataFrame(model.similar_records(N=N, P=P, K=K, pH=pH, rainfall=rainfall,
+                                                                 temperature=temperature, k=5))
+                    st.dataframe(similar[['crop', 'season', 'yield_quintals_per_acre', 'N', 'P', 'K', 'pH',
+                                          'rainfall', 'temperature', 'distance']].round(2),
+                                 hide_index=True, use_container_width=True)
+                
             except Exception as e:
                 st.error(f"Error getting recommendations: {str(e)}")
                 st.info("Please try adjusting the input parameters.")
@@ -219,11 +264,7 @@ def main():
     
     with col1:
         st.markdown("### 🎯 Model Performance")
-        st.markdown("""
-        - **Crop Classification Accuracy:** 90.04%
-        - **Season Classification Accuracy:** 100%
-        - **Yield Prediction RMSE:** 8.72 quintals/acre
-        """)
+        st.markdown(performance_summary(model.metrics))
     
     with col2:
         st.markdown("### 🌾 Supported Crops")
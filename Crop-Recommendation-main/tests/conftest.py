@@ -0,0 +1,44 @@
+"""Shared fixtures: models trained once per test session on the AP data"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crop_recommendation_model import CropRecommendationModel
+from data_pipeline import DATA_FILE
+
+@pytest.fixture(scope='session')
+def training_data():
+    """Features, targets and label encoders of the AP data"""
+    model = CropRecommendationModel()
+    df = model.load_data(os.path.join(ROOT, DATA_FILE), cache_dir=None)
+    X, y_yield, y_crop, y_season, _ = model.prepare_data(df)
+    return X, y_yield, y_crop, y_season, model.label_encoders
+
+@pytest.fixture(scope='session')
+def model(training_data):
+    """A small forest model, fast enough to train for every session"""
+    X, y_yield, y_crop, y_season, label_encoders = training_data
+    model = CropRecommendationModel(backend='random_forest_small')
+    model.label_encoders = label_encoders
+    model.train_models(X, y_yield, y_crop, y_season)
+    return model
+
+@pytest.fixture(scope='session')
+def artifact(model, tmp_path_factory):
+    """The model saved as an artifact directory"""
+    path = str(tmp_path_factory.mktemp('artifact') / 'model')
+    model.save_artifact(path)
+    return path
+
+@pytest.fixture(scope='session')
+def production_csv(tmp_path_factory):
+    """The first 2000 rows of the production CSV, for the chunked loaders"""
+    path = str(tmp_path_factory.mktemp('csv') / 'crops.csv')
+    pd.read_csv(os.path.join(ROOT, DATA_FILE), nrows=2000).to_csv(path, index=False)
+    return path
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from amendment_optimizer import minimum_amendment, target_ranks
+from crop_inference import CropPredictor, top_3_indices
+
+def random_cases(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 201, n), rng.integers(0, 201, n), rng.integers(0, 201, n),
+        rng.integers(40, 91, n) / 10, rng.integers(0, 2001, n), rng.integers(0, 51, n),
+    ]).astype(np.float64), rng
+
+def test_target_ranks_follow_top_3_order():
+    # Few distinct values, so most rows have ties across the top 3
+    crop_probs = np.random.default_rng(0).integers(0, 3, (500, 26)) / 4
+    for crop in range(crop_probs.shape[1]):
+        ranks = target_ranks(crop_probs, crop)
+        for row, rank in zip(crop_probs, ranks):
+            top = list(top_3_indices(row))
+            assert (rank < 3) == (crop in top)
+            if rank < 3:
+                assert top[rank] == crop
+
+@pytest.mark.parametrize('served', ['model', 'predictor'])
+def test_feasible_amendment_puts_target_in_predict_crops(model, artifact, served):
+    predictor = model if served == 'model' else CropPredictor(artifact)
+    names = list(model.label_encoders['crop'].classes_)
+    inputs, rng = random_cases(12, seed=1)
+    feasible = 0
+    for row in inputs:
+        target = names[rng.integers(len(names))]
+        result = minimum_amendment(predictor, row, target)
+        if not result['feasible']:
+            continue
+        feasible += 1
+        recommendations = predictor.predict_crops(**result['inputs'])
+        assert target in [recommendation['crop'] for recommendation in recommendations]
+    assert feasible
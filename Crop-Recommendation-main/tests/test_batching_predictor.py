@@ -0,0 +1,29 @@
+import numpy as np
+
+from batching_predictor import BatchingPredictor
+from crop_inference import CropPredictor
+
+def test_cache_hits_are_observed_by_the_drift_monitor(artifact):
+    predictor = CropPredictor(artifact)
+    predictor.enable_cache()
+    monitor = predictor.enable_drift_monitor()
+    inputs = dict(N=80, P=40, K=40, pH=5.5, rainfall=650, temperature=29)
+    with BatchingPredictor(predictor) as batching:
+        first = batching.predict(**inputs)
+        assert predictor.cache.stats()['hits'] == 0
+        second = batching.predict(**inputs)
+    assert second == first
+    assert predictor.cache.stats()['hits'] == 1
+    assert monitor.observations == 2
+
+def test_misses_are_predicted_and_observed_on_the_raw_inputs(artifact):
+    from prediction_cache import SLIDER_DECIMALS
+    predictor = CropPredictor(artifact)
+    inputs = dict(N=80.4, P=40, K=40, pH=5.58, rainfall=650.2, temperature=29)
+    expected = predictor.predict_crops(**inputs)
+    predictor.enable_cache(decimals=SLIDER_DECIMALS)
+    observed = []
+    predictor.monitor = type('Monitor', (), {'observe_batch': lambda self, rows: observed.extend(np.asarray(rows, dtype=float).tolist())})()
+    with BatchingPredictor(predictor) as batching:
+        assert batching.predict(**inputs) == expected
+    assert observed == [list(map(float, inputs.values()))]
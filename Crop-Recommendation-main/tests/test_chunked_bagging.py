@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from chunked_bagging import holdout_mask, remap_classes, scan_dataset, train_out_of_core
+from crop_inference import FEATURE_COLUMNS
+from crop_recommendation_model import CropRecommendationModel
+from data_pipeline import clean_crop_data, iter_crop_chunks
+
+OPTIONS = dict(backend='random_forest_small', trees_per_group=10, chunksize=500, max_samples=1000)
+
+def test_scan_fits_the_scaler_on_the_training_rows(production_csv):
+    scan = scan_dataset(production_csv, chunksize=500)
+    chunks = list(iter_crop_chunks(production_csv, chunksize=500))
+    train = pd.concat([chunk[~holdout_mask(i, len(chunk))] for i, chunk in enumerate(chunks)])
+    expected = StandardScaler().fit(train[FEATURE_COLUMNS])
+    assert scan['train_rows'] == len(train)
+    assert scan['train_rows'] + scan['holdout_rows'] == sum(len(chunk) for chunk in chunks)
+    np.testing.assert_allclose(scan['scaler'].mean_, expected.mean_)
+    np.testing.assert_allclose(scan['scaler'].scale_, expected.scale_)
+
+def test_remapped_tree_lines_up_with_all_classes():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 3))
+    # Seen classes 1, 3 and 4 of 6
+    y = np.array([1, 3, 4])[rng.integers(0, 3, 200)]
+    tree = DecisionTreeClassifier(max_depth=3, random_state=0).fit(X, y)
+    expected = tree.predict_proba(X)
+    remap_classes(tree, tree.classes_, 6)
+    proba = tree.predict_proba(X)
+    assert proba.shape == (200, 6)
+    np.testing.assert_array_equal(proba[:, [1, 3, 4]], expected)
+    assert not proba[:, [0, 2, 5]].any()
+
+def test_worker_processes_give_the_same_forests(production_csv):
+    serial = train_out_of_core(production_csv, **OPTIONS)
+    parallel = train_out_of_core(production_csv, n_jobs=2, **OPTIONS)
+    assert serial['metrics'] == parallel['metrics']
+    X = serial['scaler'].transform(clean_crop_data(pd.read_csv(production_csv))[FEATURE_COLUMNS])
+    for name, forest in serial['forests'].items():
+        assert len(forest.estimators_) == 30
+        np.testing.assert_array_equal(forest.predict(X), parallel['forests'][name].predict(X))
+
+def test_out_of_core_model_serves_and_saves(production_csv, tmp_path):
+    model = CropRecommendationModel(backend='random_forest_small')
+    model.train_out_of_core(production_csv, trees_per_group=10, chunksize=500, max_samples=1000)
+    assert model.engine is not None and model.record_index is not None
+    assert set(model.metrics) == {'yield_rmse', 'crop_accuracy', 'season_accuracy'}
+    recommendations = model.predict_crops(80, 40, 40, 5.5, 650, 29)
+    model.save_artifact(str(tmp_path / 'artifact'))
+    loaded = CropRecommendationModel()
+    loaded.load_model(str(tmp_path / 'artifact'))
+    assert [rec['crop'] for rec in loaded.predict_crops(80, 40, 40, 5.5, 650, 29)] == \
+        [rec['crop'] for rec in recommendations]
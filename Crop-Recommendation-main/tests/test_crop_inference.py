@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from crop_inference import crop_order, engineer_features, single_features, top_3_indices
+
+def test_engineer_features_matches_single_features():
+    inputs = [[80, 40, 40, 5.5, 650, 29], [20, 0, 0, 6.0, 300, 25]]
+    expected = np.vstack([single_features(*row) for row in inputs])
+    np.testing.assert_array_equal(engineer_features(inputs), expected)
+
+@pytest.mark.parametrize('shape', [(6, 5), (3, 8), (6,), (2, 3, 6)])
+def test_engineer_features_rejects_other_shapes(shape):
+    with pytest.raises(ValueError):
+        engineer_features(np.ones(shape))
+
+def test_top_3_indices_keep_the_original_tie_order():
+    crop_probs = np.random.default_rng(0).integers(0, 3, (500, 26)) / 4
+    for row in crop_probs:
+        np.testing.assert_array_equal(top_3_indices(row), np.argsort(row)[-3:][::-1])
+    np.testing.assert_array_equal(crop_order(crop_probs)[:, :3], [top_3_indices(row) for row in crop_probs])
+
+def test_batch_order_matches_predict_crops(model):
+    samples = np.random.default_rng(1).integers(0, 201, (100, 6)).astype(np.float64)
+    samples[:, 3] = samples[:, 3] % 10
+    batch = model.predict_crops_batch(samples)
+    for i, row in enumerate(samples):
+        assert [rec['crop'] for rec in model.predict_crops(*row)] == list(batch['crop'][i])
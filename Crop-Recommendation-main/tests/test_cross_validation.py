@@ -0,0 +1,10 @@
+from cross_validation import CV_METRICS, cross_validate
+
+def test_shared_memory_workers_match_a_serial_run(training_data):
+    X, y_yield, y_crop, y_season, _ = training_data
+    options = dict(backend='random_forest_small', n_splits=3)
+    serial = cross_validate(X, y_yield, y_crop, y_season, **options)
+    parallel = cross_validate(X, y_yield, y_crop, y_season, n_jobs=2, **options)
+    for metric in CV_METRICS.values():
+        assert len(serial[metric]['folds']) == 3
+        assert parallel[metric]['folds'] == serial[metric]['folds']
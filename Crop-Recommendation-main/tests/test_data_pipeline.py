@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from data_pipeline import clean_crop_data, iter_crop_chunks, sample_crop_data
+
+def test_chunks_add_up_to_the_cleaned_file(production_csv):
+    expected = clean_crop_data(pd.read_csv(production_csv)).reset_index(drop=True)
+    chunks = list(iter_crop_chunks(production_csv, chunksize=300))
+    assert len(chunks) > 1 and all(len(chunk) <= 300 for chunk in chunks)
+    result = pd.concat(chunks, ignore_index=True)
+    assert len(result) == len(expected)
+    for column in ['Crop', 'Crop_Type']:
+        assert result[column].astype(str).tolist() == expected[column].tolist()
+    for column in ['N', 'pH', 'rainfall', 'Yield_quintals_per_acre', 'NPK_ratio']:
+        np.testing.assert_allclose(result[column].to_numpy(dtype=np.float64), expected[column].to_numpy())
+
+def test_filters_are_case_insensitive(production_csv):
+    raw = pd.read_csv(production_csv)
+    crops = raw['Crop'].str.strip().str.lower().unique()[:2]
+    result = pd.concat(iter_crop_chunks(production_csv, states=['Andhra Pradesh'], seasons=['KHARIF'],
+                                        crops=[crop.upper() for crop in crops], chunksize=500))
+    assert len(result)
+    assert set(result['Crop'].astype(str).str.lower()) <= set(crops)
+    assert set(result['Crop_Type'].astype(str).str.strip().str.lower()) == {'kharif'}
+
+def test_sample_is_bounded_and_weighted(production_csv):
+    rows = sum(len(chunk) for chunk in iter_crop_chunks(production_csv, chunksize=300))
+    sample = sample_crop_data(iter_crop_chunks(production_csv, chunksize=300), sample_size=250)
+    assert len(sample) == 250
+    assert np.allclose(sample['sample_weight'], rows / 250)
+    # Every sampled row is a source row
+    source = pd.concat(iter_crop_chunks(production_csv, chunksize=300), ignore_index=True)
+    key = ['Crop', 'Crop_Type', 'N', 'P', 'K', 'pH', 'rainfall', 'temperature', 'Yield_quintals_per_acre']
+    merged = sample[key].astype(str).merge(source[key].astype(str).drop_duplicates(), how='left', indicator=True)
+    assert (merged['_merge'] == 'both').all()
+    again = sample_crop_data(iter_crop_chunks(production_csv, chunksize=300), sample_size=250)
+    pd.testing.assert_frame_equal(sample, again)
+
+def test_sample_smaller_than_the_data_keeps_every_row(production_csv):
+    sample = sample_crop_data(iter_crop_chunks(production_csv, chunksize=300), sample_size=10 ** 6)
+    assert len(sample) == sum(len(chunk) for chunk in iter_crop_chunks(production_csv, chunksize=300))
+    assert np.allclose(sample['sample_weight'], 1.0)
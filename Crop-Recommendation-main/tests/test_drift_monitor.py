@@ -0,0 +1,24 @@
+import numpy as np
+
+from drift_monitor import DriftMonitor, build_reference
+
+COLUMNS = ['N', 'P', 'K', 'pH', 'rainfall', 'temperature']
+
+def test_single_and_batch_observations_agree_on_non_finite_inputs():
+    rng = np.random.default_rng(0)
+    reference = build_reference(rng.uniform(0, 100, (1000, 6)), COLUMNS)
+    inputs = rng.uniform(-10, 110, (200, 6))
+    inputs[rng.random(inputs.shape) < 0.1] = np.nan
+    inputs[rng.random(inputs.shape) < 0.05] = np.inf
+    inputs[rng.random(inputs.shape) < 0.05] = -np.inf
+
+    single, batch = DriftMonitor(reference, half_life=None), DriftMonitor(reference, half_life=None)
+    for row in inputs:
+        single.observe(row)
+    batch.observe_batch(inputs)
+
+    np.testing.assert_array_equal(single.counts, batch.counts)
+    assert single.metrics() == batch.metrics()
+    non_finite = (~np.isfinite(inputs)).sum(axis=0)
+    assert [single.metrics()['features'][column]['non_finite'] for column in COLUMNS] == non_finite.tolist()
+    assert single.counts.sum(axis=1).tolist() == (len(inputs) - non_finite).tolist()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from crop_recommendation_model import ENGINE_MAX_ROWS, CropRecommendationModel, make_estimator
+
+SAMPLES = np.array([[80, 40, 40, 5.5, 650, 29], [20, 60, 20, 6.0, 300, 25]], dtype=np.float64)
+
+def train(training_data, backend):
+    X, y_yield, y_crop, y_season, label_encoders = training_data
+    model = CropRecommendationModel(backend=backend)
+    model.label_encoders = label_encoders
+    model.train_models(X, y_yield, y_crop, y_season)
+    return model
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        make_estimator('svm', 'classification')
+
+def test_extra_trees_run_on_the_engine(training_data):
+    model = train(training_data, 'extra_trees')
+    assert model.supports_engine() and model.engine is not None
+    # Over ENGINE_MAX_ROWS rows, predictions come from the sklearn estimators
+    samples = np.tile(SAMPLES, (ENGINE_MAX_ROWS, 1))
+    engine, sklearn = model.predict_crops_batch(SAMPLES), model.predict_crops_batch(samples)
+    np.testing.assert_allclose(engine['probability'], sklearn['probability'][:2], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(engine['yield_quintals_per_acre'], sklearn['yield_quintals_per_acre'][:2])
+
+def test_gradient_boosting_is_served_by_sklearn(training_data, tmp_path):
+    model = train(training_data, 'hist_gradient_boosting')
+    assert not model.supports_engine() and model.engine is None
+    recommendations = model.predict_crops(*SAMPLES[0])
+    assert len(recommendations) == 3 and 'yield_p10' not in recommendations[0]
+    with pytest.raises(ValueError):
+        model.save_artifact(str(tmp_path / 'artifact'))
+
+    path = str(tmp_path / 'model.pkl')
+    model.save_model(path)
+    loaded = CropRecommendationModel()
+    loaded.load_model(path)
+    assert loaded.backend == 'hist_gradient_boosting' and loaded.engine is None
+    assert loaded.predict_crops(*SAMPLES[0]) == recommendations
@@ -0,0 +1,36 @@
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from crop_inference import CropPredictor
+from crop_recommendation_model import CropRecommendationModel
+
+def test_pair_only_in_test_split(training_data):
+    X, y_yield, y_crop, y_season, label_encoders = training_data
+    # Give one test-split row a (crop, season) pair that occurs nowhere else
+    _, test_rows = train_test_split(np.arange(len(X)), test_size=0.2, random_state=42)
+    row = test_rows[0]
+    pairs = set(zip(y_crop, y_season))
+    season = next(s for s in range(len(label_encoders['season'].classes_)) if (y_crop.iloc[row], s) not in pairs)
+    y_season = y_season.copy()
+    y_season.iloc[row] = season
+
+    model = CropRecommendationModel(backend='random_forest_small', joint=True)
+    model.label_encoders = label_encoders
+    model.train_models(X, y_yield, y_crop, y_season)
+    assert (y_crop.iloc[row], season) not in set(map(tuple, model.joint_labels.pairs.tolist()))
+    assert len(model.joint_labels.pairs) == len(model.crop_classifier.classes_)
+    assert len(model.predict_crops(80, 40, 40, 5.5, 650, 29)) == 3
+
+def test_joint_artifact_matches_model(training_data, tmp_path):
+    X, y_yield, y_crop, y_season, label_encoders = training_data
+    model = CropRecommendationModel(backend='random_forest_small', joint=True)
+    model.label_encoders = label_encoders
+    model.train_models(X, y_yield, y_crop, y_season)
+    model.save_artifact(str(tmp_path / 'joint'))
+    predictor = CropPredictor(str(tmp_path / 'joint'))
+    samples = np.array([[80, 40, 40, 5.5, 650, 29], [20, 60, 20, 6.0, 300, 25]], dtype=np.float64)
+    expected = model.predict_crops_batch(samples)
+    result = predictor.predict_crops_batch(samples)
+    assert np.array_equal(result['crop'], expected['crop'])
+    assert np.array_equal(result['season'], expected['season'])
+    assert np.allclose(result['probability'], expected['probability'])
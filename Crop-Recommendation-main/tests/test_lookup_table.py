@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from lookup_table import RecommendationTable, build_table
+
+GRID = {
+    'N': (0.0, 200.0, 100.0),
+    'P': (0.0, 200.0, 100.0),
+    'K': (0.0, 200.0, 100.0),
+    'pH': (4.0, 9.0, 2.5),
+    'rainfall': (0.0, 2000.0, 1000.0),
+    'temperature': (0.0, 50.0, 25.0),
+}
+
+@pytest.fixture(scope='module')
+def table_path(model, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('table') / 'table')
+    build_table(model, path, grid=GRID, samples=50)
+    return path
+
+@pytest.mark.parametrize('mode', ['nearest', 'exact'])
+@pytest.mark.parametrize('inputs', [
+    (80, 40, 40, 5.5, 650, 29),  # inside, between grid points
+    (100, 100, 100, 6.5, 1000, 25),  # on a grid point
+    (-12, 40, 40, 5.5, 650, 29),  # less than half a step below N
+    (80, 40, 40, 9.2, 650, 29),  # less than half a step above pH
+])
+def test_single_and_batch_lookups_agree_on_the_grid(model, table_path, mode, inputs):
+    table = RecommendationTable(table_path, fallback=model, mode=mode)
+    on_grid = bool(table.lookup_batch([inputs])['on_grid'][0])
+    recommendations = table.predict_crops(*inputs)
+    assert table.stats()['hits'] == int(on_grid)
+    if on_grid:
+        result = table.lookup_batch([inputs])
+        assert [r['crop'] for r in recommendations] == list(result['crop'][0])
+    else:
+        assert recommendations == model.predict_crops(*inputs)
+
+def test_non_finite_inputs_are_off_the_grid(table_path):
+    table = RecommendationTable(table_path, mode='interpolate')
+    result = table.lookup_batch([(80, 40, 40, float('nan'), 650, 29), (80, 40, 40, 5.5, float('inf'), 29)])
+    assert not result['on_grid'].any()
+    with pytest.raises(ValueError):
+        RecommendationTable(table_path).predict_crops(80, 40, 40, float('nan'), 650, 29)
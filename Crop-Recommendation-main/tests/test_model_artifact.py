@@ -0,0 +1,47 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from crop_inference import CropPredictor
+from tree_engine import fuse_forests
+
+def is_memory_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+def test_traversal_arrays_are_memory_mapped(artifact):
+    predictor = CropPredictor(artifact)
+    predictor.predict_crops(80, 40, 40, 5.5, 650, 29)
+    structure = predictor.engine.structure
+    for array in (structure.roots, structure.children, structure.feature, structure.threshold):
+        assert is_memory_mapped(array)
+    for forest in predictor.engine.forests.values():
+        assert is_memory_mapped(forest.leaf_value)
+        # Never traversed alone, so never copied
+        assert forest._children is None
+
+def test_stored_structure_matches_fused_forests(model, artifact):
+    structure = CropPredictor(artifact).engine.structure
+    expected = fuse_forests(model.engine.forests)
+    for name in ('roots', 'children', 'feature', 'threshold'):
+        assert np.array_equal(getattr(structure, name), expected[name])
+
+def test_artifact_without_structure_still_loads(model, artifact, tmp_path):
+    # Artifacts written before the fused arrays were stored
+    path = str(tmp_path / 'old')
+    shutil.copytree(artifact, path)
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    del manifest['engine']
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+    samples = np.array([[80, 40, 40, 5.5, 650, 29], [20, 60, 20, 6.0, 300, 25]], dtype=np.float64)
+    expected = CropPredictor(artifact).predict_crops_batch(samples)
+    result = CropPredictor(path).predict_crops_batch(samples)
+    assert np.array_equal(result['crop'], expected['crop'])
+    assert np.array_equal(result['probability'], expected['probability'])
@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+
+import pytest
+
+from model_registry import REGISTRY_INDEX, ModelRegistry
+
+class FakeModel:
+    record_index = None
+
+    def __init__(self, path, nbytes):
+        self.path = path
+        self.engine = type('Engine', (), {'nbytes': nbytes})()
+
+class Loader:
+    """Counts loads per region; regions in slow wait for release before loading"""
+
+    def __init__(self, nbytes=100, slow=()):
+        self.nbytes = nbytes
+        self.slow = set(slow)
+        self.release = threading.Event()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, path):
+        region = os.path.basename(path)
+        with self._lock:
+            self.calls.append(region)
+        if region in self.slow:
+            assert self.release.wait(timeout=10)
+        return FakeModel(path, self.nbytes)
+
+@pytest.fixture
+def root(tmp_path):
+    index = {'regions': {name: {'rows': 1000} for name in ('a', 'b', 'c')}, 'aliases': {'telangana': 'b'}}
+    with open(tmp_path / REGISTRY_INDEX, 'w') as f:
+        json.dump(index, f)
+    return str(tmp_path)
+
+def test_least_recently_used_models_are_evicted_over_budget(root):
+    registry = ModelRegistry(root, memory_budget=250, loader=Loader())
+    registry.get('a')
+    registry.get('b')
+    registry.get('a')
+    registry.get('c')
+    assert registry.resident() == ['a', 'c']
+    stats = registry.stats()
+    assert stats['loads'] == 3 and stats['evictions'] == 1 and stats['hits'] == 1
+    assert stats['resident_bytes'] == 200
+
+def test_model_just_loaded_stays_even_over_budget(root):
+    registry = ModelRegistry(root, memory_budget=50, loader=Loader())
+    registry.get('a')
+    registry.get('b')
+    assert registry.resident() == ['b']
+
+def test_aliases_and_unknown_regions(root):
+    registry = ModelRegistry(root, loader=Loader())
+    assert registry.get('Telangana').path == os.path.join(root, 'b')
+    with pytest.raises(KeyError):
+        registry.get('kerala')
+
+def test_region_is_loaded_once_and_does_not_block_others(root):
+    loader = Loader(slow={'a'})
+    registry = ModelRegistry(root, loader=loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('a'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # Region b loads while a's load is still in progress
+    registry.get('b')
+    assert registry.resident() == ['b']
+    loader.release.set()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert len(results) == 4 and all(model is results[0] for model in results)
+    assert loader.calls.count('a') == 1
@@ -0,0 +1,74 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+
+from crop_inference import CropPredictor
+from crop_recommendation_model import ENGINE_MAX_ROWS, CropRecommendationModel
+
+from conftest import ROOT
+
+@pytest.fixture(scope='module')
+def onnx_path(model, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('onnx') / 'model.onnx')
+    model.save_onnx(path)
+    return path
+
+def random_inputs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 201, n), rng.integers(0, 201, n), rng.integers(0, 201, n),
+        rng.integers(0, 141, n) / 10, rng.integers(0, 2001, n), rng.integers(0, 51, n),
+    ]).astype(np.float64)
+
+def assert_same_recommendations(expected, actual):
+    # The ONNX tree operators return float32
+    assert np.array_equal(actual['crop'], expected['crop'])
+    assert np.array_equal(actual['season'], expected['season'])
+    assert np.allclose(actual['probability'], expected['probability'], rtol=1e-6, atol=1e-6)
+    assert np.allclose(actual['yield_quintals_per_acre'], expected['yield_quintals_per_acre'], rtol=1e-6, atol=1e-6)
+
+def test_onnx_predictor_matches_sklearn(model, onnx_path):
+    # Batches over ENGINE_MAX_ROWS are predicted by the sklearn estimators
+    samples = random_inputs(ENGINE_MAX_ROWS + 100)
+    expected = model.predict_crops_batch(samples)
+    predictor = CropPredictor(onnx_path)
+    assert_same_recommendations(expected, predictor.predict_crops_batch(samples))
+    assert predictor.model_version == model.model_version
+    assert list(predictor.crop_names) == list(model.label_encoders['crop'].classes_)
+
+def test_onnx_single_predictions(model, onnx_path):
+    predictor = CropPredictor(onnx_path)
+    serving = CropRecommendationModel()
+    serving.load_model(onnx_path)
+    for row in random_inputs(50, seed=1):
+        expected = model.predict_crops(*row)
+        for actual in (predictor.predict_crops(*row), serving.predict_crops(*row)):
+            assert [r['crop'] for r in actual] == [r['crop'] for r in expected]
+            assert [r['season'] for r in actual] == [r['season'] for r in expected]
+            assert np.allclose([r['probability'] for r in actual], [r['probability'] for r in expected],
+                               rtol=1e-6, atol=1e-6)
+
+def test_onnx_serving_does_not_import_sklearn(onnx_path):
+    code = (
+        "import sys\n"
+        "from crop_inference import CropPredictor\n"
+        f"CropPredictor({onnx_path!r}).predict_crops(80, 40, 40, 5.5, 650, 29)\n"
+        "print(sorted(m for m in ('sklearn', 'pandas', 'scipy') if m in sys.modules))\n"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '[]'
+
+def test_loading_onnx_drops_the_previous_model(artifact, onnx_path):
+    served = CropRecommendationModel()
+    served.load_model(artifact)
+    served.load_model(onnx_path)
+    assert served.yield_model is None and served.crop_classifier is None and served.season_classifier is None
+    assert not hasattr(served.scaler, 'mean_') and served.engine is None
+    samples = random_inputs(10)
+    assert_same_recommendations(CropPredictor(onnx_path).predict_crops_batch(samples),
+                                served.predict_crops_batch(samples))
@@ -0,0 +1,62 @@
+import numpy as np
+
+from crop_inference import CropPredictor
+from prediction_cache import SLIDER_DECIMALS, PredictionCache
+
+def test_cache_does_not_change_predictions(artifact):
+    predictor = CropPredictor(artifact)
+    samples = np.random.default_rng(0).uniform([0, 0, 0, 4, 0, 0], [200, 200, 200, 9, 2000, 50], (50, 6))
+    expected = [predictor.predict_crops(*row) for row in samples]
+    predictor.enable_cache()
+    for _ in range(2):
+        assert [predictor.predict_crops(*row) for row in samples] == expected
+    assert predictor.cache.stats()['hits'] == len(samples)
+
+def test_quantized_keys_are_opt_in():
+    inputs = dict(N=80.4, P=40, K=40, pH=5.58, rainfall=650.2, temperature=29)
+    assert PredictionCache().make_key('v', **inputs) == ('v', 80.4, 40.0, 40.0, 5.58, 650.2, 29.0)
+    quantized = PredictionCache(decimals=SLIDER_DECIMALS)
+    assert quantized.make_key('v', **inputs) == quantized.make_key('v', **dict(inputs, N=80.0, pH=5.6))
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = PredictionCache(ttl=10.0, clock=clock)
+    cache.put('a', 1)
+    clock.now = 9.9
+    assert cache.get('a') == 1
+    clock.now = 10.0
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert cache.stats()['expirations'] == 1
+
+def test_ttl_none_never_expires():
+    clock = FakeClock()
+    cache = PredictionCache(ttl=None, clock=clock)
+    cache.put('a', 1)
+    clock.now = 1e9
+    assert cache.get('a') == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+    assert stats['hits'] == 3 and stats['misses'] == 1 and stats['hit_rate'] == 0.75
+
+def test_keys_include_the_model_version():
+    cache = PredictionCache()
+    inputs = dict(N=80, P=40, K=40, pH=5.5, rainfall=650, temperature=29)
+    cache.put(cache.make_key('v1', **inputs), 'old')
+    assert cache.get(cache.make_key('v2', **inputs)) is None
@@ -0,0 +1,42 @@
+import glob
+import os
+import time
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from prediction_log import PredictionLogger
+
+RECOMMENDATIONS = [{'crop': 'Rice', 'probability': 0.9, 'yield_quintals_per_acre': 20.0, 'season': 'Kharif'}]
+
+def test_rows_become_readable_without_close(tmp_path):
+    import pandas as pd
+    logger = PredictionLogger(str(tmp_path), flush_interval=0.05, max_file_seconds=0.2)
+    try:
+        logger.log('v1', (80, 40, 40, 5.5, 650, 29), RECOMMENDATIONS)
+        deadline = time.monotonic() + 5
+        while not glob.glob(os.path.join(str(tmp_path), 'predictions-*.parquet')) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # Read while the logger is still running, as after a crash
+        frame = pd.read_parquet(str(tmp_path))
+        assert list(frame['crop_1']) == ['Rice']
+    finally:
+        logger.close()
+
+def test_writer_survives_files_pruned_by_another_process(tmp_path, monkeypatch):
+    import prediction_log
+
+    def remove(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(prediction_log.os, 'remove', remove)
+    logger = PredictionLogger(str(tmp_path), max_files=1)
+    try:
+        for _ in range(3):
+            logger.log('v1', (80, 40, 40, 5.5, 650, 29), RECOMMENDATIONS)
+            logger.flush(timeout=5)
+        assert logger._thread.is_alive()
+        assert logger.stats()['written'] == 3
+    finally:
+        logger.close()
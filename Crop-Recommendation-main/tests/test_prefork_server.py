@@ -0,0 +1,66 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import HTTPServer
+
+import pytest
+
+from crop_inference import CropPredictor
+from prefork_server import PredictionHandler, spawn_worker
+
+class FailingModel:
+    model_version = 'failing'
+
+    def predict_crops(self, *inputs):
+        raise RuntimeError("engine failure")
+
+@pytest.fixture
+def serve(artifact, monkeypatch):
+    servers = []
+
+    def start(model):
+        monkeypatch.setattr(PredictionHandler, 'model', model)
+        server = HTTPServer(('127.0.0.1', 0), PredictionHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_address[1]}/predict'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def post(url, body):
+    request = urllib.request.Request(url, data=body.encode(), method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+SAMPLE = '"N": 80, "P": 40, "K": 40, "rainfall": 650, "temperature": 29'
+
+def test_predict(serve, artifact):
+    url = serve(CropPredictor(artifact))
+    status, result = post(url, '{%s, "pH": 5.5}' % SAMPLE)
+    assert status == 200 and len(result) == 3
+    status, result = post(url, '[{%s, "pH": 5.5}, {%s, "pH": 7.0}]' % (SAMPLE, SAMPLE))
+    assert status == 200 and len(result) == 2
+    assert post(url, '[]') == (200, [])
+
+@pytest.mark.parametrize('body', ['{%s, "pH": NaN}' % SAMPLE, '[{%s, "pH": Infinity}]' % SAMPLE,
+                                  '{%s}' % SAMPLE, 'not json'])
+def test_bad_inputs_are_rejected(serve, artifact, body):
+    assert post(serve(CropPredictor(artifact)), body)[0] == 400
+
+def test_prediction_errors_return_500(serve):
+    assert post(serve(FailingModel()), '{%s, "pH": 5.5}' % SAMPLE)[0] == 500
+
+def test_worker_dying_during_warmup_is_a_failed_start(monkeypatch):
+    monkeypatch.setattr(PredictionHandler, 'model', FailingModel())
+    server = HTTPServer(('127.0.0.1', 0), PredictionHandler)
+    try:
+        assert spawn_worker(server) is None
+    finally:
+        server.server_close()
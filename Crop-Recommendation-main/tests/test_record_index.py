@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from crop_inference import CropPredictor
+from record_index import RecordIndex
+
+def build(n, seed=0, leaf_size=8):
+    rng = np.random.default_rng(seed)
+    # Rounded values, so many records share coordinates as in the crop data
+    inputs = np.round(rng.uniform(0, 100, (n, 6)), 0)
+    labels = rng.integers(0, 5, n)
+    index = RecordIndex.build(inputs, labels, labels, rng.uniform(0, 50, n),
+                              inputs.mean(axis=0), inputs.std(axis=0), leaf_size=leaf_size)
+    return index, inputs, rng
+
+@pytest.mark.parametrize('k', [1, 5, 40])
+def test_query_matches_brute_force(k):
+    index, inputs, rng = build(2000)
+    for query in np.vstack([rng.uniform(-20, 120, (30, 6)), inputs[:10]]):
+        positions, distances = index.query(query, k)
+        points = (inputs - index.mean) / index.scale
+        expected = np.sort(np.sqrt(((points - (query - index.mean) / index.scale) ** 2).sum(axis=1)))[:k]
+        np.testing.assert_allclose(distances, expected, rtol=1e-12, atol=1e-12)
+        # Positions are in tree order; row maps them back to the input rows
+        rows = index.arrays['row'][positions]
+        np.testing.assert_allclose(np.sqrt((((inputs[rows] - query) / index.scale) ** 2).sum(axis=1)), distances,
+                                   rtol=1e-12, atol=1e-12)
+
+def test_k_larger_than_the_index():
+    index, _, _ = build(10)
+    positions, distances = index.query(np.zeros(6), k=50)
+    assert sorted(positions.tolist()) == list(range(10))
+    assert np.all(np.diff(distances) >= 0)
+    with pytest.raises(ValueError):
+        index.query(np.zeros(6), k=0)
+
+def test_artifact_index_matches_the_trained_model(model, artifact):
+    inputs = dict(N=80, P=40, K=40, pH=5.5, rainfall=650, temperature=29)
+    assert CropPredictor(artifact).similar_records(**inputs) == model.similar_records(**inputs)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from crop_inference import engineer_features
+from tree_engine import FlatForest
+
+# Rounding differences between the engine and sklearn are a few 1e-17
+TIE_TOLERANCE = 1e-12
+
+def random_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return engineer_features(np.column_stack([
+        rng.integers(0, 201, n), rng.integers(0, 201, n), rng.integers(0, 201, n),
+        rng.integers(0, 141, n) / 10, rng.integers(0, 2001, n), rng.integers(0, 51, n),
+    ]))
+
+def assert_same_top_3(expected_probs, actual_probs):
+    """actual's top 3 order is a valid top 3 order of expected, up to ties within rounding"""
+    for expected, actual in zip(expected_probs, actual_probs):
+        top = np.argsort(actual)[-3:][::-1]
+        assert np.allclose(expected[top], np.sort(expected)[-3:][::-1], rtol=0, atol=TIE_TOLERANCE)
+
+def test_flat_forests_match_sklearn(model):
+    scaled = model.scaler.transform(random_features(1000))
+    for name in model.forest_names():
+        estimator = getattr(model, name)
+        forest = FlatForest.from_estimator(estimator)
+        if forest.classes is None:
+            assert np.allclose(forest.predict(scaled), estimator.predict(scaled), rtol=1e-12, atol=1e-12)
+        else:
+            expected = estimator.predict_proba(scaled)
+            actual = forest.predict_proba(scaled)
+            assert np.allclose(actual, expected, rtol=0, atol=TIE_TOLERANCE)
+            assert_same_top_3(expected, actual)
+
+def test_fused_predictor_matches_sklearn(model):
+    features = random_features(1000, seed=1)
+    scaled = model.scaler.transform(features)
+    values = model.engine.predict_values(features)
+    expected = model.crop_classifier.predict_proba(scaled)
+    assert np.allclose(values['crop_classifier'], expected, rtol=0, atol=TIE_TOLERANCE)
+    assert_same_top_3(expected, values['crop_classifier'])
+    assert np.allclose(values['yield_model'][:, 0], model.yield_model.predict(scaled), rtol=1e-12, atol=1e-12)
@@ -0,0 +1,354 @@
+"""
+Array-based inference engine for the crop recommendation forests
+
+The fitted trees are compiled into flat NumPy node arrays (see
+model_artifact.flatten_forest) and all trees of a forest are walked in
+lock-step for a whole batch of rows, one vectorized step per tree level.
+Results equal the sklearn estimators they were compiled from to within
+floating-point rounding: inputs are compared as float32 against float64
+thresholds like sklearn does, and per-tree outputs are accumulated in tree
+order before averaging. Rounding differences of a few 1e-17 can still
+reorder crops whose probabilities tie.
+
+Only NumPy is needed, so the engine can run directly on the memory-mapped
+arrays of a model artifact, including the fused traversal arrays (see
+fuse_forests) that artifacts store alongside the forests.
+"""
+
+import numpy as np
+
+from model_artifact import flatten_forest
+
+# Rows evaluated per traversal; small chunks keep the (n_trees, rows) work
+# arrays in cache
+DEFAULT_CHUNK_SIZE = 256
+
+# Traversal steps between dropping (tree, row) paths that reached a leaf
+COMPACT_EVERY = 4
+
+def sum_trees(tree_values):
+    """Sum (n_trees, n_rows, n_outputs) per-tree outputs over the trees
+
+    cumsum accumulates trees strictly in order, as sklearn does; a plain sum
+    may switch to pairwise summation and differ in the last bit.
+    """
+    return np.cumsum(tree_values, axis=0)[-1]
+
+def tree_quantiles(tree_values, quantiles):
+    """Quantiles over the trees of (n_trees, n_rows, n_outputs) per-tree outputs
+
+    Linear interpolation between order statistics, as np.quantile, but with
+    one sort and two gathers; np.quantile's overhead alone is several times
+    the cost of a single-row prediction. Shape (n_rows, n_quantiles, n_outputs).
+    """
+    ordered = np.sort(tree_values, axis=0)
+    positions = np.asarray(quantiles, dtype=np.float64) * (len(ordered) - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, len(ordered) - 1)
+    fraction = (positions - lower)[:, np.newaxis, np.newaxis]
+    below, above = ordered[lower], ordered[upper]
+    return (below + (above - below) * fraction).transpose(1, 0, 2)
+
+def fuse_forests(forests):
+    """Traversal arrays of several forests concatenated into one structure
+
+    forests maps names to FlatForests, fused in that order. Returns 'roots',
+    'children', 'feature' and 'threshold' arrays with the node indices of
+    every forest offset past the nodes of the forests before it.
+    """
+    arrays = {'roots': [], 'children': [], 'feature': [], 'threshold': []}
+    n_nodes = 0
+    for forest in forests.values():
+        arrays['roots'].append(forest.roots + n_nodes)
+        arrays['children'].append(np.stack([forest.left, forest.right], axis=1).ravel() + n_nodes)
+        arrays['feature'].append(forest.feature)
+        arrays['threshold'].append(forest.threshold)
+        n_nodes += len(forest.feature)
+    return {name: np.concatenate(parts) for name, parts in arrays.items()}
+
+class FlatForest:
+    """A fitted forest stored as flat node arrays
+
+    arrays needs 'roots', 'feature' and 'threshold', plus 'children' or
+    'left' and 'right' to traverse; 'leaf_value' to predict.
+    """
+
+    def __init__(self, arrays, max_depth, classes=None):
+        self.roots = np.asarray(arrays['roots'])
+        self.left = arrays.get('left')
+        self.right = arrays.get('right')
+        # Interleaved (left, right) pairs, see children
+        self._children = arrays.get('children')
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.leaf_value = arrays.get('leaf_value')
+        self.max_depth = int(max_depth)
+        self.classes = None if classes is None else np.asarray(classes)
+        self.n_trees = len(self.roots)
+        # Per-leaf path contributions, built on first use (see _path_table)
+        self._paths = None
+
+    @classmethod
+    def from_estimator(cls, forest):
+        """Compile a fitted RandomForestRegressor/Classifier"""
+        max_depth = max(tree.tree_.max_depth for tree in forest.estimators_)
+        return cls(flatten_forest(forest), max_depth, getattr(forest, 'classes_', None))
+
+    @classmethod
+    def from_artifact(cls, entry, arrays):
+        """Wrap the (memory-mapped) arrays of one forest of a model artifact"""
+        return cls(arrays, max(entry['max_depths']), entry.get('classes'))
+
+    @property
+    def children(self):
+        """Interleaved (left, right) pairs: the next node is children[2 * node + go_right]
+
+        Built from left and right on the first traversal unless given; a
+        forest served as part of a FusedPredictor is never traversed alone.
+        """
+        if self._children is None:
+            self._children = np.stack([self.left, self.right], axis=1).ravel()
+        return self._children
+
+    @property
+    def nbytes(self):
+        """Bytes held by the node arrays, including memory-mapped ones"""
+        arrays = [self.roots, self.left, self.right, self._children, self.feature, self.threshold, self.leaf_value]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def apply(self, X):
+        """Leaf node index reached in every tree, shape (n_trees, n_rows)"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_rows, n_features = X.shape
+        X_flat = X.ravel()
+        row_offsets = np.tile(np.arange(0, n_rows * n_features, n_features), self.n_trees)
+        
+        children = self.children
+        nodes = np.repeat(self.roots, n_rows)
+        leaves = nodes.copy()
+        positions = np.arange(len(nodes))
+        # Leaves point to themselves, so extra steps past a leaf are no-ops;
+        # finished paths are still dropped periodically to shrink the work arrays
+        for step in range(1, self.max_depth + 1):
+            go_right = X_flat.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = children.take(2 * nodes + go_right)
+            if step % COMPACT_EVERY == 0:
+                leaves[positions] = nodes
+                # Leaves are their own left child
+                active = children.take(2 * nodes) != nodes
+                if not active.any():
+                    break
+                nodes, row_offsets, positions = nodes[active], row_offsets[active], positions[active]
+        leaves[positions] = nodes
+        return leaves.reshape(self.n_trees, n_rows)
+
+    def _path_table(self, n_features):
+        """Per-feature sums of the value changes along the path to every leaf
+
+        Returns (leaf_row, table): table[leaf_row[leaf]] is the (n_features,
+        n_outputs) contribution of reaching that leaf. Built once, level by
+        level from the roots, and kept for later calls.
+        """
+        if self._paths is None or self._paths[1].shape[1] != n_features:
+            n_nodes, n_outputs = self.leaf_value.shape
+            path = np.zeros((n_nodes, n_features, n_outputs))
+            level = np.asarray(self.roots)
+            while len(level):
+                level = level[self.left[level] != level]
+                for children in (self.left[level], self.right[level]):
+                    path[children] = path[level]
+                    path[children, self.feature[level]] += self.leaf_value[children] - self.leaf_value[level]
+                level = np.concatenate([self.left[level], self.right[level]])
+
+            # Only the leaves are looked up, so only their rows are kept
+            is_leaf = self.left == np.arange(n_nodes)
+            leaf_row = np.full(n_nodes, -1, dtype=np.int64)
+            leaf_row[is_leaf] = np.arange(is_leaf.sum())
+            self._paths = leaf_row, path[is_leaf]
+        return self._paths
+
+    @property
+    def bias(self):
+        """Mean root value over the trees: the prediction before any split, shape (n_outputs,)"""
+        return self.leaf_value[self.roots].mean(axis=0)
+
+    def contributions(self, leaves, n_features, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Per-feature contributions for the (n_trees, n_rows) leaves reached, shape (n_rows, n_features, n_outputs)
+
+        Path decomposition as in treeinterpreter: every split on the way from
+        the root to a leaf adds the change in node value to the feature it
+        splits on, and bias + contributions.sum(axis=1) equals the prediction.
+        The per-leaf sums are precomputed, so this is one lookup per tree.
+        """
+        leaf_row, table = self._path_table(n_features)
+        rows = leaf_row[leaves]
+        n_rows = rows.shape[1]
+        out = np.zeros((n_rows,) + table.shape[1:])
+        # Sum blocks of trees, keeping the gathered block to about chunk_size rows
+        block = max(1, chunk_size // max(n_rows, 1))
+        for start in range(0, self.n_trees, block):
+            out += table[rows[start:start + block]].sum(axis=0)
+        out /= self.n_trees
+        return out
+
+    def predict_trees(self, X):
+        """Per-tree outputs, shape (n_trees, n_rows, n_outputs)"""
+        return self.leaf_value[self.apply(X)]
+
+    def predict_value(self, X, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Forest output averaged over trees, shape (n_rows, n_outputs)
+
+        Class probabilities for classifiers, a single column for regressors.
+        """
+        X = np.asarray(X)
+        out = np.empty((len(X), self.leaf_value.shape[1]))
+        for start in range(0, len(X), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            out[chunk] = sum_trees(self.predict_trees(X[chunk]))
+        out /= self.n_trees
+        return out
+
+    def predict_proba(self, X):
+        """Class probabilities, as RandomForestClassifier.predict_proba"""
+        return self.predict_value(X)
+
+    def predict(self, X):
+        """Class labels for classifiers, predicted values for regressors"""
+        value = self.predict_value(X)
+        if self.classes is None:
+            return value[:, 0]
+        return self.classes[np.argmax(value, axis=1)]
+
+class FusedPredictor:
+    """Evaluate several forests over the same features in a single pass
+
+    The node arrays of all forests are concatenated into one structure, so a
+    request is validated and scaled once and every tree of every forest is
+    walked in the same traversal. Leaf values stay per forest since their
+    widths differ (one column for the yield model, one per class otherwise).
+    structure holds the fuse_forests arrays when they are already at hand,
+    e.g. memory-mapped from an artifact; otherwise they are built here.
+    """
+
+    def __init__(self, forests, mean, scale, structure=None):
+        self.forests = dict(forests)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.n_features = len(self.mean)
+        # Class labels per forest, None for regressors
+        self.classes = {name: forest.classes for name, forest in self.forests.items()}
+
+        self.tree_slices = {}
+        self.node_offsets = {}
+        n_trees = n_nodes = 0
+        for name, forest in self.forests.items():
+            self.tree_slices[name] = slice(n_trees, n_trees + forest.n_trees)
+            self.node_offsets[name] = n_nodes
+            n_trees += forest.n_trees
+            n_nodes += len(forest.feature)
+
+        if structure is None:
+            structure = fuse_forests(self.forests)
+        elif len(structure['roots']) != n_trees or len(structure['children']) != 2 * n_nodes:
+            raise ValueError("The fused structure does not match the forests")
+        max_depth = max(forest.max_depth for forest in self.forests.values())
+        self.structure = FlatForest(structure, max_depth)
+
+    @classmethod
+    def from_artifact(cls, manifest, arrays):
+        """Predictor over the memory-mapped forests of a model artifact
+
+        Artifacts store the fused structure too, so nothing is copied into
+        private memory; for artifacts written before that it is built here.
+        """
+        forests = {
+            name: FlatForest.from_artifact(entry, arrays[name]) for name, entry in manifest['forests'].items()
+        }
+        structure = None
+        if manifest.get('engine', {}).get('forests') == list(forests):
+            structure = arrays['engine']
+        return cls(forests, manifest['scaler']['mean'], manifest['scaler']['scale'], structure)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the fused structure and the per-forest arrays"""
+        return self.structure.nbytes + sum(forest.nbytes for forest in self.forests.values())
+
+    def validate(self, features):
+        """Check an (n, n_features) feature matrix once for all forests"""
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if features.ndim != 2 or features.shape[1] != self.n_features:
+            raise ValueError(f"Expected features of shape (n, {self.n_features}), got {features.shape}")
+        if not np.isfinite(features).all():
+            raise ValueError("Features contain NaN or infinite values")
+        return features
+
+    def predict_values(self, features, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Averaged outputs of every forest for raw (unscaled) features
+
+        Returns a dict mapping forest name to an (n_rows, n_outputs) array,
+        equal to FlatForest.predict_value of each forest on the scaled features.
+        """
+        return self.evaluate(features, chunk_size=chunk_size)[0]
+
+    def explain(self, features, names, chunk_size=DEFAULT_CHUNK_SIZE):
+        """predict_values plus per-feature contributions of the named forests, from the same traversal
+
+        Returns (values, contributions): values as predict_values, and
+        contributions mapping each name to an (n_rows, n_features, n_outputs)
+        array (see FlatForest.contributions).
+        """
+        values, contributions, _ = self.evaluate(features, contributions=names, chunk_size=chunk_size)
+        return values, contributions
+
+    def evaluate(self, features, contributions=(), quantiles=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Averaged outputs of every forest, with optional contributions and per-tree quantiles
+
+        contributions names the forests to explain (see explain); quantiles
+        maps forest names to sequences of quantiles in [0, 1], taken over the
+        trees' individual outputs. Returns (values, contributions, quantiles)
+        dicts; the quantile arrays have shape (n_rows, n_quantiles, n_outputs).
+        Everything comes from a single traversal.
+        """
+        features = self.validate(features)
+        # Same arithmetic as StandardScaler.transform
+        X = (features - self.mean) / self.scale
+        quantiles = quantiles or {}
+
+        values = {
+            name: np.empty((len(X), forest.leaf_value.shape[1]))
+            for name, forest in self.forests.items()
+        }
+        explained = {
+            name: np.empty((len(X), self.n_features, self.forests[name].leaf_value.shape[1]))
+            for name in contributions
+        }
+        intervals = {
+            name: np.empty((len(X), len(quantiles[name]), self.forests[name].leaf_value.shape[1]))
+            for name in quantiles
+        }
+        for start in range(0, len(X), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            leaves = self.structure.apply(X[chunk])
+            for name, forest in self.forests.items():
+                forest_leaves = leaves[self.tree_slices[name]] - self.node_offsets[name]
+                tree_values = forest.leaf_value[forest_leaves]
+                values[name][chunk] = sum_trees(tree_values)
+                if name in explained:
+                    explained[name][chunk] = forest.contributions(forest_leaves, self.n_features)
+                if name in intervals:
+                    intervals[name][chunk] = tree_quantiles(tree_values, quantiles[name])
+        for name, forest in self.forests.items():
+            values[name] /= forest.n_trees
+        return values, explained, intervals
+
+    def predict(self, features):
+        """Class labels or predicted values of every forest, keyed by forest name"""
+        predictions = {}
+        for name, value in self.predict_values(features).items():
+            classes = self.forests[name].classes
+            predictions[name] = value[:, 0] if classes is None else classes[np.argmax(value, axis=1)]
+        return predictions